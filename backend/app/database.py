@@ -6,18 +6,64 @@ Database schema is managed via migrations in /migrations/
 
 import os
 
-from sqlalchemy import create_engine
+import sqlite_vec
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 
 DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./search.db")
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "16"))
 
-# Create SQLAlchemy engine
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})  # Needed for SQLite
+# Connection settings for a read-heavy FTS5 workload: WAL so readers never block on
+# writers, memory-mapped reads, a 64 MB page cache and in-memory temp tables
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA foreign_keys=ON",
+)
+
+# Create SQLAlchemy engine. Pooled connections are reused across requests so the
+# connect + PRAGMA cost is paid once per connection, and WAL lets them read concurrently.
+engine = create_engine(
+    DATABASE_URL,
+    connect_args={"check_same_thread": False},  # Needed for SQLite
+    poolclass=QueuePool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_POOL_SIZE,
+)
 
 # Create sessionmaker
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+def apply_sqlite_pragmas(dbapi_connection):
+    """Apply SQLITE_PRAGMAS to a raw sqlite3 connection."""
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+
+def load_sqlite_vec(dbapi_connection):
+    """Load the sqlite-vec extension if this sqlite3 build allows extensions."""
+    if not hasattr(dbapi_connection, "enable_load_extension"):
+        return
+    dbapi_connection.enable_load_extension(True)
+    sqlite_vec.load(dbapi_connection)
+    dbapi_connection.enable_load_extension(False)
+
+
+@event.listens_for(engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Tune every new SQLite connection opened by the engine and load sqlite-vec."""
+    apply_sqlite_pragmas(dbapi_connection)
+    load_sqlite_vec(dbapi_connection)
+
+
 def get_db():
     """Get a database session."""
     db = SessionLocal()
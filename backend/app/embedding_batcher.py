@@ -0,0 +1,117 @@
+"""
+Micro-batching for the /embed endpoint.
+Coalesces concurrent embedding requests into a single embed_texts call.
+"""
+
+import asyncio
+import logging
+from collections.abc import Callable
+
+from app.embedding_service import EmbeddingService
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingBatcher:
+    """Queue that groups texts arriving within a short window into one model call."""
+
+    def __init__(
+        self,
+        get_service: Callable[[], EmbeddingService],
+        max_batch_size: int = 32,
+        max_wait: float = 0.008,
+        max_batch_chars: int = 32_000,
+    ):
+        """
+        Initialize the batcher.
+
+        Args:
+            get_service: Callable returning the embedding service to run batches on
+            max_batch_size: Maximum number of texts per model call
+            max_wait: Seconds to wait for more texts after the first one arrives
+            max_batch_chars: Stop collecting once a batch holds this many characters
+        """
+        self.get_service = get_service
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_batch_chars = max_batch_chars
+        self._queue: asyncio.Queue | None = None
+        self._worker: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def start(self):
+        """Start the background worker on the running event loop."""
+        loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._worker = loop.create_task(self._run())
+        self._loop = loop
+
+    async def stop(self):
+        """Cancel the background worker."""
+        if self._worker is not None and self._loop is asyncio.get_running_loop():
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._queue = None
+        self._worker = None
+        self._loop = None
+
+    async def embed(self, text: str) -> list[float]:
+        """
+        Queue a text for embedding and wait for its vector.
+
+        Args:
+            text: Input text to embed
+
+        Returns:
+            List of float values representing the embedding vector
+        """
+        if (
+            self._worker is None
+            or self._worker.done()
+            or self._loop is not asyncio.get_running_loop()
+        ):
+            self.start()
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def _run(self):
+        """Drain the queue in batches until cancelled."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            batch_chars = len(batch[0][0])
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch_size and batch_chars < self.max_batch_chars:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except TimeoutError:
+                    break
+                batch.append(item)
+                batch_chars += len(item[0])
+
+            texts = [text for text, _ in batch]
+            try:
+                embeddings = await asyncio.to_thread(self._embed_texts, texts)
+            except Exception as e:
+                logger.error(f"Batched embedding failed: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), embedding in zip(batch, embeddings, strict=True):
+                if not future.done():
+                    future.set_result(embedding)
+
+    def _embed_texts(self, texts: list[str]) -> list[list[float]]:
+        """Embed a batch in one call; the service sorts it into similar-length micro-batches."""
+        return self.get_service().embed_texts(texts)
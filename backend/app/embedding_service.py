@@ -3,30 +3,66 @@ Embedding service using Jina CLIP v2 model.
 Provides text embedding functionality for search queries.
 """
 
+import contextlib
 import logging
 import os
+import threading
+from collections import OrderedDict
 
+import numpy as np
 import torch
 from transformers import AutoModel, AutoTokenizer
 
 logger = logging.getLogger(__name__)
 
 
+class EmbeddingOutOfMemoryError(RuntimeError):
+    """Raised when a batch does not fit in accelerator memory; callers may retry later."""
+
+
 class EmbeddingService:
     """Service for generating text embeddings using Jina CLIP v2 model."""
 
-    def __init__(self, model_name: str = "jinaai/jina-clip-v2", device: str | None = None):
+    def __init__(
+        self,
+        model_name: str = "jinaai/jina-clip-v2",
+        device: str | None = None,
+        cache_size: int = 4096,
+        compile_model: bool | None = None,
+        half_precision: bool = True,
+        micro_batch_size: int = 32,
+        quantize: bool | None = None,
+    ):
         """
         Initialize the embedding service.
 
         Args:
             model_name: HuggingFace model identifier for Jina CLIP v2
             device: Device to run the model on ('cpu', 'cuda', 'mps', or None for auto)
+            cache_size: Number of text embeddings to keep in the LRU cache (0 disables it)
+            compile_model: Compile the text encoder with torch.compile (None defers to
+                the EMBED_COMPILE environment variable)
+            half_precision: Run the forward pass under FP16/BF16 autocast on CUDA and MPS
+            micro_batch_size: Maximum number of texts per model forward pass
+            quantize: Apply dynamic int8 quantization on CPU (None defers to the
+                EMBED_QUANTIZE environment variable)
         """
         self.model_name = model_name
         self.device = device or self._get_best_device()
+        self.cache_size = cache_size
+        self.compile_model = compile_model
+        self.half_precision = half_precision
+        self.micro_batch_size = micro_batch_size
+        self.quantize = quantize
+        self._cache: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # Endpoints call the service from several worker threads. Forward passes on the
+        # shared model run one at a time, since concurrent passes multiply peak accelerator
+        # memory and the CUDA graphs recorded by torch.compile are not thread-safe.
+        self._model_lock = threading.Lock()
         self.model = None
         self.tokenizer = None
+        self._get_text_features = None
         self._load_model()
 
     def _get_best_device(self) -> str:
@@ -53,11 +89,65 @@ class EmbeddingService:
             )
             self.model.to(self.device)
             self.model.eval()
+            # Inference only: drop autograd bookkeeping for every parameter
+            self.model.requires_grad_(False)
+            if self.device == "cuda":
+                torch.backends.cuda.enable_flash_sdp(True)
             logger.info(f"Model loaded successfully on device: {self.device}")
         except Exception as e:
             logger.error(f"Failed to load model: {e}")
             raise
 
+        if self._should_quantize():
+            self._quantize_model()
+
+        self._get_text_features = self.model.get_text_features
+        if self._should_compile():
+            self._compile_model()
+
+    def _should_quantize(self) -> bool:
+        """Quantize the model when requested and it runs on CPU."""
+        if self.device != "cpu":
+            return False
+        if self.quantize is not None:
+            return self.quantize
+        return os.getenv("EMBED_QUANTIZE", "0") == "1"
+
+    def _quantize_model(self):
+        """Swap FP32 Linear layers for dynamically quantized int8 ones."""
+        logger.info("Applying dynamic int8 quantization to Linear layers")
+        self.model = torch.ao.quantization.quantize_dynamic(
+            self.model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+
+    def _should_compile(self) -> bool:
+        """Compile the text encoder when requested and supported on this device."""
+        # TorchInductor has no MPS backend, so compiling there only adds graph breaks
+        if not hasattr(torch, "compile") or self.device == "mps":
+            return False
+        if self.compile_model is not None:
+            return self.compile_model
+        return os.getenv("EMBED_COMPILE", "0") == "1"
+
+    def _compile_model(self):
+        """Compile the text encoder and run a warm-up pass so requests skip the trace."""
+        logger.info("Compiling text encoder with torch.compile")
+        self._get_text_features = torch.compile(
+            self.model.get_text_features, mode="reduce-overhead", dynamic=True
+        )
+        self.embed_text("warmup")
+
+    def _autocast(self):
+        """Return a mixed-precision context for the forward pass on CUDA/MPS."""
+        if not self.half_precision:
+            return contextlib.nullcontext()
+        if self.device == "cuda":
+            dtype = torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+            return torch.autocast(device_type="cuda", dtype=dtype)
+        if self.device == "mps":
+            return torch.autocast(device_type="mps", dtype=torch.float16)
+        return contextlib.nullcontext()
+
     def embed_text(self, text: str) -> list[float]:
         """
         Generate embedding for a single text.
@@ -83,22 +173,96 @@ class EmbeddingService:
         if not texts:
             return []
 
-        try:
-            with torch.no_grad():
-                # Tokenize texts
-                inputs = self.tokenizer(
-                    texts, padding=True, truncation=True, return_tensors="pt", max_length=512
-                ).to(self.device)
+        return self.embed_texts_array(texts).tolist()
 
+    def embed_texts_array(self, texts: list[str]) -> np.ndarray:
+        """
+        Generate embeddings for multiple texts as one contiguous float32 array.
+
+        Repeated texts are served from an LRU cache; only cache misses reach the model,
+        in length-sorted micro-batches so short texts are not padded to long ones.
+
+        Args:
+            texts: List of input texts to embed
+
+        Returns:
+            Array of shape (len(texts), embedding_dim)
+        """
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        embeddings = self._get_cached(texts)
+        misses = list(dict.fromkeys(text for text in texts if text not in embeddings))
+        if misses:
+            computed = self._compute_sorted(misses)
+            self._put_cached(computed)
+            embeddings.update(computed)
+
+        return np.stack([embeddings[text] for text in texts])
+
+    def _get_cached(self, texts: list[str]) -> dict[str, np.ndarray]:
+        """Return cached embeddings for the given texts, marking them recently used."""
+        hits = {}
+        with self._cache_lock:
+            for text in texts:
+                if text in self._cache:
+                    self._cache.move_to_end(text)
+                    hits[text] = self._cache[text]
+        return hits
+
+    def _put_cached(self, embeddings: dict[str, np.ndarray]):
+        """Store embeddings in the cache, evicting the least recently used entries."""
+        if self.cache_size <= 0:
+            return
+        with self._cache_lock:
+            self._cache.update(embeddings)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _compute_sorted(self, texts: list[str]) -> dict[str, np.ndarray]:
+        """Embed texts in micro-batches of similar character length, keyed by text."""
+        ordered = sorted(texts, key=len)
+        embeddings = {}
+        with self._model_lock:
+            for start in range(0, len(ordered), self.micro_batch_size):
+                chunk = ordered[start : start + self.micro_batch_size]
+                embeddings.update(zip(chunk, self._compute_embeddings(chunk), strict=True))
+        return embeddings
+
+    def _tokenize(self, texts: list[str]) -> dict[str, torch.Tensor]:
+        """Tokenize texts on the CPU and move the input tensors to the model device."""
+        inputs = self.tokenizer(
+            texts, padding=True, truncation=True, return_tensors="pt", max_length=512
+        )
+        if self.device == "cuda":
+            # Pinned host memory lets the copy run asynchronously with queued GPU work
+            return {
+                name: tensor.pin_memory().to(self.device, non_blocking=True)
+                for name, tensor in inputs.items()
+            }
+        return inputs.to(self.device)
+
+    def _compute_embeddings(self, texts: list[str]) -> np.ndarray:
+        """Run the tokenizer and model over texts."""
+        try:
+            inputs = self._tokenize(texts)
+            with torch.inference_mode(), self._autocast():
                 # Generate embeddings
-                outputs = self.model.get_text_features(**inputs)
+                outputs = self._get_text_features(**inputs)
 
-                # Normalize embeddings (common practice for similarity search)
-                embeddings = torch.nn.functional.normalize(outputs, p=2, dim=1)
+                # Normalize in FP32 so half-precision outputs cannot overflow the L2 norm.
+                # Dividing in place reuses that tensor instead of allocating another [B, D].
+                embeddings = outputs.float()
+                norms = torch.linalg.vector_norm(embeddings, dim=1, keepdim=True)
+                embeddings.div_(norms.clamp_min_(1e-12))
 
-                # Convert to list of lists
-                return embeddings.cpu().numpy().tolist()
+                return embeddings.cpu().numpy()
 
+        except torch.cuda.OutOfMemoryError as e:
+            # Release cached blocks so later (or smaller) batches can still allocate
+            torch.cuda.empty_cache()
+            logger.error(f"Out of GPU memory embedding {len(texts)} texts: {e}")
+            raise EmbeddingOutOfMemoryError(str(e)) from e
         except Exception as e:
             logger.error(f"Failed to generate embeddings: {e}")
             raise
@@ -1,27 +1,100 @@
+import asyncio
+import hashlib
+import hmac
 import os
+from contextlib import asynccontextmanager
 from typing import Annotated
 
-from fastapi import Depends, FastAPI, Header, HTTPException
+from fastapi import Depends, FastAPI, Header, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from sqlalchemy import text
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, ConfigDict, Field
+from sqlalchemy import bindparam, text
 from sqlalchemy.orm import Session
+from sqlite_vec import serialize_float32
 
 from app.database import get_db
-from app.embedding_service import get_embedding_service
+from app.embedding_batcher import EmbeddingBatcher
+from app.embedding_service import EmbeddingOutOfMemoryError, get_embedding_service
 
 # API Key configuration
 API_KEY = os.getenv("API_KEY", "gem-search-dev-key-12345")
+# Keys are compared as fixed-length digests so the check takes the same time
+# however many leading characters of a guess are right
+API_KEY_DIGEST = hashlib.blake2b(API_KEY.encode()).digest()
 
 
 def verify_api_key(x_api_key: Annotated[str, Header()]):
-    if x_api_key != API_KEY:
+    if not hmac.compare_digest(hashlib.blake2b(x_api_key.encode()).digest(), API_KEY_DIGEST):
         raise HTTPException(status_code=401, detail="Invalid API key")
     return x_api_key
 
 
-# Define request and response models
+# FTS5 search ranked by BM25, built once at import instead of per request.
+# document_content indexes documents.content, so its rowid is the document id.
+SEARCH_QUERY = text(
+    """
+    SELECT d.title, d.url
+    FROM document_content AS c
+    JOIN documents AS d ON c.rowid = d.id
+    WHERE document_content MATCH :query
+    ORDER BY bm25(document_content)
+    LIMIT 10
+"""
+)
+
+# Candidate lists for /hybrid_search, fused with reciprocal rank fusion
+HYBRID_CANDIDATES = 20
+RRF_K = 60
+
+KEYWORD_CANDIDATES_QUERY = text(
+    """
+    SELECT c.rowid
+    FROM document_content AS c
+    WHERE document_content MATCH :query
+    ORDER BY bm25(document_content)
+    LIMIT :k
+"""
+)
+
+# document_vectors stores int8 vectors, so the query is quantized the same way
+VECTOR_CANDIDATES_QUERY = text(
+    """
+    SELECT document_id
+    FROM document_vectors
+    WHERE embedding MATCH vec_quantize_int8(:embedding, 'unit') AND k = :k
+    ORDER BY distance
+"""
+)
+
+DOCUMENTS_BY_ID_QUERY = text("SELECT id, title, url FROM documents WHERE id IN :ids").bindparams(
+    bindparam("ids", expanding=True)
+)
+
+
+def reciprocal_rank_fusion(rankings: list[list[int]], k: int = RRF_K) -> list[int]:
+    """
+    Merge ranked id lists by reciprocal rank fusion.
+
+    Args:
+        rankings: Lists of document ids, each ordered best first
+        k: Rank offset damping the weight of top positions
+
+    Returns:
+        Document ids ordered by fused score, best first
+    """
+    scores: dict[int, float] = {}
+    for ranking in rankings:
+        for rank, document_id in enumerate(ranking, start=1):
+            scores[document_id] = scores.get(document_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+# Define request and response models. Request text is stripped by pydantic-core while
+# parsing, so handlers only check for emptiness.
 class SearchQuery(BaseModel):
+    model_config = ConfigDict(str_strip_whitespace=True)
+
     query: str
 
 
@@ -31,6 +104,8 @@ class SearchResult(BaseModel):
 
 
 class EmbedQuery(BaseModel):
+    model_config = ConfigDict(str_strip_whitespace=True)
+
     text: str
 
 
@@ -38,8 +113,42 @@ class EmbedResponse(BaseModel):
     embedding: list[float]
 
 
+# Caps the texts a single /embed/batch request can hand to the model
+MAX_EMBED_BATCH_TEXTS = int(os.getenv("MAX_EMBED_BATCH_TEXTS", "128"))
+
+
+class EmbedBatchQuery(BaseModel):
+    model_config = ConfigDict(str_strip_whitespace=True)
+
+    texts: list[str] = Field(max_length=MAX_EMBED_BATCH_TEXTS)
+
+
+class EmbedBatchResponse(BaseModel):
+    embeddings: list[list[float]]
+
+
+# Coalesces concurrent /embed requests into batched model calls
+embed_batcher = EmbeddingBatcher(lambda: get_embedding_service())
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load the embedding model, then run the embedding batcher for the lifetime of the app."""
+    if os.getenv("EAGER_LOAD_EMBED", "1") == "1":
+        # Pay model download/load (and any compile trace) before serving traffic
+        await asyncio.to_thread(lambda: get_embedding_service().embed_text("warmup"))
+    embed_batcher.start()
+    yield
+    await embed_batcher.stop()
+
+
 # Initialize the FastAPI application
-app = FastAPI(title="Gem Search API", description="API for searching web content", version="1.0.0")
+app = FastAPI(
+    title="Gem Search API",
+    description="API for searching web content",
+    version="1.0.0",
+    lifespan=lifespan,
+)
 
 # Configure CORS
 origins = [
@@ -61,12 +170,13 @@ app.add_middleware(
 # No need for startup initialization
 
 
+# Plain def: FastAPI runs the blocking SQLite query in its threadpool, off the event loop
 @app.post("/search", response_model=list[SearchResult])
-async def search(
+def search(
     search_query: SearchQuery, db: Session = Depends(get_db), api_key: str = Depends(verify_api_key)
 ):
     """Search documents using FTS5."""
-    query = search_query.query.strip()
+    query = search_query.query
 
     # Return empty results for empty queries
     if not query:
@@ -74,19 +184,7 @@ async def search(
 
     try:
         # Use FTS5 for searching with simple schema
-        result = db.execute(
-            text(
-                """
-            SELECT d.title, d.url
-            FROM document_content AS c
-            JOIN documents AS d ON c.document_id = d.id
-            WHERE document_content MATCH :query
-            ORDER BY rank
-            LIMIT 10
-        """
-            ),
-            {"query": query},
-        ).fetchall()
+        result = db.execute(SEARCH_QUERY, {"query": query}).fetchall()
 
         results = [{"title": row[0], "url": row[1]} for row in result]
         return results
@@ -95,18 +193,151 @@ async def search(
         raise HTTPException(status_code=500, detail=f"Search error: {str(e)}") from e
 
 
+def hybrid_search_documents(db: Session, query: str, embedding: list[float]) -> list[dict]:
+    """
+    Fuse FTS5 and vector KNN candidates for a query and load the top documents.
+
+    Args:
+        db: Database session
+        query: FTS5 query string
+        embedding: Query embedding vector
+
+    Returns:
+        Up to 10 {"title", "url"} dicts, best first
+    """
+    keyword_ids = [
+        row[0]
+        for row in db.execute(KEYWORD_CANDIDATES_QUERY, {"query": query, "k": HYBRID_CANDIDATES})
+    ]
+    vector_ids = [
+        row[0]
+        for row in db.execute(
+            VECTOR_CANDIDATES_QUERY,
+            {"embedding": serialize_float32(embedding), "k": HYBRID_CANDIDATES},
+        )
+    ]
+
+    ranked_ids = reciprocal_rank_fusion([keyword_ids, vector_ids])[:10]
+    if not ranked_ids:
+        return []
+
+    documents = {
+        row[0]: {"title": row[1], "url": row[2]}
+        for row in db.execute(DOCUMENTS_BY_ID_QUERY, {"ids": ranked_ids})
+    }
+    return [documents[document_id] for document_id in ranked_ids if document_id in documents]
+
+
+@app.post("/hybrid_search", response_model=list[SearchResult])
+async def hybrid_search(
+    search_query: SearchQuery, db: Session = Depends(get_db), api_key: str = Depends(verify_api_key)
+):
+    """Search documents with FTS5 and vector KNN, merged by reciprocal rank fusion."""
+    query = search_query.query
+
+    # Return empty results for empty queries
+    if not query:
+        return []
+
+    try:
+        # One model call per request; it goes through the same batcher and cache as /embed
+        embedding = await embed_batcher.embed(query)
+
+        # SQLite queries are blocking, so run them in a worker thread
+        return await asyncio.to_thread(hybrid_search_documents, db, query, embedding)
+    except EmbeddingOutOfMemoryError as e:
+        raise HTTPException(status_code=503, detail="Embedding service out of memory") from e
+    except Exception as e:
+        print(f"Search error: {e}")
+        raise HTTPException(status_code=500, detail=f"Search error: {str(e)}") from e
+
+
 @app.post("/embed", response_model=EmbedResponse)
 async def embed_text(embed_query: EmbedQuery, api_key: str = Depends(verify_api_key)):
     """Generate text embedding using Jina CLIP v2 model."""
-    text = embed_query.text.strip()
+    text = embed_query.text
+
+    if not text:
+        raise HTTPException(status_code=400, detail="Text cannot be empty")
+
+    try:
+        embedding = await embed_batcher.embed(text)
+        # Returning the response directly skips re-validating 1024 floats against
+        # EmbedResponse; the model still documents the schema
+        return JSONResponse({"embedding": embedding})
+    except EmbeddingOutOfMemoryError as e:
+        raise HTTPException(status_code=503, detail="Embedding service out of memory") from e
+    except Exception as e:
+        print(f"Embedding error: {e}")
+        raise HTTPException(status_code=500, detail=f"Embedding error: {str(e)}") from e
+
+
+@app.post("/embed/batch", response_model=EmbedBatchResponse)
+async def embed_texts_batch(embed_query: EmbedBatchQuery, api_key: str = Depends(verify_api_key)):
+    """Generate embeddings for several texts with a single model call."""
+    texts = embed_query.texts
+
+    if not texts:
+        return JSONResponse({"embeddings": []})
+    if not all(texts):
+        raise HTTPException(status_code=400, detail="Texts cannot be empty")
+
+    try:
+        embeddings = await asyncio.to_thread(lambda: get_embedding_service().embed_texts(texts))
+        return JSONResponse({"embeddings": embeddings})
+    except EmbeddingOutOfMemoryError as e:
+        raise HTTPException(status_code=503, detail="Embedding service out of memory") from e
+    except Exception as e:
+        print(f"Embedding error: {e}")
+        raise HTTPException(status_code=500, detail=f"Embedding error: {str(e)}") from e
+
+
+@app.post("/embed/raw", response_class=Response)
+async def embed_text_raw(embed_query: EmbedQuery, api_key: str = Depends(verify_api_key)):
+    """Generate text embedding as raw little-endian float16 bytes."""
+    text = embed_query.text
 
     if not text:
         raise HTTPException(status_code=400, detail="Text cannot be empty")
 
     try:
-        embedding_service = get_embedding_service()
-        embedding = embedding_service.embed_text(text)
-        return {"embedding": embedding}
+        embeddings = await asyncio.to_thread(
+            lambda: get_embedding_service().embed_texts_array([text])
+        )
+        return Response(
+            content=embeddings[0].astype("<f2").tobytes(),
+            media_type="application/octet-stream",
+        )
+    except EmbeddingOutOfMemoryError as e:
+        raise HTTPException(status_code=503, detail="Embedding service out of memory") from e
+    except Exception as e:
+        print(f"Embedding error: {e}")
+        raise HTTPException(status_code=500, detail=f"Embedding error: {str(e)}") from e
+
+
+@app.post("/embed/batch/raw", response_class=Response)
+async def embed_texts_batch_raw(
+    embed_query: EmbedBatchQuery, api_key: str = Depends(verify_api_key)
+):
+    """Generate embeddings for several texts as one row-major little-endian float16 matrix."""
+    texts = embed_query.texts
+
+    if not texts:
+        return Response(content=b"", media_type="application/octet-stream")
+    if not all(texts):
+        raise HTTPException(status_code=400, detail="Texts cannot be empty")
+
+    try:
+        embeddings = await asyncio.to_thread(
+            lambda: get_embedding_service().embed_texts_array(texts)
+        )
+        # Row i is texts[i]; the embedding size is len(content) // (2 * len(texts))
+        return Response(
+            content=embeddings.astype("<f2").tobytes(),
+            media_type="application/octet-stream",
+        )
+    except EmbeddingOutOfMemoryError as e:
+        raise HTTPException(status_code=503, detail="Embedding service out of memory") from e
     except Exception as e:
         print(f"Embedding error: {e}")
         raise HTTPException(status_code=500, detail=f"Embedding error: {str(e)}") from e
@@ -3,17 +3,26 @@
 Simplified Reddit scraper for discovering hidden gems.
 Extracts URLs from posts and scrapes them with concurrent processing.
 """
+import asyncio
 import json
+import logging
 import random
 import re
 
 # Import from the same directory
 import time
-from urllib.parse import urlparse
+from itertools import islice
 
 import requests
 
-from .scraper import scrape_with_discovery_concurrent
+from .scraper import (
+    create_scraper_session,
+    find_existing_urls,
+    optimize_search_index,
+    scrape_with_discovery_concurrent,
+)
+
+logger = logging.getLogger(__name__)
 
 # Configuration constants
 MAX_CONCURRENT = 30  # Max concurrent requests for optimal speed
@@ -21,6 +30,55 @@ DISCOVER_DEPTH = 2  # Link discovery depth (2 is sweet spot)
 DEFAULT_DELAY = 2  # Delay between Reddit API calls (seconds)
 DEFAULT_PAGES = 20  # Default pages to scrape in continuous mode
 
+# Compiled once at import; used for every post's selftext. A single character class
+# keeps matching linear on adversarial input; trailing punctuation is stripped after.
+URL_PATTERN = re.compile(r'https?://[^\s<>"{\}|\\^`\[\]]+')
+NETLOC_PATTERN = re.compile(r"^[A-Za-z][A-Za-z0-9+.-]*://([^/?#]*)")
+
+# Domains whose links are never scraped
+SKIP_DOMAINS = frozenset(
+    {
+        "reddit.com",
+        "www.reddit.com",
+        "old.reddit.com",
+        "m.reddit.com",
+        "redd.it",
+        "imgur.com",
+        "i.imgur.com",
+        "youtube.com",
+        "youtu.be",
+        "twitter.com",
+        "x.com",
+        "facebook.com",
+        "instagram.com",
+    }
+)
+
+REDDIT_HEADERS = {"User-Agent": "gem-search-bot/1.0 (content discovery tool)"}
+
+# Sort methods and weighted time filters for random date exploration
+SORT_OPTIONS = ("hot", "new", "top", "rising")
+TIME_FILTER_OPTIONS = ("day", "week", "month", "year", "all")
+TIME_FILTER_WEIGHTS = (1, 2, 3, 2, 1)  # Prefer week/month for best content
+
+
+# Shared HTTP session (lazy initialization) so paginated calls reuse one connection
+_reddit_session: requests.Session | None = None
+
+
+def get_reddit_session():
+    """
+    Get or create the shared Reddit HTTP session.
+
+    Returns:
+        requests.Session: Session with keep-alive and the bot User-Agent set
+    """
+    global _reddit_session
+    if _reddit_session is None:
+        _reddit_session = requests.Session()
+        _reddit_session.headers.update(REDDIT_HEADERS)
+    return _reddit_session
+
 
 def get_random_time_filter():
     """
@@ -29,9 +87,7 @@ def get_random_time_filter():
     Returns:
         str: Random time filter (day, week, month, year, all)
     """
-    time_options = ["day", "week", "month", "year", "all"]
-    weights = [1, 2, 3, 2, 1]  # Prefer week/month for best content
-    return random.choices(time_options, weights=weights)[0]
+    return random.choices(TIME_FILTER_OPTIONS, weights=TIME_FILTER_WEIGHTS)[0]
 
 
 def get_random_sort_and_time():
@@ -41,8 +97,7 @@ def get_random_sort_and_time():
     Returns:
         tuple: (sort_method, time_filter)
     """
-    sort_options = ["hot", "new", "top", "rising"]
-    sort = random.choice(sort_options)
+    sort = random.choice(SORT_OPTIONS)
 
     time_filter = None
     if sort == "top":
@@ -71,8 +126,6 @@ def get_reddit_posts(
 
     url = f"https://www.reddit.com/r/{subreddit}/{sort}.json"
 
-    headers = {"User-Agent": "gem-search-bot/1.0 (content discovery tool)"}
-
     params = {"limit": min(limit, 100)}  # Reddit API limit
 
     # Add time filter for top posts
@@ -83,24 +136,22 @@ def get_reddit_posts(
         params["after"] = after
 
     try:
-        response = requests.get(url, headers=headers, params=params, timeout=10)
+        response = get_reddit_session().get(url, params=params, timeout=10)
         response.raise_for_status()
 
-        data = response.json()
-        posts = []
-
-        for item in data["data"]["children"]:
-            post = item["data"]
-            posts.append(
-                {
-                    "title": post.get("title", ""),
-                    "url": post.get("url", ""),
-                    "selftext": post.get("selftext", ""),
-                    "score": post.get("score", 0),
-                    "created_utc": post.get("created_utc", 0),
-                    "permalink": f"https://www.reddit.com{post.get('permalink', '')}",
-                }
-            )
+        # Parse the raw bytes directly, skipping requests' text decoding step
+        data = json.loads(response.content)
+        posts = [
+            {
+                "title": post.get("title", ""),
+                "url": post.get("url", ""),
+                "selftext": post.get("selftext", ""),
+                "score": post.get("score", 0),
+                "created_utc": post.get("created_utc", 0),
+                "permalink": f"https://www.reddit.com{post.get('permalink', '')}",
+            }
+            for post in (item["data"] for item in data["data"]["children"])
+        ]
 
         # Get next page token
         next_after = data["data"].get("after")
@@ -108,84 +159,80 @@ def get_reddit_posts(
         return posts, next_after
 
     except Exception as e:
-        print(f"Failed to fetch Reddit posts: {e}")
+        logger.error("Failed to fetch Reddit posts: %s", e)
         return [], None
 
 
-def extract_urls_from_text(text):
+def get_netloc(url):
     """
-    Extract URLs from text using regex.
+    Get the network location of an absolute URL without building a full ParseResult.
 
     Args:
-        text: Text to search for URLs
+        url: URL to inspect
 
     Returns:
-        set: Set of found URLs
+        str: Network location, or an empty string if the URL has none
     """
-    # Regex pattern for URLs
-    url_pattern = r'https?://[^\s<>"{\}|\\^`\[\]]+[^\s<>"{\}|\\^`\[\].,;!?\'")\]]*'
+    match = NETLOC_PATTERN.match(url)
+    return match.group(1) if match else ""
 
-    urls = set()
-    matches = re.findall(url_pattern, text)
 
-    for match in matches:
-        # Clean up common trailing characters
-        url = match.rstrip(".,;!?'\")]*")
+def iter_urls_with_netloc(text):
+    """
+    Yield URLs found in text together with their network location.
+
+    Args:
+        text: Text to search for URLs
 
-        # Validate URL
-        try:
-            parsed = urlparse(url)
-            if parsed.scheme and parsed.netloc:
-                urls.add(url)
-        except Exception:
-            pass
+    Yields:
+        tuple: (url, netloc) with common trailing punctuation removed from the URL
+    """
+    for match in URL_PATTERN.finditer(text):
+        # Clean up common trailing characters
+        url = match.group(0).rstrip(".,;!?'\")]*")
 
-    return urls
+        # The pattern guarantees the scheme, so only the host needs checking
+        netloc = get_netloc(url)
+        if netloc:
+            yield url, netloc
 
 
-def filter_reddit_urls(urls):
+def is_allowed_netloc(netloc):
     """
-    Filter out Reddit URLs and other unwanted domains.
+    Check that a network location is present and not in SKIP_DOMAINS.
 
     Args:
-        urls: Set of URLs to filter
+        netloc: Network location of a URL
 
     Returns:
-        set: Filtered URLs
+        bool: True if URLs on this host should be scraped
     """
-    filtered = set()
-
-    # Domains to skip
-    skip_domains = {
-        "reddit.com",
-        "www.reddit.com",
-        "old.reddit.com",
-        "m.reddit.com",
-        "redd.it",
-        "imgur.com",
-        "i.imgur.com",
-        "youtube.com",
-        "youtu.be",
-        "twitter.com",
-        "x.com",
-        "facebook.com",
-        "instagram.com",
-    }
+    return bool(netloc) and netloc.lower() not in SKIP_DOMAINS
 
-    for url in urls:
-        try:
-            parsed = urlparse(url)
-            domain = parsed.netloc.lower()
-            # Skip if no domain (invalid URL) or domain is in skip list
-            if domain and domain not in skip_domains:
-                filtered.add(url)
-        except Exception:
-            pass
 
-    return filtered
+async def open_scraper_session():
+    """
+    Create the crawl session inside a running event loop.
 
+    aiohttp binds a session to the loop it was created on, so a session shared
+    across pages must be opened on the same asyncio.Runner that crawls them.
 
-def scrape_reddit_batch(subreddit, db_path, after=None, sort="hot", time_filter=None):
+    Returns:
+        aiohttp.ClientSession: Session sized for MAX_CONCURRENT requests
+    """
+    return create_scraper_session(MAX_CONCURRENT)
+
+
+def scrape_reddit_batch(
+    subreddit,
+    db_path,
+    after=None,
+    sort="hot",
+    time_filter=None,
+    seen_urls=None,
+    runner=None,
+    session=None,
+):
     """
     Scrape a batch of Reddit posts and extract websites with link discovery.
     Uses concurrent processing with optimized settings.
@@ -196,92 +243,98 @@ def scrape_reddit_batch(subreddit, db_path, after=None, sort="hot", time_filter=
         after: Pagination token for next page (optional)
         sort: Sort method (hot, new, top, rising)
         time_filter: Time filter for top posts (hour, day, week, month, year, all)
+        seen_urls: Set of URLs already handled on earlier pages (optional, updated in place)
+        runner: asyncio.Runner to crawl on (optional, asyncio.run is used if omitted)
+        session: aiohttp.ClientSession opened on runner to reuse (optional)
 
     Returns:
         tuple: (total_urls_found, new_documents_added, next_after_token)
     """
-    print(f"Fetching posts from r/{subreddit} (sort: {sort})...")
+    logger.info("Fetching posts from r/%s (sort: %s)...", subreddit, sort)
 
     # Get Reddit posts with pagination (100 is Reddit API max)
     posts, next_after = get_reddit_posts(
         subreddit, 100, sort=sort, after=after, time_filter=time_filter
     )
     if not posts:
-        print("No posts found")
+        logger.info("No posts found")
         return 0, 0, None
 
-    print(f"Found {len(posts)} posts")
+    logger.info("Found %d posts", len(posts))
 
-    # Extract URLs from all posts
+    # Extract URLs from all posts, filtering out Reddit and social media in the same pass
     all_urls = set()
+    filtered_urls = set()
 
     for post in posts:
+        post_urls = []
+
         # Check post URL (main link)
         if post["url"] and not post["url"].startswith("https://www.reddit.com"):
-            all_urls.add(post["url"])
+            post_urls.append((post["url"], get_netloc(post["url"])))
+
+        # Check self text for URLs; the host is parsed once and reused for filtering.
+        # Every match starts with "http", so a substring check skips the regex on most posts.
+        if post["selftext"] and "http" in post["selftext"]:
+            post_urls.extend(iter_urls_with_netloc(post["selftext"]))
 
-        # Check self text for URLs
-        if post["selftext"]:
-            text_urls = extract_urls_from_text(post["selftext"])
-            all_urls.update(text_urls)
+        for url, netloc in post_urls:
+            if url in all_urls:
+                continue
+            all_urls.add(url)
+            if is_allowed_netloc(netloc):
+                filtered_urls.add(url)
 
-    print(f"Extracted {len(all_urls)} URLs from posts")
+    # Skip URLs already crawled on earlier pages, then look up only the rest in the database
+    if seen_urls is not None:
+        filtered_urls -= seen_urls
+        seen_urls.update(filtered_urls)
+    filtered_urls -= find_existing_urls(db_path, filtered_urls)
 
-    # Filter out Reddit and social media URLs
-    filtered_urls = filter_reddit_urls(all_urls)
-    print(f"After filtering: {len(filtered_urls)} URLs to process")
+    logger.info("Extracted %d URLs from posts", len(all_urls))
+    logger.info("After filtering: %d URLs to process", len(filtered_urls))
 
     if not filtered_urls:
-        print("No URLs to process after filtering")
+        logger.info("No URLs to process after filtering")
         return len(all_urls), 0, next_after
 
     # Show first few URLs
-    print("\\nFirst 10 URLs to scrape:")
-    for i, url in enumerate(list(filtered_urls)[:10]):
-        print(f"{i+1}. {url}")
-
-    # Create temporary links file
-    temp_links_file = "/tmp/reddit_links.json"
-    with open(temp_links_file, "w") as f:
-        json.dump(list(filtered_urls), f, indent=2)
-
-    print(
-        f"\\nStarting concurrent link discovery scraping (depth {DISCOVER_DEPTH}, {MAX_CONCURRENT} max requests)..."
+    logger.info("First 10 URLs to scrape:")
+    for i, url in enumerate(islice(filtered_urls, 10), start=1):
+        logger.info("%d. %s", i, url)
+
+    logger.info(
+        "Starting concurrent link discovery scraping (depth %s, %s max requests)...",
+        DISCOVER_DEPTH,
+        MAX_CONCURRENT,
     )
 
     # Use concurrent scraper with optimized settings
     try:
-        import asyncio
-
-        new_docs, total_discovered = asyncio.run(
-            scrape_with_discovery_concurrent(
-                temp_links_file,
-                db_path,
-                discover_depth=DISCOVER_DEPTH,
-                allow_cross_domain=False,  # Stay within same domains for each site
-                max_concurrent=MAX_CONCURRENT,
-            )
+        crawl = scrape_with_discovery_concurrent(
+            list(filtered_urls),
+            db_path,
+            discover_depth=DISCOVER_DEPTH,
+            allow_cross_domain=False,  # Stay within same domains for each site
+            max_concurrent=MAX_CONCURRENT,
+            session=session,
         )
+        if runner is None:
+            new_docs, total_discovered = asyncio.run(crawl)
+        else:
+            new_docs, total_discovered = runner.run(crawl)
 
-        print("\\nReddit scraping complete!")
-        print(f"- Found {len(all_urls)} URLs in Reddit posts")
-        print(f"- Processed {len(filtered_urls)} URLs after filtering")
-        print(f"- Discovered {total_discovered} total URLs with depth {DISCOVER_DEPTH}")
-        print(f"- Added {new_docs} new documents to database")
+        logger.info("Reddit scraping complete!")
+        logger.info("- Found %d URLs in Reddit posts", len(all_urls))
+        logger.info("- Processed %d URLs after filtering", len(filtered_urls))
+        logger.info("- Discovered %s total URLs with depth %s", total_discovered, DISCOVER_DEPTH)
+        logger.info("- Added %s new documents to database", new_docs)
 
         return len(all_urls), new_docs, next_after
 
     except Exception as e:
-        print(f"Error during scraping: {e}")
+        logger.error("Error during scraping: %s", e)
         return len(all_urls), 0, next_after
-    finally:
-        # Clean up temp file
-        try:
-            import os
-
-            os.remove(temp_links_file)
-        except Exception:
-            pass
 
 
 def scrape_reddit_continuous(subreddit, db_path, max_pages=DEFAULT_PAGES, random_dates=True):
@@ -298,31 +351,39 @@ def scrape_reddit_continuous(subreddit, db_path, max_pages=DEFAULT_PAGES, random
     Returns:
         dict: Summary statistics
     """
-    print(f"🚀 Starting high-speed scraping of r/{subreddit}")
-    print(f"Random date exploration: {'enabled' if random_dates else 'disabled'}")
-    print(f"Link discovery depth: {DISCOVER_DEPTH}")
-    print(f"Concurrent requests: {MAX_CONCURRENT}")
-    print(f"API call delay: {DEFAULT_DELAY}s")
-    print(f"Max pages: {max_pages}")
-    print("-" * 60)
+    logger.info("🚀 Starting high-speed scraping of r/%s", subreddit)
+    logger.info("Random date exploration: %s", "enabled" if random_dates else "disabled")
+    logger.info("Link discovery depth: %s", DISCOVER_DEPTH)
+    logger.info("Concurrent requests: %s", MAX_CONCURRENT)
+    logger.info("API call delay: %ss", DEFAULT_DELAY)
+    logger.info("Max pages: %s", max_pages)
+    logger.info("-" * 60)
 
     total_reddit_urls = 0
     total_new_docs = 0
     page_count = 0
     after_token = None
+    seen_urls = set()
+
+    # One event loop and connection pool for every page, so keep-alive connections
+    # and the DNS cache survive between batches
+    runner = asyncio.Runner()
+    session = runner.run(open_scraper_session())
 
     try:
         while True:
             page_count += 1
-            print(f"\n=== PAGE {page_count} ===")
+            logger.info("=== PAGE %s ===", page_count)
 
             # Determine sort method and time filter
             if random_dates:
                 current_sort, current_time_filter = get_random_sort_and_time()
                 if current_time_filter:
-                    print(f"🎲 Random selection: {current_sort} (time: {current_time_filter})")
+                    logger.info(
+                        "🎲 Random selection: %s (time: %s)", current_sort, current_time_filter
+                    )
                 else:
-                    print(f"🎲 Random selection: {current_sort}")
+                    logger.info("🎲 Random selection: %s", current_sort)
                 # Reset after_token when changing sort method to start fresh
                 after_token = None
             else:
@@ -336,6 +397,9 @@ def scrape_reddit_continuous(subreddit, db_path, max_pages=DEFAULT_PAGES, random
                 after=after_token,
                 sort=current_sort,
                 time_filter=current_time_filter,
+                seen_urls=seen_urls,
+                runner=runner,
+                session=session,
             )
 
             # Update totals
@@ -344,32 +408,35 @@ def scrape_reddit_continuous(subreddit, db_path, max_pages=DEFAULT_PAGES, random
 
             # Check if we're done
             if not next_after or page_count >= max_pages:
-                print("\\nReached end of available posts or max pages limit")
+                logger.info("Reached end of available posts or max pages limit")
                 break
 
             after_token = next_after
 
             # Print progress
-            print(f"\\nProgress after page {page_count}:")
-            print(f"- Total Reddit URLs found: {total_reddit_urls}")
-            print(f"- Total new documents added: {total_new_docs}")
+            logger.info("Progress after page %s:", page_count)
+            logger.info("- Total Reddit URLs found: %s", total_reddit_urls)
+            logger.info("- Total new documents added: %s", total_new_docs)
 
             # Respectful delay between API calls
-            print(f"Waiting {DEFAULT_DELAY}s before next page...")
+            logger.info("Waiting %ss before next page...", DEFAULT_DELAY)
             time.sleep(DEFAULT_DELAY)
 
     except KeyboardInterrupt:
-        print("\\n\\nScraping interrupted by user (Ctrl+C)")
+        logger.info("Scraping interrupted by user (Ctrl+C)")
     except Exception as e:
-        print(f"\\n\\nError during continuous scraping: {e}")
+        logger.error("Error during continuous scraping: %s", e)
+    finally:
+        runner.run(session.close())
+        runner.close()
 
     # Final summary
-    print("\\n" + "=" * 50)
-    print("FINAL SUMMARY")
-    print("=" * 50)
-    print(f"Pages processed: {page_count}")
-    print(f"Total Reddit URLs found: {total_reddit_urls}")
-    print(f"Total new documents added: {total_new_docs}")
+    logger.info("=" * 50)
+    logger.info("FINAL SUMMARY")
+    logger.info("=" * 50)
+    logger.info("Pages processed: %s", page_count)
+    logger.info("Total Reddit URLs found: %s", total_reddit_urls)
+    logger.info("Total new documents added: %s", total_new_docs)
 
     # Get final database count
     try:
@@ -377,7 +444,7 @@ def scrape_reddit_continuous(subreddit, db_path, max_pages=DEFAULT_PAGES, random
         import sqlite3
 
         if not os.path.exists(db_path):
-            print(f"Database file {db_path} does not exist")
+            logger.info("Database file %s does not exist", db_path)
         else:
             conn = sqlite3.connect(db_path)
             cursor = conn.cursor()
@@ -386,13 +453,13 @@ def scrape_reddit_continuous(subreddit, db_path, max_pages=DEFAULT_PAGES, random
             if cursor.fetchone():
                 cursor.execute("SELECT COUNT(*) FROM documents")
                 final_count = cursor.fetchone()[0]
-                print(f"Final database size: {final_count} documents")
+                logger.info("Final database size: %s documents", final_count)
             else:
-                print("Documents table not found - need to initialize database")
-                print("Run: python init_db.py")
+                logger.info("Documents table not found - need to initialize database")
+                logger.info("Run: python init_db.py")
             conn.close()
     except Exception as e:
-        print(f"Could not get final database count: {e}")
+        logger.error("Could not get final database count: %s", e)
 
     return {
         "pages_processed": page_count,
@@ -404,6 +471,8 @@ def scrape_reddit_continuous(subreddit, db_path, max_pages=DEFAULT_PAGES, random
 if __name__ == "__main__":
     import argparse
 
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
     parser = argparse.ArgumentParser(
         description="🚀 High-speed Reddit scraper for discovering hidden gems",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -450,11 +519,16 @@ Configuration:
     args = parser.parse_args()
 
     if args.continuous:
-        print("🔄 Running in CONTINUOUS mode")
-        scrape_reddit_continuous(
+        logger.info("🔄 Running in CONTINUOUS mode")
+        summary = scrape_reddit_continuous(
             args.subreddit, args.db_path, args.max_pages, random_dates=not args.no_random_dates
         )
+        new_docs = summary["new_documents_added"]
     else:
-        print("⚡ Running SINGLE BATCH mode")
+        logger.info("⚡ Running SINGLE BATCH mode")
         reddit_urls, new_docs, _ = scrape_reddit_batch(args.subreddit, args.db_path)
-        print(f"\nQuick batch complete: {new_docs} documents added")
+        logger.info("Quick batch complete: %s documents added", new_docs)
+
+    # One full index rewrite per run; each page's crawl only merges incrementally
+    if new_docs > 0:
+        optimize_search_index(args.db_path)
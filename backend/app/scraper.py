@@ -5,69 +5,318 @@ Supports both synchronous and asynchronous concurrent scraping.
 """
 
 import asyncio
+import contextlib
+import hashlib
+import heapq
+import itertools
 import json
+import logging
+import multiprocessing
+import os
+import re
 import sqlite3
 import time
-from urllib.parse import urljoin, urlparse
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from urllib.parse import urljoin, urlparse, urlunparse
 
 import aiohttp
+import lxml.html
 import requests
 import trafilatura
 import urllib3
-from bs4 import BeautifulSoup
 from newspaper import Article
+from trafilatura.settings import use_config
+
+logger = logging.getLogger(__name__)
 
 # Suppress SSL warnings to reduce noise
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 # Constants
 DEFAULT_USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+DEFAULT_HEADERS = {"User-Agent": DEFAULT_USER_AGENT}
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=15)
+SYNC_REQUEST_TIMEOUT = 15  # Seconds, for the sequential (requests) scrapers
+HTTP_POOL_HOSTS = 100  # Hosts whose keep-alive connections the sync session holds on to
+SYNC_HOST_INTERVAL = 0.1  # Seconds between pages from the same host in the sequential crawler
+MAX_PER_HOST = 6  # In-flight requests per host, on top of the global concurrency cap
+HOST_RATE_LIMIT = float(os.getenv("HOST_RATE_LIMIT", "2"))  # Sustained requests/second per host
+MAX_RETRIES = 3  # Retries for rate-limited (429/503) responses
+MAX_RETRY_DELAY = 30  # Upper bound on any single backoff (seconds)
+RETRY_STATUSES = frozenset({429, 503})
+INSERT_BATCH_SIZE = 100  # Documents buffered before each bulk insert in the sync scraper
+URL_LOOKUP_BATCH_SIZE = 500  # URLs per IN (...) lookup, below SQLite's 999 parameter limit
+SEARCH_INDEX_MERGE_PAGES = 500  # Leaf pages one incremental FTS5 merge may write after a crawl
+
+# Connection settings for scraper writes: WAL lets the API keep reading while we write,
+# with a 64 MB page cache and memory-mapped reads for the existence checks and FTS merges
+WRITE_TIMEOUT = 60  # Seconds to wait for the write lock before raising "database is locked"
+WRITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA mmap_size=268435456",
+)
+
+# Worker processes for page extraction and link parsing, which are CPU-bound Python
+# that holds the GIL
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", "0")) or os.cpu_count() or 1
+
+# Trafilatura settings are read once and shared by every extraction call
+TRAFILATURA_CONFIG = use_config()
+
+# Decoded (str) pages are re-encoded as UTF-8 for lxml, which rejects str input that
+# carries an XML encoding declaration
+UTF8_HTML_PARSER = lxml.html.HTMLParser(encoding="utf-8")
+
+# Links to assets and account/legal pages carry no content worth indexing
+SKIP_EXTENSION_PATTERN = re.compile(
+    r"\.(?:pdf|jpe?g|png|gif|webp|svg|ico|css|js|woff2?"
+    r"|zip|rar|7z|gz|mp3|mp4|mov|webm|m3u8|exe|dmg)"
+    r"(?:$|[?#])",
+    re.IGNORECASE,
+)
+SKIP_PATH_PATTERN = re.compile(
+    r"/(?:login|signin|signup|register|logout|privacy|terms)(?:/|$)", re.IGNORECASE
+)
+
+# Responses are checked before their body is read; anything else is dropped unread
+TEXT_CONTENT_TYPES = ("html", "text/plain")
+MAX_CONTENT_LENGTH = 2 * 1024 * 1024
+
+# Crawl frontier: each depth keeps only the best-scoring new links. The sequential
+# crawler uses a fixed cap; the concurrent one keeps FRONTIER_PER_WORKER per request slot.
+MAX_FRONTIER_SIZE = 200
+FRONTIER_PER_WORKER = 4
+MAX_ANCHOR_WORDS = 8  # Longer anchor text earns no further bonus
+PAGINATION_PATTERN = re.compile(r"(/page/|[?&]page=)(\d+)")
+
+
+@lru_cache(maxsize=16384)
+def parse_url(url):
+    """
+    Parse a URL, caching results.
 
+    The same URLs are parsed repeatedly: site-wide navigation links show up on every
+    crawled page, and discovered URLs are parsed again for per-host limiting.
 
-def fetch_and_parse(url):
+    Args:
+        url: URL to parse
+
+    Returns:
+        ParseResult: Parsed URL
     """
-    Fetch and parse content from a URL using Trafilatura for superior text extraction.
+    return urlparse(url)
+
+
+def normalize_url(url):
+    """
+    Normalize a URL for deduplication.
+
+    Variants that reach the same page (fragment, trailing slash, host case) map
+    to a single key, so the crawler fetches each page once.
+
+    Args:
+        url: Absolute URL
+
+    Returns:
+        str: URL with a lowercase host, no fragment and no trailing slash
+    """
+    parsed = parse_url(url)
+    path = parsed.path.rstrip("/") or "/"
+    return urlunparse((parsed.scheme, parsed.netloc.lower(), path, parsed.params, parsed.query, ""))
+
+
+def url_fingerprint(url):
+    """
+    Compact fingerprint of a normalized URL for the crawl's seen-URL sets.
+
+    A 64-bit int takes a fraction of the memory of the URL string it replaces,
+    and collisions are negligible at crawl scale (about one in 10^19 per pair).
+
+    Args:
+        url: Normalized URL
+
+    Returns:
+        int: 64-bit fingerprint
+    """
+    return int.from_bytes(hashlib.blake2b(url.encode(), digest_size=8).digest(), "big")
+
+
+def next_page_url(url):
+    """
+    Guess the next page of a paginated listing (/page/2 -> /page/3, ?page=2 -> ?page=3).
+
+    Args:
+        url: URL that may contain a page number
+
+    Returns:
+        str: URL of the following page, or None if the URL isn't paginated
+    """
+    match = PAGINATION_PATTERN.search(url)
+    if not match:
+        return None
+    return f"{url[:match.start(2)]}{int(match.group(2)) + 1}{url[match.end(2):]}"
+
+
+def score_link(url, anchor_text):
+    """
+    Estimate how likely a discovered link is to lead to a content page.
+
+    Navigation and footer links have one or two word anchors ("Home", "About"),
+    while links to articles usually carry the article's title. Deep paths and
+    query strings make a link less likely to be worth fetching.
+
+    Args:
+        url: Normalized URL
+        anchor_text: Text of the link pointing at the URL
+
+    Returns:
+        int: Higher scores are crawled first
+    """
+    parsed = parse_url(url)
+    path_depth = len([segment for segment in parsed.path.split("/") if segment])
+    anchor_words = min(len(anchor_text.split()), MAX_ANCHOR_WORDS)
+    return 2 * anchor_words - path_depth - (1 if parsed.query else 0)
+
+
+def merge_links(links, new_links):
+    """
+    Merge discovered links into a URL -> anchor text map, keeping the longest anchor.
+
+    Args:
+        links: Map of URL to anchor text, updated in place
+        new_links: Map of URL to anchor text to merge in
+    """
+    for url, anchor_text in new_links.items():
+        if url not in links or len(anchor_text) > len(links[url]):
+            links[url] = anchor_text
+
+
+def build_frontier(links, seen_urls, limit):
+    """
+    Pick the next crawl level from the links discovered on the current one.
+
+    Links to paginated listings are augmented with their following page. Unseen
+    links are then ranked by score_link and only the top `limit` are kept, so a
+    page full of navigation links can't crowd out deeper content.
+
+    Args:
+        links: Map of discovered URL to anchor text
+        seen_urls: url_fingerprint values of URLs already scheduled, updated with
+            the selected URLs
+        limit: Maximum number of URLs to return
+
+    Returns:
+        list: URLs to crawl next, best first
+    """
+    candidates = {
+        url: anchor_text
+        for url, anchor_text in links.items()
+        if url_fingerprint(url) not in seen_urls
+    }
+    for url in list(candidates):
+        next_url = next_page_url(url)
+        if next_url and url_fingerprint(next_url) not in seen_urls:
+            candidates.setdefault(next_url, candidates[url])
+
+    frontier = heapq.nlargest(limit, candidates, key=lambda url: score_link(url, candidates[url]))
+    seen_urls.update(url_fingerprint(url) for url in frontier)
+    return frontier
+
+
+# Shared HTTP session (lazy initialization) so sequential fetches reuse connections
+_http_session: requests.Session | None = None
+
+
+def get_http_session():
+    """
+    Get or create the HTTP session shared by the sequential scrapers.
+
+    Returns:
+        requests.Session: Keep-alive session with the default headers set
+    """
+    global _http_session
+    if _http_session is None:
+        _http_session = requests.Session()
+        _http_session.headers.update(DEFAULT_HEADERS)
+        _http_session.verify = False
+        adapter = requests.adapters.HTTPAdapter(pool_connections=HTTP_POOL_HOSTS)
+        _http_session.mount("http://", adapter)
+        _http_session.mount("https://", adapter)
+    return _http_session
+
+
+def read_capped_content(response):
+    """
+    Read at most MAX_CONTENT_LENGTH bytes of a streamed requests response body.
+
+    Args:
+        response: requests.Response fetched with stream=True
+
+    Returns:
+        bytes: The (possibly truncated) body
+    """
+    body = bytearray()
+    for chunk in response.iter_content(chunk_size=64 * 1024):
+        body += chunk
+        if len(body) >= MAX_CONTENT_LENGTH:
+            break
+    return bytes(body[:MAX_CONTENT_LENGTH])
+
+
+def fetch_body(url):
+    """
+    GET a URL through the shared session, like fetch_body_async does with aiohttp.
+
+    The response is streamed and the body only read when is_text_response() accepts
+    the headers, so PDFs, videos and other large downloads are dropped unread.
+
+    Args:
+        url: URL to fetch
+
+    Returns:
+        tuple: (content_type, encoding, body) or None if the request did not succeed
+        or the response isn't text
+    """
+    # The shared session reuses keep-alive connections, so repeat hosts skip the handshake
+    with get_http_session().get(url, timeout=SYNC_REQUEST_TIMEOUT, stream=True) as response:
+        if response.status_code != 200 or not is_text_response(response.headers):
+            return None
+        content_type = response.headers.get("content-type", "").lower()
+        return content_type, response.encoding, read_capped_content(response)
+
+
+def fetch_and_parse_page(url):
+    """
+    Fetch a URL once and extract its content, keeping the HTML for link discovery.
 
     Args:
         url: The URL to fetch and parse
 
     Returns:
-        tuple: (title, content) or (None, None) if failed
+        tuple: (title, content, html_content); title and content are None if nothing
+        could be extracted, html_content is the raw HTML bytes or None unless an HTML
+        page was fetched
     """
     try:
-        # First, download the content with custom headers
-        headers = {"User-Agent": DEFAULT_USER_AGENT}
-        downloaded = trafilatura.fetch_url(url, headers=headers, timeout=15)
-        if not downloaded:
-            return None, None
-
-        # Extract main text content with metadata
-        content = trafilatura.extract(downloaded, include_comments=False, include_tables=True)
-        if not content or len(content.strip()) < 50:
-            return None, None
-
-        # Extract title metadata
-        metadata = trafilatura.extract_metadata(downloaded)
-        title = None
-        if metadata:
-            title = metadata.title or metadata.sitename
-
-        # Fallback title extraction if metadata doesn't provide one
-        if not title:
-            # Try to extract title from HTML using BeautifulSoup
-            try:
-                soup = BeautifulSoup(downloaded, "html.parser")
-                title_elem = soup.find("title")
-                if title_elem:
-                    title = title_elem.get_text().strip()
-            except Exception:
-                pass
+        fetched = fetch_body(url)
+        if fetched is None:
+            return None, None, None
 
-        # Final fallback for title
-        if not title:
-            title = f"Content from {urlparse(url).netloc}"
+        content_type, encoding, html_content = fetched
 
-        return title, content.strip()
+        # Plain text files are stored as-is
+        if "text/plain" in content_type:
+            text = html_content.decode(encoding or "utf-8", errors="replace")
+            title, content = parse_plain_text(url, text)
+            return title, content, None
+
+        title, content = extract_document(html_content, url)
+        return title, content, html_content
 
     except Exception:
         # Fallback to newspaper3k for structured articles
@@ -77,235 +326,569 @@ def fetch_and_parse(url):
             article.parse()
 
             if article.title and article.text and len(article.text.strip()) > 50:
-                return article.title, article.text
+                return article.title, article.text, None
         except Exception:
             pass
 
-        # Final fallback: handle plain text files
-        try:
-            headers = {"User-Agent": DEFAULT_USER_AGENT}
-            response = requests.get(url, headers=headers, timeout=15, verify=False)
-            response.raise_for_status()
+    return None, None, None
 
-            content_type = response.headers.get("content-type", "").lower()
 
-            if "text/plain" in content_type:
-                content = response.text.strip()
-                if len(content) > 50:
-                    filename = url.split("/")[-1]
-                    title = filename if filename else f"Text from {urlparse(url).netloc}"
-                    return title, content
+def fetch_and_parse(url):
+    """
+    Fetch and parse content from a URL using Trafilatura for superior text extraction.
 
-        except Exception:
-            # Silently handle errors to reduce noise
-            pass
+    Args:
+        url: The URL to fetch and parse
 
-    return None, None
+    Returns:
+        tuple: (title, content) or (None, None) if failed
+    """
+    title, content, _ = fetch_and_parse_page(url)
+    return title, content
+
+
+def parse_plain_text(url, text):
+    """
+    Turn a plain text response into a document.
+
+    Args:
+        url: URL the text was fetched from
+        text: Response body
+
+    Returns:
+        tuple: (title, content) or (None, None) if the text is too short
+    """
+    content = text.strip()
+    if len(content) <= 50:
+        return None, None
+
+    filename = url.split("/")[-1]
+    title = filename if filename else f"Text from {parse_url(url).netloc}"
+    return title, content
+
+
+def create_scraper_session(max_concurrent):
+    """
+    Create the aiohttp session shared by the concurrent scrapers.
+
+    Headers, timeout and TLS settings are set once here rather than passed with
+    every request.
+
+    Args:
+        max_concurrent: Maximum concurrent requests
+
+    Returns:
+        aiohttp.ClientSession: Session with a pooled, DNS-caching connector
+    """
+    connector = aiohttp.TCPConnector(
+        limit=max_concurrent * 2,
+        limit_per_host=10,
+        ttl_dns_cache=300,
+        keepalive_timeout=30,
+        enable_cleanup_closed=True,
+        ssl=False,
+    )
+    return aiohttp.ClientSession(
+        connector=connector, headers=DEFAULT_HEADERS, timeout=REQUEST_TIMEOUT
+    )
+
+
+def new_host_semaphores():
+    """
+    Create a per-host semaphore map for the concurrent scrapers.
+
+    Returns:
+        defaultdict: netloc -> asyncio.Semaphore(MAX_PER_HOST), created on first use
+    """
+    return defaultdict(lambda: asyncio.Semaphore(MAX_PER_HOST))
+
+
+def host_limit(host_semaphores, url):
+    """
+    Get the context manager limiting in-flight requests to a URL's host.
+
+    Args:
+        host_semaphores: Map from new_host_semaphores(), or None for no per-host cap
+        url: URL about to be fetched
+
+    Returns:
+        Async context manager holding a slot for the host
+    """
+    if host_semaphores is None:
+        return contextlib.nullcontext()
+    return host_semaphores[parse_url(url).netloc]
+
+
+class HostRateLimiter:
+    """Token bucket per host: bursts of MAX_PER_HOST, refilled at HOST_RATE_LIMIT per second."""
+
+    def __init__(self, rate=HOST_RATE_LIMIT, burst=MAX_PER_HOST):
+        """
+        Initialize the limiter.
+
+        Args:
+            rate: Tokens added to each host's bucket per second
+            burst: Bucket capacity, i.e. requests a host can take back to back
+        """
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}  # netloc -> (tokens, last_refill)
+
+    async def acquire(self, url):
+        """
+        Wait until a request to the URL's host is allowed, then take a token.
+
+        Args:
+            url: URL about to be fetched
+        """
+        host = parse_url(url).netloc
+        while True:
+            now = time.monotonic()
+            tokens, last_refill = self._buckets.get(host, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last_refill) * self.rate)
+            if tokens >= 1:
+                self._buckets[host] = (tokens - 1, now)
+                return
+            self._buckets[host] = (tokens, now)
+            await asyncio.sleep((1 - tokens) / self.rate)
+
+    def backoff(self, url, delay):
+        """
+        Empty a host's bucket and hold off refilling it, e.g. after a 429.
+
+        Every request to the host waits, not just the one that was rate limited.
+
+        Args:
+            url: URL whose host asked us to slow down
+            delay: Seconds before the bucket starts refilling
+        """
+        self._buckets[parse_url(url).netloc] = (0.0, time.monotonic() + delay)
+
+
+def get_retry_delay(headers, attempt):
+    """
+    Work out how long to wait before retrying a rate-limited response.
+
+    Honors Retry-After, then X-RateLimit-Reset once the quota is exhausted, and
+    otherwise falls back to exponential backoff.
+
+    Args:
+        headers: Response headers
+        attempt: Zero-based retry attempt
+
+    Returns:
+        float: Seconds to sleep, capped at MAX_RETRY_DELAY
+    """
+    delay = 2**attempt
+    retry_after = headers.get("Retry-After")
+    reset = headers.get("X-RateLimit-Reset")
+    try:
+        if retry_after is not None:
+            delay = float(retry_after)
+        elif reset is not None and headers.get("X-RateLimit-Remaining") == "0":
+            delay = float(reset)
+    except ValueError:
+        pass
+    return min(max(delay, 0), MAX_RETRY_DELAY)
+
+
+def is_text_response(headers):
+    """
+    Check response headers for a body worth downloading.
+
+    Args:
+        headers: Response headers
+
+    Returns:
+        bool: False for non-text content types or bodies over MAX_CONTENT_LENGTH
+    """
+    content_type = headers.get("content-type", "").lower()
+    if content_type and not any(text_type in content_type for text_type in TEXT_CONTENT_TYPES):
+        return False
+
+    content_length = headers.get("content-length", "")
+    return not content_length.isdigit() or int(content_length) <= MAX_CONTENT_LENGTH
+
+
+async def read_capped_body(response):
+    """
+    Read at most MAX_CONTENT_LENGTH bytes of a response body.
+
+    Servers don't always send Content-Length, so the cap is enforced while reading;
+    anything past it is left unread and dropped with the connection.
+
+    Args:
+        response: aiohttp.ClientResponse
+
+    Returns:
+        bytes: The (possibly truncated) body
+    """
+    body = bytearray()
+    while len(body) < MAX_CONTENT_LENGTH:
+        chunk = await response.content.read(MAX_CONTENT_LENGTH - len(body))
+        if not chunk:
+            break
+        body += chunk
+    return bytes(body)
+
+
+async def fetch_body_async(session, url, rate_limiter=None):
+    """
+    GET a URL, retrying rate-limited responses with backoff.
+
+    The body is only read when is_text_response() accepts the headers, so PDFs,
+    videos and other large downloads are abandoned after the status line. It is
+    returned as raw bytes; HTML parsers detect the encoding themselves.
+
+    Args:
+        session: aiohttp.ClientSession
+        url: URL to fetch
+        rate_limiter: HostRateLimiter to pace requests and back off with (optional)
+
+    Returns:
+        tuple: (content_type, charset, body) or None if the request did not succeed;
+        charset is None when the Content-Type header doesn't name one
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        if rate_limiter is not None:
+            await rate_limiter.acquire(url)
+        async with session.get(url) as response:
+            if response.status == 200:
+                if not is_text_response(response.headers):
+                    return None
+                content_type = response.headers.get("content-type", "").lower()
+                return content_type, response.charset, await read_capped_body(response)
+            if response.status not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                return None
+            delay = get_retry_delay(response.headers, attempt)
+
+        # With a limiter, the next acquire() waits out the backoff for the whole host
+        if rate_limiter is not None:
+            rate_limiter.backoff(url, delay)
+        else:
+            await asyncio.sleep(delay)
+
+    return None
+
+
+def iter_links(links):
+    """
+    Stream starter URLs from a file, or from URLs already in memory.
+
+    Files may hold a JSON array, which is loaded whole, or JSON Lines / plain text
+    with one URL per line, which is read lazily so large seed lists never sit in
+    memory at once.
+
+    Args:
+        links: Path to a links file, or an iterable of URLs
+
+    Yields:
+        str: Each URL
+    """
+    if not isinstance(links, str | os.PathLike):
+        yield from links
+        return
+
+    with open(links) as file:
+        first_line = file.readline()
+        if first_line.lstrip().startswith("["):
+            yield from json.loads(first_line + file.read())
+            return
+
+        for line in itertools.chain([first_line], file):
+            line = line.strip()
+            if line:
+                yield json.loads(line) if line.startswith('"') else line
+
+
+def load_links(links):
+    """
+    Load starter URLs from a links file, or pass through URLs already in memory.
+
+    Args:
+        links: Path to a links file (see iter_links), or an iterable of URLs
+
+    Returns:
+        list: List of URLs
+    """
+    return list(iter_links(links))
 
 
 def scrape_links_to_database(links_file, db_path):
     """
-    Scrape links from JSON file and store in database.
+    Scrape links from a links file and store in database.
 
     Args:
-        links_file: Path to JSON file containing URLs
+        links_file: Path to a JSON array or JSON Lines file of URLs
         db_path: Path to SQLite database
 
     Returns:
         int: Number of new documents added
     """
-    # Read links from JSON file
-    with open(links_file) as file:
-        links = json.load(file)
-
     # Connect to database
-    conn = sqlite3.connect(db_path)
+    conn = connect_for_writing(db_path)
     cursor = conn.cursor()
 
-    # Get existing URLs from the database
-    cursor.execute("SELECT url FROM documents")
-    existing_urls = {row[0] for row in cursor.fetchall()}
-
-    # Process new links
-    new_count = 0
-    for url in links:
-        if url not in existing_urls:
+    # Process new links, checking the url index instead of preloading every URL
+    rows = []
+    for url in iter_links(links_file):
+        cursor.execute("SELECT 1 FROM documents WHERE url = ?", (url,))
+        if cursor.fetchone() is None:
             title, content = fetch_and_parse(url)
             if title and content:
-                # Insert into documents table
-                cursor.execute(
-                    "INSERT INTO documents (url, title, content) VALUES (?, ?, ?)",
-                    (url, title, content),
-                )
+                rows.append((url, title, content))
 
-                # Insert into FTS5 table
-                document_id = cursor.lastrowid
-                cursor.execute(
-                    "INSERT INTO document_content (document_id, content) VALUES (?, ?)",
-                    (document_id, content),
-                )
-
-                new_count += 1
-
-    conn.commit()
+    new_count = bulk_insert_documents(conn, rows)
     conn.close()
 
     if new_count > 0:
-        print(f"Added {new_count} new documents to {db_path}")
+        logger.info("Added %s new documents to %s", new_count, db_path)
     else:
-        print("No new documents to add.")
+        logger.info("No new documents to add.")
 
     return new_count
 
 
 def discover_links(url, same_domain_only=True):
     """
-    Discover links from a given URL using BeautifulSoup.
+    Discover links from a given URL.
 
     Args:
         url: The URL to discover links from
         same_domain_only: If True, only return links from the same domain
 
     Returns:
-        set: Set of discovered URLs
+        dict: Discovered URLs mapped to their anchor text
     """
-    discovered_urls = set()
+    discovered_urls = {}
 
     try:
-        headers = {"User-Agent": DEFAULT_USER_AGENT}
-        response = requests.get(url, headers=headers, timeout=15, verify=False)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, "html.parser")
+        fetched = fetch_body(url)
+        if fetched is not None:
+            discovered_urls = parse_links_from_html(fetched[2], url, same_domain_only)
 
-        base_domain = urlparse(url).netloc
+    except Exception:
+        # Silently handle common errors to reduce noise
+        pass
 
-        for link in soup.find_all("a", href=True):
-            href = link["href"]
+    return discovered_urls
 
-            # Convert relative URLs to absolute
-            absolute_url = urljoin(url, href)
 
-            # Parse the URL
-            parsed = urlparse(absolute_url)
+def connect_for_writing(db_path, check_same_thread=True):
+    """
+    Open a SQLite connection tuned for bulk writes.
 
-            # Skip invalid URLs
-            if not parsed.scheme or not parsed.netloc:
-                continue
+    Args:
+        db_path: Path to SQLite database
+        check_same_thread: Passed to sqlite3.connect; False lets one task hand the
+            connection to successive worker threads
 
-            # Skip non-HTTP(S) URLs
-            if parsed.scheme not in ["http", "https"]:
-                continue
+    Returns:
+        sqlite3.Connection: Connection with WRITE_PRAGMAS applied
+    """
+    conn = sqlite3.connect(db_path, timeout=WRITE_TIMEOUT, check_same_thread=check_same_thread)
+    for pragma in WRITE_PRAGMAS:
+        conn.execute(pragma)
+    return conn
 
-            # Check domain restriction
-            if same_domain_only and parsed.netloc != base_domain:
-                continue
 
-            # Skip common non-content URLs
-            if any(
-                ext in absolute_url.lower()
-                for ext in [".pdf", ".jpg", ".png", ".gif", ".css", ".js"]
-            ):
-                continue
+def get_last_document_id(conn):
+    """
+    Get the highest document id, or 0 for an empty table.
 
-            discovered_urls.add(absolute_url)
+    Args:
+        conn: Open sqlite3 connection
 
-    except Exception:
-        # Silently handle common errors to reduce noise
-        pass
+    Returns:
+        int: Highest id in documents
+    """
+    return conn.execute("SELECT COALESCE(MAX(id), 0) FROM documents").fetchone()[0]
 
-    return discovered_urls
 
+def index_documents(conn, after_id):
+    """
+    Add every document with an id above after_id to the FTS5 index.
+
+    AUTOINCREMENT ids only grow, so these are exactly the documents inserted since
+    after_id was read. Runs inside the caller's transaction.
+
+    Args:
+        conn: Open sqlite3 connection
+        after_id: get_last_document_id() from before the inserts
+
+    Returns:
+        int: Number of documents indexed
+    """
+    cursor = conn.execute(
+        "INSERT INTO document_content (rowid, content) "
+        "SELECT id, content FROM documents WHERE id > ? ORDER BY id",
+        (after_id,),
+    )
+    return cursor.rowcount
 
-def get_existing_urls(db_path):
+
+def bulk_insert_documents(conn, rows, index=True):
     """
-    Get all existing URLs from the database.
+    Insert documents and index them for full-text search in a single transaction.
+
+    Documents are written with one executemany, then the new rows are indexed with
+    one INSERT ... SELECT, so the index is updated in bulk rather than once per
+    document. document_content is an external-content FTS5 table, so this only
+    adds index entries; the text itself is stored once, in documents. URLs that
+    already exist are skipped.
 
     Args:
-        db_path: Path to SQLite database
+        conn: Open sqlite3 connection
+        rows: List of (url, title, content) tuples
+        index: Index the new documents now; bulk crawls pass False and call
+            index_deferred_documents() once at the end
 
     Returns:
-        set: Set of existing URLs
+        int: Number of documents inserted
     """
-    conn = sqlite3.connect(db_path)
+    if not rows:
+        return 0
+
     cursor = conn.cursor()
-    cursor.execute("SELECT url FROM documents")
-    existing_urls = {row[0] for row in cursor.fetchall()}
-    conn.close()
-    return existing_urls
+    try:
+        if not conn.in_transaction:
+            cursor.execute("BEGIN IMMEDIATE")
 
+        last_id = get_last_document_id(conn)
+        cursor.executemany(
+            "INSERT OR IGNORE INTO documents (url, title, content) VALUES (?, ?, ?)", rows
+        )
+        inserted_count = cursor.rowcount
+        if index:
+            index_documents(conn, last_id)
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
 
-def insert_document_if_new(url, title, content, db_path, existing_urls):
+    return inserted_count
+
+
+def index_deferred_documents(conn, after_id):
     """
-    Insert a document into the database if it's new.
+    Index the documents a bulk crawl inserted with index=False, in one pass.
+
+    Tokenizing everything at the end keeps the crawl's write transactions short
+    and lets FTS5 build large index segments instead of many small ones. The
+    crawl must be the only writer, or rows another scraper already indexed
+    would be indexed twice.
 
     Args:
-        url: Document URL
-        title: Document title
-        content: Document content
-        db_path: Path to SQLite database
-        existing_urls: Set of existing URLs
+        conn: Open sqlite3 connection from connect_for_writing()
+        after_id: get_last_document_id() from before the crawl started
 
     Returns:
-        bool: True if document was inserted, False if it already existed
+        int: Number of documents indexed
     """
-    if url in existing_urls:
-        return False
+    try:
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+        indexed_count = index_documents(conn, after_id)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
 
-    # Retry logic for database operations
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            conn = sqlite3.connect(db_path, timeout=30)
-            cursor = conn.cursor()
+    logger.info("Indexed %s documents for search", indexed_count)
+    return indexed_count
 
-            # Insert into documents table
-            cursor.execute(
-                "INSERT INTO documents (url, title, content) VALUES (?, ?, ?)",
-                (url, title, content),
-            )
 
-            # Insert into FTS5 table
-            document_id = cursor.lastrowid
-            cursor.execute(
-                "INSERT INTO document_content (document_id, content) VALUES (?, ?)",
-                (document_id, content),
-            )
+def merge_search_index(conn):
+    """
+    Run a bounded, incremental merge of FTS5 index segments.
 
-            conn.commit()
-            conn.close()
+    Unlike 'optimize', the 'merge' command writes at most SEARCH_INDEX_MERGE_PAGES
+    leaf pages, so its cost does not grow with the corpus and it is safe to run
+    after every crawl.
+
+    Args:
+        conn: Open sqlite3 connection from connect_for_writing()
+    """
+    conn.execute(
+        "INSERT INTO document_content(document_content, rank) VALUES ('merge', ?)",
+        (SEARCH_INDEX_MERGE_PAGES,),
+    )
+    conn.commit()
+
+
+def optimize_search_index(db_path):
+    """
+    Merge FTS5 index segments and refresh query planner statistics.
+
+    This rewrites the whole index, so it runs once at the end of a scraper run
+    rather than after each crawl (see merge_search_index).
+
+    Args:
+        db_path: Path to SQLite database
+    """
+    conn = connect_for_writing(db_path)
+    try:
+        conn.execute("INSERT INTO document_content(document_content) VALUES ('optimize')")
+        conn.execute("PRAGMA optimize")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def find_existing_urls(db_path, urls):
+    """
+    Find which of the given URLs are already stored in the database.
+
+    Only the candidate URLs are looked up, through the unique url index, in chunks
+    of URL_LOOKUP_BATCH_SIZE to stay under SQLite's bound-parameter limit.
+
+    Args:
+        db_path: Path to SQLite database
+        urls: Iterable of candidate URLs
+
+    Returns:
+        set: The candidate URLs that already have a document
+    """
+    urls = list(urls)
+    existing_urls = set()
+    conn = sqlite3.connect(db_path)
+    try:
+        for start in range(0, len(urls), URL_LOOKUP_BATCH_SIZE):
+            chunk = urls[start : start + URL_LOOKUP_BATCH_SIZE]
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(f"SELECT url FROM documents WHERE url IN ({placeholders})", chunk)
+            existing_urls.update(row[0] for row in rows)
+    finally:
+        conn.close()
+    return existing_urls
 
-            # Add to existing URLs set to prevent duplicates in this session
-            existing_urls.add(url)
-            return True
-
-        except sqlite3.IntegrityError:
-            # URL already exists - this is expected
-            if conn:
-                conn.close()
-            existing_urls.add(url)
-            return False
-        except sqlite3.OperationalError as e:
-            if conn:
-                conn.close()
-            if "database is locked" in str(e) and attempt < max_retries - 1:
-                time.sleep(1)  # Wait before retry
-                continue
-            else:
-                break
-        except Exception:
-            if conn:
-                conn.close()
-            break
 
-    return False
+def wait_for_host(last_fetch_by_host, url, interval=SYNC_HOST_INTERVAL):
+    """
+    Sleep until `interval` seconds have passed since the last fetch from url's host.
+
+    Args:
+        last_fetch_by_host: Map of host to time.monotonic() of its last fetch,
+            updated in place
+        url: URL about to be fetched
+        interval: Minimum seconds between fetches from one host
+    """
+    host = parse_url(url).netloc
+    last_fetch = last_fetch_by_host.get(host)
+    if last_fetch is not None:
+        delay = interval - (time.monotonic() - last_fetch)
+        if delay > 0:
+            time.sleep(delay)
+    last_fetch_by_host[host] = time.monotonic()
 
 
-def scrape_with_discovery(links_file, db_path, discover_depth=1, allow_cross_domain=False):
+def scrape_with_discovery(links, db_path, discover_depth=1, allow_cross_domain=False):
     """
     Scrape links with automated link discovery.
 
     Args:
-        links_file: Path to JSON file containing starter URLs
+        links: Path to a links file (see iter_links), or an iterable of URLs
         db_path: Path to SQLite database
         discover_depth: How many levels deep to discover links (default: 1)
         allow_cross_domain: Allow discovering links from different domains
@@ -313,71 +896,107 @@ def scrape_with_discovery(links_file, db_path, discover_depth=1, allow_cross_dom
     Returns:
         tuple: (new_documents_count, total_discovered_urls)
     """
-    # Read starter links from JSON file
-    with open(links_file) as file:
-        starter_links = json.load(file)
+    # Read starter links
+    starter_links = load_links(links)
 
-    # Get existing URLs from database
-    existing_urls = get_existing_urls(db_path)
+    # One connection for the whole crawl; documents are buffered and bulk inserted
+    conn = connect_for_writing(db_path)
+    pending_documents = []
 
     # Track discovered URLs and process queue
-    all_discovered_urls = set(starter_links)
+    all_discovered_urls = {url_fingerprint(normalize_url(url)) for url in starter_links}
     urls_to_process = list(starter_links)
     processed_urls = set()
+    last_fetch_by_host = {}
     new_documents_count = 0
 
     current_depth = 0
 
-    while current_depth < discover_depth and urls_to_process:
-        print(
-            f"Processing depth {current_depth + 1}/{discover_depth} ({len(urls_to_process)} URLs)"
-        )
+    # Flush whatever is buffered even if the crawl is interrupted
+    try:
+        while current_depth < discover_depth and urls_to_process:
+            logger.info(
+                "Processing depth %s/%s (%d URLs)",
+                current_depth + 1,
+                discover_depth,
+                len(urls_to_process),
+            )
 
-        next_level_urls = []
-        processed_in_batch = 0
+            level_links = {}
+            processed_in_batch = 0
 
-        for url in urls_to_process:
-            if url in processed_urls:
-                continue
+            for url in urls_to_process:
+                if url in processed_urls:
+                    continue
 
-            processed_urls.add(url)
-            processed_in_batch += 1
+                processed_urls.add(url)
+                processed_in_batch += 1
 
-            # Show progress every 20 URLs
-            if processed_in_batch % 20 == 0:
-                print(
-                    f"  Processed {processed_in_batch}/{len(urls_to_process)} URLs in this batch..."
-                )
+                # Show progress every 20 URLs
+                if processed_in_batch % 20 == 0:
+                    logger.info(
+                        "  Processed %s/%d URLs in this batch...",
+                        processed_in_batch,
+                        len(urls_to_process),
+                    )
 
-            # Try to scrape content from this URL
-            title, content = fetch_and_parse(url)
-            if title and content:
-                if insert_document_if_new(url, title, content, db_path, existing_urls):
-                    new_documents_count += 1
-                    print(f"✓ Added: {title[:60]}...")
+                # Only consecutive pages from the same host need spacing out
+                wait_for_host(last_fetch_by_host, url)
+
+                # One download serves both content extraction and link discovery
+                title, content, html_content = fetch_and_parse_page(url)
+                # Already-stored URLs are dropped by INSERT OR IGNORE at flush time
+                if title and content:
+                    pending_documents.append((url, title, content))
+                    logger.info("✓ Scraped: %s...", title[:60])
 
-            # Discover links from this URL for next depth level
-            if current_depth + 1 < discover_depth:
-                discovered = discover_links(url, same_domain_only=not allow_cross_domain)
-                for discovered_url in discovered:
-                    if discovered_url not in all_discovered_urls:
-                        all_discovered_urls.add(discovered_url)
-                        next_level_urls.append(discovered_url)
+                    if len(pending_documents) >= INSERT_BATCH_SIZE:
+                        new_documents_count += bulk_insert_documents(conn, pending_documents)
+                        pending_documents = []
 
-            # Small delay to be respectful
-            time.sleep(0.1)
+                # Discover links from this URL for next depth level
+                if current_depth + 1 < discover_depth and html_content:
+                    discovered = parse_links_from_html(
+                        html_content, url, same_domain_only=not allow_cross_domain
+                    )
+                    merge_links(level_links, discovered)
+
+            urls_to_process = build_frontier(level_links, all_discovered_urls, MAX_FRONTIER_SIZE)
+            current_depth += 1
 
-        urls_to_process = next_level_urls
-        current_depth += 1
+    finally:
+        new_documents_count += bulk_insert_documents(conn, pending_documents)
+        conn.close()
 
-    print("\nScraping complete!")
-    print(f"Discovered {len(all_discovered_urls)} total URLs")
-    print(f"Added {new_documents_count} new documents to database")
+    logger.info("Scraping complete!")
+    logger.info("Discovered %d total URLs", len(all_discovered_urls))
+    logger.info("Added %s new documents to database", new_documents_count)
 
     return new_documents_count, len(all_discovered_urls)
 
 
-async def fetch_and_parse_async(session, url, semaphore):
+_extraction_pool = None
+
+
+def get_extraction_pool():
+    """
+    Get or create the process pool used for content extraction and link parsing.
+
+    Worker processes are spawned rather than forked, since the pool is first
+    used from inside a running event loop with its own threads.
+
+    Returns:
+        ProcessPoolExecutor: Shared pool with EXTRACTION_WORKERS processes
+    """
+    global _extraction_pool
+    if _extraction_pool is None:
+        _extraction_pool = ProcessPoolExecutor(
+            max_workers=EXTRACTION_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _extraction_pool
+
+
+async def fetch_and_parse_async(session, url, semaphore, host_semaphores=None, rate_limiter=None):
     """
     Async version of fetch_and_parse using aiohttp.
 
@@ -385,112 +1004,116 @@ async def fetch_and_parse_async(session, url, semaphore):
         session: aiohttp.ClientSession
         url: URL to fetch
         semaphore: asyncio.Semaphore for rate limiting
+        host_semaphores: Per-host semaphore map from new_host_semaphores() (optional)
+        rate_limiter: HostRateLimiter pacing requests per host (optional)
 
     Returns:
-        tuple: (url, title, content) or (url, None, None) if failed
+        tuple: (url, title, content, html_content); title and content are None if
+        nothing could be extracted, html_content is the raw HTML bytes or None unless
+        an HTML page was fetched
     """
-    async with semaphore:
-        try:
-            headers = {"User-Agent": DEFAULT_USER_AGENT}
+    # Skip obvious binary links without making a request
+    if SKIP_EXTENSION_PATTERN.search(url):
+        return url, None, None, None
 
-            timeout = aiohttp.ClientTimeout(total=15)
-            async with session.get(url, headers=headers, timeout=timeout, ssl=False) as response:
-                if response.status != 200:
-                    return url, None, None
+    async with semaphore, host_limit(host_semaphores, url):
+        try:
+            fetched = await fetch_body_async(session, url, rate_limiter)
+            if fetched is None:
+                return url, None, None, None
 
-                html_content = await response.text()
+            content_type, charset, html_content = fetched
 
-                # Use trafilatura to extract content (CPU-bound, run in thread)
-                loop = asyncio.get_event_loop()
-                title, content = await loop.run_in_executor(
-                    None, lambda: extract_content_with_trafilatura(html_content, url)
-                )
+            # Plain text files are stored as-is, like the sync fallback does
+            if "text/plain" in content_type:
+                text = html_content.decode(charset or "utf-8", errors="replace")
+                title, content = parse_plain_text(url, text)
+                return url, title, content, None
+
+            # Use trafilatura to extract content (CPU-bound, run in a worker process
+            # so extraction runs in parallel while the event loop keeps fetching)
+            loop = asyncio.get_running_loop()
+            title, content = await loop.run_in_executor(
+                get_extraction_pool(), extract_content_with_trafilatura, html_content, url
+            )
 
-                return url, title, content
+            return url, title, content, html_content
 
         except Exception:
-            return url, None, None
+            return url, None, None, None
 
 
-def extract_content_with_trafilatura(html_content, url):
+def extract_document(html_content, url):
     """
-    Helper function to extract content using trafilatura (CPU-bound).
+    Extract a page's main text and title with trafilatura.
+
+    bare_extraction returns the text and the metadata from a single parse of the
+    page, where extract() plus extract_metadata() would parse it twice.
 
     Args:
-        html_content: Raw HTML content
+        html_content: Raw HTML content, as bytes or str
         url: URL for fallback title generation
 
     Returns:
-        tuple: (title, content) or (None, None) if failed
+        tuple: (title, content) or (None, None) if there is too little content
     """
-    try:
-        # Extract main text content with metadata
-        content = trafilatura.extract(html_content, include_comments=False, include_tables=True)
-        if not content or len(content.strip()) < 50:
-            return None, None
-
-        # Extract title metadata
-        metadata = trafilatura.extract_metadata(html_content)
-        title = None
-        if metadata:
-            title = metadata.title or metadata.sitename
-
-        # Fallback title extraction if metadata doesn't provide one
-        if not title:
-            try:
-                soup = BeautifulSoup(html_content, "html.parser")
-                title_elem = soup.find("title")
-                if title_elem:
-                    title = title_elem.get_text().strip()
-            except Exception:
-                pass
-
-        # Final fallback for title
-        if not title:
-            title = f"Content from {urlparse(url).netloc}"
-
-        return title, content.strip()
-
-    except Exception:
+    document = trafilatura.bare_extraction(
+        html_content,
+        include_comments=False,
+        include_tables=True,
+        with_metadata=True,
+        as_dict=False,
+        config=TRAFILATURA_CONFIG,
+    )
+    content = document.text if document else None
+    if not content or len(content.strip()) < 50:
         return None, None
 
+    # Metadata title already falls back to <title> and <h1>; the host is the last resort
+    title = document.title or document.sitename or f"Content from {parse_url(url).netloc}"
+    return title, content.strip()
+
 
-async def discover_links_async(session, url, semaphore, same_domain_only=True):
+def extract_content_with_trafilatura(html_content, url):
     """
-    Async version of discover_links.
+    Helper function to extract content using trafilatura (CPU-bound).
 
     Args:
-        session: aiohttp.ClientSession
-        url: URL to discover links from
-        semaphore: asyncio.Semaphore for rate limiting
-        same_domain_only: If True, only return links from same domain
+        html_content: Raw HTML content, as bytes or str
+        url: URL for fallback title generation
 
     Returns:
-        set: Set of discovered URLs
+        tuple: (title, content) or (None, None) if failed
     """
-    async with semaphore:
-        discovered_urls = set()
-
-        try:
-            headers = {"User-Agent": DEFAULT_USER_AGENT}
+    try:
+        return extract_document(html_content, url)
+    except Exception:
+        return None, None
 
-            timeout = aiohttp.ClientTimeout(total=15)
-            async with session.get(url, headers=headers, timeout=timeout, ssl=False) as response:
-                if response.status != 200:
-                    return discovered_urls
 
-                html_content = await response.text()
+def resolve_href(href, base_url, base_origin):
+    """
+    Resolve a link against the page it was found on.
 
-                # Parse links (CPU-bound, run in thread)
-                loop = asyncio.get_event_loop()
-                discovered_urls = await loop.run_in_executor(
-                    None, lambda: parse_links_from_html(html_content, url, same_domain_only)
-                )
+    Absolute and root-relative links, which make up most of a page, are handled
+    with string operations; only the rest go through urljoin, which re-parses
+    base_url on every call.
 
-        except Exception:
-            pass
+    Args:
+        href: Link target as written in the page
+        base_url: URL of the page
+        base_origin: "scheme://netloc" of base_url
 
-        return discovered_urls
+    Returns:
+        str: Absolute URL
+    """
+    href = href.strip()
+    if href.startswith(("http://", "https://")):
+        return href
+    # "//host/..." is protocol-relative and "/./", "/../" need resolving
+    if href.startswith("/") and not href.startswith("//") and "/." not in href:
+        return base_origin + href
+    return urljoin(base_url, href)
 
 
 def parse_links_from_html(html_content, base_url, same_domain_only=True):
@@ -503,37 +1126,45 @@ def parse_links_from_html(html_content, base_url, same_domain_only=True):
         same_domain_only: If True, only return links from same domain
 
     Returns:
-        set: Set of discovered URLs
+        dict: Discovered URLs mapped to their anchor text
     """
-    discovered_urls = set()
+    discovered_urls = {}
 
     try:
-        soup = BeautifulSoup(html_content, "html.parser")
-        base_domain = urlparse(base_url).netloc
-
-        for link in soup.find_all("a", href=True):
-            href = link["href"]
+        if isinstance(html_content, str):
+            document = lxml.html.fromstring(html_content.encode("utf-8"), parser=UTF8_HTML_PARSER)
+        else:
+            document = lxml.html.fromstring(html_content)
+        base = parse_url(base_url)
+        base_origin = f"{base.scheme}://{base.netloc}"
+        base_domain = base.netloc.lower()
+
+        for link in document.iter("a"):
+            href = link.get("href")
+            if href is None:
+                continue
 
             # Convert relative URLs to absolute
-            absolute_url = urljoin(base_url, href)
+            absolute_url = resolve_href(href, base_url, base_origin)
 
-            # Validate URL format
-            parsed = urlparse(absolute_url)
-            if not parsed.scheme or not parsed.netloc:
+            # Validate URL format, keeping only HTTP(S) links
+            parsed = parse_url(absolute_url)
+            if parsed.scheme not in ("http", "https") or not parsed.netloc:
                 continue
 
             # Filter by domain if required
-            if same_domain_only and parsed.netloc != base_domain:
+            if same_domain_only and parsed.netloc.lower() != base_domain:
                 continue
 
             # Skip common non-content URLs
-            if any(
-                ext in absolute_url.lower()
-                for ext in [".pdf", ".jpg", ".png", ".gif", ".css", ".js"]
-            ):
+            if SKIP_EXTENSION_PATTERN.search(absolute_url) or SKIP_PATH_PATTERN.search(parsed.path):
                 continue
 
-            discovered_urls.add(absolute_url)
+            # Keep the most descriptive anchor when a page links to the same URL twice
+            normalized_url = normalize_url(absolute_url)
+            anchor_text = " ".join(link.text_content().split())
+            if len(anchor_text) >= len(discovered_urls.get(normalized_url, "")):
+                discovered_urls[normalized_url] = anchor_text
 
     except Exception:
         pass
@@ -541,84 +1172,55 @@ def parse_links_from_html(html_content, base_url, same_domain_only=True):
     return discovered_urls
 
 
-def insert_document_batch(documents, db_path, existing_urls):
+def insert_document_batch(documents, conn, index=True):
     """
     Insert multiple documents into database in a single transaction.
 
+    URLs already in the database are skipped by the unique url index. With WAL the
+    busy timeout almost always covers lock contention, so a locked database is
+    retried only once.
+
     Args:
         documents: List of (url, title, content) tuples
-        db_path: Database path
-        existing_urls: Set of existing URLs (will be updated)
+        conn: Open sqlite3 connection from connect_for_writing()
+        index: Index the documents for search now (see bulk_insert_documents)
 
     Returns:
         int: Number of documents inserted
     """
-    if not documents:
-        return 0
-
-    # Filter out existing URLs
+    # Drop documents without a title or content
     new_documents = [
-        (url, title, content)
-        for url, title, content in documents
-        if url not in existing_urls and title and content
+        (url, title, content) for url, title, content in documents if title and content
     ]
 
     if not new_documents:
         return 0
 
-    inserted_count = 0
-    max_retries = 3
-
-    for attempt in range(max_retries):
-        try:
-            conn = sqlite3.connect(db_path, timeout=30)
-            cursor = conn.cursor()
-
-            # Insert all documents in a single transaction
-            for url, title, content in new_documents:
-                try:
-                    # Insert into documents table
-                    cursor.execute(
-                        "INSERT INTO documents (url, title, content) VALUES (?, ?, ?)",
-                        (url, title, content),
-                    )
-
-                    # Insert into FTS5 table
-                    document_id = cursor.lastrowid
-                    cursor.execute(
-                        "INSERT INTO document_content (document_id, content) VALUES (?, ?)",
-                        (document_id, content),
-                    )
-
-                    inserted_count += 1
-                    existing_urls.add(url)
-
-                except sqlite3.IntegrityError:
-                    # URL already exists
-                    existing_urls.add(url)
-                    continue
-
-            conn.commit()
-            conn.close()
-            return inserted_count
-
-        except sqlite3.OperationalError as e:
-            if conn:
-                conn.close()
-            if "database is locked" in str(e) and attempt < max_retries - 1:
-                time.sleep(1)
-                continue
-            else:
-                break
-        except Exception:
-            if conn:
-                conn.close()
-            break
+    try:
+        return bulk_insert_documents(conn, new_documents, index)
+    except sqlite3.OperationalError as e:
+        if "database is locked" not in str(e):
+            logger.error("Failed to insert documents: %s", e)
+            return 0
 
-    return inserted_count
+    time.sleep(1)
+    try:
+        return bulk_insert_documents(conn, new_documents, index)
+    except sqlite3.OperationalError as e:
+        logger.error("Failed to insert documents: %s", e)
+        return 0
 
 
-async def scrape_urls_concurrent(urls, db_path, max_concurrent=20, batch_size=50):
+async def scrape_urls_concurrent(
+    urls,
+    db_path,
+    max_concurrent=20,
+    batch_size=50,
+    session=None,
+    host_semaphores=None,
+    rate_limiter=None,
+    defer_indexing=False,
+):
     """
     Scrape multiple URLs concurrently using asyncio.
 
@@ -627,6 +1229,11 @@ async def scrape_urls_concurrent(urls, db_path, max_concurrent=20, batch_size=50
         db_path: Database path
         max_concurrent: Maximum concurrent requests
         batch_size: Batch size for database inserts
+        session: aiohttp.ClientSession to reuse (optional, one is created if omitted)
+        host_semaphores: Per-host semaphore map to share (optional, created if omitted)
+        rate_limiter: HostRateLimiter to share (optional, created if omitted)
+        defer_indexing: Index documents for search once at the end instead of per
+            batch (see index_deferred_documents)
 
     Returns:
         tuple: (new_documents_count, total_processed)
@@ -634,40 +1241,66 @@ async def scrape_urls_concurrent(urls, db_path, max_concurrent=20, batch_size=50
     if not urls:
         return 0, 0
 
-    print(f"Starting concurrent scraping of {len(urls)} URLs...")
-    print(f"Concurrency: {max_concurrent}, Batch size: {batch_size}")
+    if session is None:
+        async with create_scraper_session(max_concurrent) as session:
+            return await scrape_urls_concurrent(
+                urls,
+                db_path,
+                max_concurrent,
+                batch_size,
+                session,
+                host_semaphores,
+                rate_limiter,
+                defer_indexing,
+            )
 
-    # Get existing URLs
-    existing_urls = get_existing_urls(db_path)
+    logger.info("Starting concurrent scraping of %d URLs...", len(urls))
+    logger.info("Concurrency: %s, Batch size: %s", max_concurrent, batch_size)
 
-    # Create semaphore for rate limiting
+    # Global cap on in-flight requests, plus a smaller cap and a request rate per host
     semaphore = asyncio.Semaphore(max_concurrent)
-
-    # Create aiohttp session with connection limits
-    connector = aiohttp.TCPConnector(
-        limit=max_concurrent * 2,
-        limit_per_host=10,
-        keepalive_timeout=30,
-        enable_cleanup_closed=True,
-    )
-
-    timeout = aiohttp.ClientTimeout(total=15)
+    if host_semaphores is None:
+        host_semaphores = new_host_semaphores()
+    if rate_limiter is None:
+        rate_limiter = HostRateLimiter()
 
     new_documents_count = 0
     processed_count = 0
     pending_documents = []
 
-    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
-        # Process URLs in chunks to avoid memory issues
-        for i in range(0, len(urls), batch_size * 4):
-            chunk = urls[i : i + batch_size * 4]
-
-            # Create tasks for this chunk
-            tasks = [fetch_and_parse_async(session, url, semaphore) for url in chunk]
+    # Workers pull from one queue, so only max_concurrent fetches are alive at a time
+    # and a slow URL never holds up the next chunk
+    url_queue = asyncio.Queue()
+    for url in urls:
+        url_queue.put_nowait(url)
+
+    # One write connection for the whole run; batches are inserted as they fill up.
+    # SQLite work (inserts, FTS5 indexing, lock retries) runs in worker threads so it
+    # never stalls the fetches, and write_lock keeps it to one call at a time.
+    conn = await asyncio.to_thread(connect_for_writing, db_path, check_same_thread=False)
+    last_indexed_id = await asyncio.to_thread(get_last_document_id, conn)
+    write_lock = asyncio.Lock()
+
+    async def insert_pending():
+        nonlocal new_documents_count
+        # Take the buffer first so documents scraped during the insert start a new batch
+        batch = pending_documents.copy()
+        pending_documents.clear()
+        async with write_lock:
+            inserted = await asyncio.to_thread(
+                insert_document_batch, batch, conn, index=not defer_indexing
+            )
+        new_documents_count += inserted
+        return inserted
 
-            # Process tasks as they complete
-            for coro in asyncio.as_completed(tasks):
-                url, title, content = await coro
+    async def scrape():
+        nonlocal processed_count
+        while True:
+            url = await url_queue.get()
+            try:
+                _, title, content, _ = await fetch_and_parse_async(
+                    session, url, semaphore, host_semaphores, rate_limiter
+                )
                 processed_count += 1
 
                 if title and content:
@@ -675,116 +1308,211 @@ async def scrape_urls_concurrent(urls, db_path, max_concurrent=20, batch_size=50
 
                 # Insert batch when we have enough documents
                 if len(pending_documents) >= batch_size:
-                    inserted = insert_document_batch(pending_documents, db_path, existing_urls)
-                    new_documents_count += inserted
+                    inserted = await insert_pending()
                     if inserted > 0:
-                        print(
-                            f"✓ Batch inserted {inserted} documents (Total: {new_documents_count})"
+                        logger.info(
+                            "✓ Batch inserted %s documents (Total: %s)",
+                            inserted,
+                            new_documents_count,
                         )
-                    pending_documents = []
 
                 # Show progress
                 if processed_count % 50 == 0:
-                    print(f"  Processed {processed_count}/{len(urls)} URLs...")
-
-    # Insert remaining documents
-    if pending_documents:
-        inserted = insert_document_batch(pending_documents, db_path, existing_urls)
-        new_documents_count += inserted
-        if inserted > 0:
-            print(f"✓ Final batch inserted {inserted} documents")
+                    logger.info("  Processed %s/%d URLs...", processed_count, len(urls))
+            except Exception as e:
+                logger.error("Failed to scrape %s: %s", url, e)
+            finally:
+                url_queue.task_done()
 
-    print("Concurrent scraping complete!")
-    print(f"Processed: {processed_count}, Added: {new_documents_count}")
+    workers = [asyncio.create_task(scrape()) for _ in range(min(max_concurrent, len(urls)))]
+    try:
+        await url_queue.join()
+
+        # Insert remaining documents
+        if pending_documents:
+            inserted = await insert_pending()
+            if inserted > 0:
+                logger.info("✓ Final batch inserted %s documents", inserted)
+    finally:
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+        # Index whatever was stored, even if the crawl was interrupted
+        async with write_lock:
+            if defer_indexing and new_documents_count > 0:
+                await asyncio.to_thread(index_deferred_documents, conn, last_indexed_id)
+            if new_documents_count > 0:
+                await asyncio.to_thread(merge_search_index, conn)
+        conn.close()
+
+    logger.info("Concurrent scraping complete!")
+    logger.info("Processed: %s, Added: %s", processed_count, new_documents_count)
 
     return new_documents_count, processed_count
 
 
 async def scrape_with_discovery_concurrent(
-    links_file, db_path, discover_depth=1, allow_cross_domain=False, max_concurrent=20
+    links,
+    db_path,
+    discover_depth=1,
+    allow_cross_domain=False,
+    max_concurrent=20,
+    defer_indexing=False,
+    session=None,
 ):
     """
     Async version of scrape_with_discovery with concurrent processing.
 
+    URLs flow through a priority queue rather than depth-by-depth barriers:
+    max_concurrent workers fetch pages, queue the links found on them for the next
+    depth and hand documents to a single writer task, so a slow host never holds up
+    the rest of the crawl. Shallower URLs are fetched first, best score_link first
+    within a depth, and each depth admits at most max_concurrent * FRONTIER_PER_WORKER
+    discovered URLs. Starter URLs are streamed into the queue while workers run,
+    so fetching starts before a large links file has been read.
+
     Args:
-        links_file: Path to JSON file containing starter URLs
+        links: Path to a links file (see iter_links), or an iterable of URLs
         db_path: Database path
         discover_depth: Depth of link discovery
         allow_cross_domain: Allow cross-domain link discovery
         max_concurrent: Maximum concurrent requests
+        defer_indexing: Index documents for search once at the end instead of per
+            batch (see index_deferred_documents)
+        session: aiohttp.ClientSession to reuse (optional, one is created if omitted)
 
     Returns:
         tuple: (new_documents_count, total_discovered_urls)
     """
-    # Read starter URLs
-    with open(links_file) as file:
-        starter_urls = json.load(file)
+    if session is None:
+        # One session (and connection pool) for the whole crawl
+        async with create_scraper_session(max_concurrent) as session:
+            return await scrape_with_discovery_concurrent(
+                links,
+                db_path,
+                discover_depth,
+                allow_cross_domain,
+                max_concurrent,
+                defer_indexing,
+                session,
+            )
 
-    print(f"Starting concurrent discovery scraping with depth {discover_depth}")
-    print(f"Starter URLs: {len(starter_urls)}")
-    print(f"Max concurrent requests: {max_concurrent}")
+    logger.info("Starting concurrent discovery scraping with depth %s", discover_depth)
+    logger.info("Max concurrent requests: %s", max_concurrent)
 
-    all_discovered_urls = set(starter_urls)
-    current_urls = starter_urls[:]
+    # url_fingerprint values of every URL queued so far
+    all_discovered_urls = set()
     new_documents_count = 0
+    processed_count = 0
 
-    # Create semaphore for rate limiting
-    semaphore = asyncio.Semaphore(max_concurrent)
-
-    # Create aiohttp session
-    connector = aiohttp.TCPConnector(
-        limit=max_concurrent * 2, limit_per_host=10, keepalive_timeout=30
-    )
-
-    async with aiohttp.ClientSession(connector=connector) as session:
-        for depth in range(discover_depth):
-            if not current_urls:
-                break
-
-            print(f"\n=== Depth {depth + 1}/{discover_depth} ({len(current_urls)} URLs) ===")
-
-            # Scrape current URLs concurrently
-            docs_added, processed = await scrape_urls_concurrent(
-                current_urls, db_path, max_concurrent, batch_size=50
-            )
-            new_documents_count += docs_added
+    # Entries are (depth, -score, url); starter URLs keep their given order
+    url_queue = asyncio.PriorityQueue()
+    frontier_budget = [max_concurrent * FRONTIER_PER_WORKER] * discover_depth
 
-            # Discover links for next depth (if not at max depth)
-            if depth + 1 < discover_depth:
-                print(f"Discovering links from {len(current_urls)} URLs...")
+    # Scraped documents go to the writer; None tells it the crawl is over
+    document_queue = asyncio.Queue()
 
-                # Create discovery tasks
-                discovery_tasks = [
-                    discover_links_async(
-                        session, url, semaphore, same_domain_only=not allow_cross_domain
+    # Rate limiting, globally and per host
+    semaphore = asyncio.Semaphore(max_concurrent)
+    host_semaphores = new_host_semaphores()
+    rate_limiter = HostRateLimiter()
+    loop = asyncio.get_running_loop()
+
+    async def crawl(session):
+        nonlocal processed_count
+        while True:
+            depth, _, url = await url_queue.get()
+            try:
+                _, title, content, html_content = await fetch_and_parse_async(
+                    session, url, semaphore, host_semaphores, rate_limiter
+                )
+                processed_count += 1
+                if title and content:
+                    document_queue.put_nowait((url, title, content))
+
+                # Queue this page's best new links for the next depth
+                if html_content and depth + 1 < discover_depth and frontier_budget[depth + 1]:
+                    page_links = await loop.run_in_executor(
+                        get_extraction_pool(),
+                        parse_links_from_html,
+                        html_content,
+                        url,
+                        not allow_cross_domain,
                     )
-                    for url in current_urls
-                ]
-
-                # Collect discovered URLs
-                next_urls = []
-                discovery_count = 0
-
-                for coro in asyncio.as_completed(discovery_tasks):
-                    discovered = await coro
-                    discovery_count += 1
-
-                    for url in discovered:
-                        if url not in all_discovered_urls:
-                            all_discovered_urls.add(url)
-                            next_urls.append(url)
-
-                    if discovery_count % 20 == 0:
-                        print(f"  Discovery progress: {discovery_count}/{len(current_urls)}")
+                    frontier = build_frontier(
+                        page_links, all_discovered_urls, frontier_budget[depth + 1]
+                    )
+                    frontier_budget[depth + 1] -= len(frontier)
+                    for next_url in frontier:
+                        score = score_link(next_url, page_links.get(next_url, ""))
+                        url_queue.put_nowait((depth + 1, -score, next_url))
 
-                current_urls = next_urls
-                print(f"Discovered {len(next_urls)} new URLs for next depth")
-            else:
-                current_urls = []
+                if processed_count % 50 == 0:
+                    logger.info(
+                        "  Processed %s URLs (%s queued)", processed_count, url_queue.qsize()
+                    )
+            except Exception as e:
+                logger.error("Failed to crawl %s: %s", url, e)
+            finally:
+                url_queue.task_done()
+
+    async def write_documents():
+        nonlocal new_documents_count
+        # SQLite work (inserts, FTS5 indexing, lock retries) runs in worker threads so it
+        # never stalls the fetches; only this task uses the connection, one call at a time
+        conn = await asyncio.to_thread(connect_for_writing, db_path, check_same_thread=False)
+        last_indexed_id = await asyncio.to_thread(get_last_document_id, conn)
+        pending_documents = []
+        try:
+            while (document := await document_queue.get()) is not None:
+                pending_documents.append(document)
+                if len(pending_documents) >= INSERT_BATCH_SIZE:
+                    new_documents_count += await asyncio.to_thread(
+                        insert_document_batch, pending_documents, conn, index=not defer_indexing
+                    )
+                    logger.info("✓ Total documents added: %s", new_documents_count)
+                    pending_documents = []
+            new_documents_count += await asyncio.to_thread(
+                insert_document_batch, pending_documents, conn, index=not defer_indexing
+            )
+        finally:
+            # Index whatever was stored, even if the crawl was interrupted
+            if defer_indexing and new_documents_count > 0:
+                await asyncio.to_thread(index_deferred_documents, conn, last_indexed_id)
+            if new_documents_count > 0:
+                await asyncio.to_thread(merge_search_index, conn)
+            conn.close()
 
-    print("\nConcurrent discovery scraping complete!")
-    print(f"Total URLs discovered: {len(all_discovered_urls)}")
-    print(f"Total documents added: {new_documents_count}")
+    writer = asyncio.create_task(write_documents())
+    workers = [asyncio.create_task(crawl(session)) for _ in range(max_concurrent)]
+    try:
+        starter_count = 0
+        for position, url in enumerate(iter_links(links)):
+            fingerprint = url_fingerprint(normalize_url(url))
+            if fingerprint in all_discovered_urls:
+                continue
+            all_discovered_urls.add(fingerprint)
+            url_queue.put_nowait((0, position, url))
+            starter_count += 1
+
+            # Let the workers start on what has been read so far
+            if starter_count % 100 == 0:
+                await asyncio.sleep(0)
+
+        logger.info("Starter URLs: %d", starter_count)
+        await url_queue.join()
+    finally:
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        document_queue.put_nowait(None)
+        await writer
+
+    logger.info("Concurrent discovery scraping complete!")
+    logger.info("Processed: %s URLs", processed_count)
+    logger.info("Total URLs discovered: %d", len(all_discovered_urls))
+    logger.info("Total documents added: %s", new_documents_count)
 
     return new_documents_count, len(all_discovered_urls)
 
@@ -792,10 +1520,16 @@ async def scrape_with_discovery_concurrent(
 if __name__ == "__main__":
     import argparse
 
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
     parser = argparse.ArgumentParser(
         description="Scrape links and store in database with optional link discovery."
     )
-    parser.add_argument("links_file", type=str, help="The JSON file containing the starter links.")
+    parser.add_argument(
+        "links_file",
+        type=str,
+        help="The starter links: a JSON array, or JSON Lines / plain text with one URL per line.",
+    )
     parser.add_argument("db_path", type=str, help="The SQLite database file path.")
     parser.add_argument(
         "--discover-depth",
@@ -819,37 +1553,53 @@ if __name__ == "__main__":
         default=20,
         help="Maximum concurrent requests when using --concurrent (default: 20)",
     )
+    parser.add_argument(
+        "--bulk",
+        action="store_true",
+        help="With --concurrent, index documents for search once after the crawl instead of "
+        "batch by batch. Faster for large crawls; no other scraper may write meanwhile.",
+    )
     args = parser.parse_args()
+    if args.bulk and not args.concurrent:
+        parser.error("--bulk requires --concurrent")
 
     if args.concurrent:
-        print(f"Using CONCURRENT scraping with max {args.max_concurrent} requests")
+        logger.info("Using CONCURRENT scraping with max %s requests", args.max_concurrent)
         if args.discover_depth > 1 or args.allow_cross_domain:
-            print(f"Link discovery enabled with depth {args.discover_depth}")
+            logger.info("Link discovery enabled with depth %s", args.discover_depth)
             if args.allow_cross_domain:
-                print("Cross-domain crawling enabled")
-            asyncio.run(
+                logger.info("Cross-domain crawling enabled")
+            new_documents, _ = asyncio.run(
                 scrape_with_discovery_concurrent(
                     args.links_file,
                     args.db_path,
                     args.discover_depth,
                     args.allow_cross_domain,
                     args.max_concurrent,
+                    defer_indexing=args.bulk,
                 )
             )
         else:
-            print("Basic concurrent scraping (no link discovery)")
-            with open(args.links_file) as f:
-                urls = json.load(f)
-            asyncio.run(scrape_urls_concurrent(urls, args.db_path, args.max_concurrent))
+            logger.info("Basic concurrent scraping (no link discovery)")
+            urls = load_links(args.links_file)
+            new_documents, _ = asyncio.run(
+                scrape_urls_concurrent(
+                    urls, args.db_path, args.max_concurrent, defer_indexing=args.bulk
+                )
+            )
     else:
-        print("Using SEQUENTIAL scraping (use --concurrent for much faster processing)")
+        logger.info("Using SEQUENTIAL scraping (use --concurrent for much faster processing)")
         if args.discover_depth > 1 or args.allow_cross_domain:
-            print(f"Using link discovery with depth {args.discover_depth}")
+            logger.info("Using link discovery with depth %s", args.discover_depth)
             if args.allow_cross_domain:
-                print("Cross-domain crawling enabled")
-            scrape_with_discovery(
+                logger.info("Cross-domain crawling enabled")
+            new_documents, _ = scrape_with_discovery(
                 args.links_file, args.db_path, args.discover_depth, args.allow_cross_domain
             )
         else:
-            print("Using basic scraping (no link discovery)")
-            scrape_links_to_database(args.links_file, args.db_path)
+            logger.info("Using basic scraping (no link discovery)")
+            new_documents = scrape_links_to_database(args.links_file, args.db_path)
+
+    # One full index rewrite per run; each crawl only merges incrementally
+    if new_documents > 0:
+        optimize_search_index(args.db_path)
@@ -0,0 +1,69 @@
+"""
+Store document vectors as int8 instead of float32.
+Embeddings are L2-normalized, so every component lies in [-1, 1] and quantizes
+losslessly enough for top-k cosine ranking while cutting the index to a quarter.
+"""
+
+import sqlite_vec
+from yoyo import step
+
+
+def load_vec_extension(conn):
+    """Load the sqlite-vec extension on a migration connection."""
+    conn.enable_load_extension(True)
+    sqlite_vec.load(conn)
+    conn.enable_load_extension(False)
+
+
+def apply_int8_vectors(conn):
+    """Apply: Rebuild document_vectors with int8 embeddings."""
+    load_vec_extension(conn)
+    cursor = conn.cursor()
+
+    # Quantize existing rows into a scratch table; vec0 tables can't be retyped in place
+    cursor.execute(
+        """
+        CREATE TEMP TABLE document_vectors_int8 AS
+        SELECT rowid AS id, vec_quantize_int8(embedding, 'unit') AS embedding, document_id
+        FROM document_vectors
+    """
+    )
+    cursor.execute("DROP TABLE document_vectors")
+    cursor.execute(
+        """
+        CREATE VIRTUAL TABLE document_vectors USING vec0(
+            embedding int8[1024],
+            document_id INTEGER
+        )
+    """
+    )
+
+    # Queries must quantize the same way: vec_quantize_int8(:query, 'unit')
+    cursor.execute(
+        """
+        INSERT INTO document_vectors (rowid, embedding, document_id)
+        SELECT id, vec_int8(embedding), document_id FROM document_vectors_int8
+    """
+    )
+    cursor.execute("DROP TABLE document_vectors_int8")
+    conn.commit()
+
+
+def rollback_int8_vectors(conn):
+    """Rollback: Recreate the float32 vector table (vectors must be re-embedded)."""
+    load_vec_extension(conn)
+    cursor = conn.cursor()
+    cursor.execute("DROP TABLE IF EXISTS document_vectors")
+    cursor.execute(
+        """
+        CREATE VIRTUAL TABLE document_vectors USING vec0(
+            embedding float[1024],
+            document_id INTEGER
+        )
+    """
+    )
+    conn.commit()
+
+
+# Define the migration step
+steps = [step(apply_int8_vectors, rollback_int8_vectors)]
@@ -0,0 +1,50 @@
+"""
+Turn document_content into an external-content FTS5 index over documents.
+The FTS table keeps only the inverted index and reads text from documents.content,
+so page text is stored (and written through the WAL) once instead of twice.
+"""
+
+from yoyo import step
+
+
+def apply_external_content_fts(conn):
+    """Apply: Rebuild document_content as an index over documents, keyed by rowid."""
+    cursor = conn.cursor()
+    cursor.execute("DROP TABLE IF EXISTS document_content")
+    cursor.execute(
+        """
+        CREATE VIRTUAL TABLE document_content USING fts5(
+            content,
+            content='documents',
+            content_rowid='id',
+            tokenize='porter unicode61'
+        )
+    """
+    )
+
+    # Index every existing document from the content table
+    cursor.execute("INSERT INTO document_content(document_content) VALUES ('rebuild')")
+    conn.commit()
+
+
+def rollback_external_content_fts(conn):
+    """Rollback: Recreate the standalone FTS table with its own copy of the content."""
+    cursor = conn.cursor()
+    cursor.execute("DROP TABLE IF EXISTS document_content")
+    cursor.execute(
+        """
+        CREATE VIRTUAL TABLE document_content USING fts5(
+            content,
+            document_id UNINDEXED,
+            tokenize='porter unicode61'
+        )
+    """
+    )
+    cursor.execute(
+        "INSERT INTO document_content (document_id, content) SELECT id, content FROM documents"
+    )
+    conn.commit()
+
+
+# Define the migration step
+steps = [step(apply_external_content_fts, rollback_external_content_fts)]
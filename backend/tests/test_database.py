@@ -0,0 +1,76 @@
+"""
+Tests for the database module.
+"""
+
+import os
+import sqlite3
+import tempfile
+from unittest.mock import Mock, patch
+
+from app.database import (
+    DB_POOL_SIZE,
+    apply_sqlite_pragmas,
+    engine,
+    load_sqlite_vec,
+    set_sqlite_pragmas,
+)
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+
+class TestSqlitePragmas:
+    """Test cases for SQLite connection tuning."""
+
+    def setup_method(self):
+        """Create a temporary database file."""
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+        self.temp_db.close()
+        self.db_path = self.temp_db.name
+
+    def teardown_method(self):
+        """Remove the temporary database and its WAL files."""
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.db_path + suffix):
+                os.unlink(self.db_path + suffix)
+
+    def test_apply_sqlite_pragmas(self):
+        """Test that connections are switched to WAL with a tuned cache."""
+        conn = sqlite3.connect(self.db_path)
+        apply_sqlite_pragmas(conn)
+
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        assert conn.execute("PRAGMA cache_size").fetchone()[0] == -65536
+        assert conn.execute("PRAGMA temp_store").fetchone()[0] == 2  # MEMORY
+        assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+        assert conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+        conn.close()
+
+    def test_engine_applies_pragmas_on_connect(self):
+        """Test that the engine runs the pragma hook for every new connection."""
+        assert event.contains(engine, "connect", set_sqlite_pragmas)
+
+    @patch("app.database.sqlite_vec.load")
+    def test_load_sqlite_vec(self, mock_load):
+        """Test that sqlite-vec is loaded with extension loading switched back off."""
+        conn = Mock()
+        load_sqlite_vec(conn)
+
+        mock_load.assert_called_once_with(conn)
+        assert [c.args for c in conn.enable_load_extension.call_args_list] == [(True,), (False,)]
+
+    @patch("app.database.sqlite_vec.load")
+    def test_load_sqlite_vec_unsupported_build(self, mock_load):
+        """Test that sqlite3 builds without extension support are left alone."""
+        load_sqlite_vec(object())
+
+        mock_load.assert_not_called()
+
+
+class TestEngine:
+    """Test cases for the shared SQLAlchemy engine."""
+
+    def test_engine_uses_sized_connection_pool(self):
+        """Test that connections are pooled and reused across sessions."""
+        assert isinstance(engine.pool, QueuePool)
+        assert engine.pool.size() == DB_POOL_SIZE
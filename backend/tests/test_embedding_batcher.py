@@ -0,0 +1,97 @@
+"""
+Tests for the embedding micro-batcher.
+"""
+
+import asyncio
+from unittest.mock import Mock
+
+import pytest
+from app.embedding_batcher import EmbeddingBatcher
+
+
+def make_service():
+    """Create a mock service whose vectors encode the input text length."""
+    service = Mock()
+    service.embed_texts.side_effect = lambda texts: [[float(len(t))] for t in texts]
+    return service
+
+
+class TestEmbeddingBatcher:
+    """Test cases for EmbeddingBatcher."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_batch(self):
+        """Test that concurrent texts are embedded in a single model call."""
+        service = make_service()
+        batcher = EmbeddingBatcher(lambda: service, max_wait=0.05)
+
+        texts = ["ccc", "a", "bbbb", "dd"]
+        results = await asyncio.gather(*(batcher.embed(t) for t in texts))
+        await batcher.stop()
+
+        assert results == [[3.0], [1.0], [4.0], [2.0]]
+        # Texts arrive in request order; the service does its own length sorting
+        service.embed_texts.assert_called_once_with(["ccc", "a", "bbbb", "dd"])
+
+    @pytest.mark.asyncio
+    async def test_single_request_is_a_batch_of_one(self):
+        """Test that a lone request is embedded on its own."""
+        service = make_service()
+        batcher = EmbeddingBatcher(lambda: service, max_wait=0.001)
+
+        result = await batcher.embed("hello")
+        await batcher.stop()
+
+        assert result == [5.0]
+        service.embed_texts.assert_called_once_with(["hello"])
+
+    @pytest.mark.asyncio
+    async def test_max_batch_size_splits_batches(self):
+        """Test that batches never exceed max_batch_size."""
+        service = make_service()
+        batcher = EmbeddingBatcher(lambda: service, max_batch_size=2, max_wait=0.05)
+
+        results = await asyncio.gather(*(batcher.embed("x" * n) for n in range(1, 5)))
+        await batcher.stop()
+
+        assert results == [[1.0], [2.0], [3.0], [4.0]]
+        assert all(len(call.args[0]) <= 2 for call in service.embed_texts.call_args_list)
+
+    @pytest.mark.asyncio
+    async def test_max_batch_chars_closes_batch(self):
+        """Test that a batch stops collecting once the character budget is reached."""
+        service = make_service()
+        batcher = EmbeddingBatcher(lambda: service, max_wait=0.05, max_batch_chars=5)
+
+        await asyncio.gather(batcher.embed("x" * 10), batcher.embed("y"))
+        await batcher.stop()
+
+        service.embed_texts.assert_any_call(["x" * 10])
+        service.embed_texts.assert_any_call(["y"])
+        assert service.embed_texts.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_errors_propagate_to_every_waiter(self):
+        """Test that a failing model call fails all requests in the batch."""
+        service = Mock()
+        service.embed_texts.side_effect = RuntimeError("Model failed")
+        batcher = EmbeddingBatcher(lambda: service, max_wait=0.05)
+
+        results = await asyncio.gather(
+            batcher.embed("one"), batcher.embed("two"), return_exceptions=True
+        )
+        await batcher.stop()
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+    @pytest.mark.asyncio
+    async def test_worker_survives_failed_batch(self):
+        """Test that the worker keeps serving requests after an error."""
+        service = make_service()
+        service.embed_texts.side_effect = [RuntimeError("Model failed"), [[1.0]]]
+        batcher = EmbeddingBatcher(lambda: service, max_wait=0.001)
+
+        with pytest.raises(RuntimeError, match="Model failed"):
+            await batcher.embed("a")
+        assert await batcher.embed("b") == [1.0]
+        await batcher.stop()
@@ -2,10 +2,16 @@
 Tests for the embedding FastAPI endpoint.
 """
 
+import asyncio
+import hmac
 from unittest.mock import Mock, patch
 
+import httpx
+import numpy as np
 import pytest
-from app.main import app
+import pytest_asyncio
+from app.embedding_service import EmbeddingOutOfMemoryError
+from app.main import MAX_EMBED_BATCH_TEXTS, app, embed_batcher
 from fastapi.testclient import TestClient
 
 
@@ -15,6 +21,16 @@ def client():
     return TestClient(app)
 
 
+@pytest_asyncio.fixture
+async def async_client():
+    """Create an async client whose requests run concurrently on the test's event loop."""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+    # The batcher worker belongs to this test's loop
+    await embed_batcher.stop()
+
+
 @pytest.fixture
 def api_headers():
     """Standard API headers for testing."""
@@ -29,7 +45,7 @@ class TestEmbedEndpoint:
         """Test successful text embedding."""
         # Mock the embedding service
         mock_service = Mock()
-        mock_service.embed_text.return_value = [0.1, 0.2, 0.3, 0.4]
+        mock_service.embed_texts.return_value = [[0.1, 0.2, 0.3, 0.4]]
         mock_get_service.return_value = mock_service
 
         # Make request
@@ -42,19 +58,35 @@ class TestEmbedEndpoint:
         assert data["embedding"] == [0.1, 0.2, 0.3, 0.4]
 
         # Verify service was called correctly
-        mock_service.embed_text.assert_called_once_with("Hello world")
+        mock_service.embed_texts.assert_called_once_with(["Hello world"])
+
+    @pytest.mark.asyncio
+    @patch("app.main.get_embedding_service")
+    async def test_embed_text_success_async(self, mock_get_service, async_client, api_headers):
+        """Test successful text embedding through the app's async path."""
+        mock_service = Mock()
+        mock_service.embed_texts.return_value = [[0.1, 0.2, 0.3, 0.4]]
+        mock_get_service.return_value = mock_service
+
+        response = await async_client.post(
+            "/embed", json={"text": "Hello world"}, headers=api_headers
+        )
+
+        assert response.status_code == 200
+        assert response.json() == {"embedding": [0.1, 0.2, 0.3, 0.4]}
+        mock_service.embed_texts.assert_called_once_with(["Hello world"])
 
     @patch("app.main.get_embedding_service")
     def test_embed_text_strips_whitespace(self, mock_get_service, client, api_headers):
         """Test that text is stripped of whitespace."""
         mock_service = Mock()
-        mock_service.embed_text.return_value = [0.1, 0.2]
+        mock_service.embed_texts.return_value = [[0.1, 0.2]]
         mock_get_service.return_value = mock_service
 
         response = client.post("/embed", json={"text": "  hello world  "}, headers=api_headers)
 
         assert response.status_code == 200
-        mock_service.embed_text.assert_called_once_with("hello world")
+        mock_service.embed_texts.assert_called_once_with(["hello world"])
 
     def test_embed_text_empty_string(self, client, api_headers):
         """Test embedding empty string returns 400."""
@@ -85,6 +117,16 @@ class TestEmbedEndpoint:
         assert response.status_code == 401
         assert "Invalid API key" in response.json()["detail"]
 
+    def test_embed_text_near_miss_api_key(self, client):
+        """Test that a key differing only in its last character is rejected."""
+        headers = {"X-API-Key": "gem-search-dev-key-12346"}
+        with patch("app.main.hmac.compare_digest", wraps=hmac.compare_digest) as mock_compare:
+            response = client.post("/embed", json={"text": "Hello world"}, headers=headers)
+
+        assert response.status_code == 401
+        assert response.json()["detail"] == "Invalid API key"
+        mock_compare.assert_called_once()
+
     def test_embed_text_missing_text_field(self, client, api_headers):
         """Test embedding without text field returns 422."""
         response = client.post("/embed", json={}, headers=api_headers)
@@ -106,7 +148,7 @@ class TestEmbedEndpoint:
         """Test handling of embedding service errors."""
         # Mock the embedding service to raise an exception
         mock_service = Mock()
-        mock_service.embed_text.side_effect = Exception("Model failed")
+        mock_service.embed_texts.side_effect = Exception("Model failed")
         mock_get_service.return_value = mock_service
 
         response = client.post("/embed", json={"text": "Hello world"}, headers=api_headers)
@@ -114,11 +156,23 @@ class TestEmbedEndpoint:
         assert response.status_code == 500
         assert "Embedding error" in response.json()["detail"]
 
+    @patch("app.main.get_embedding_service")
+    def test_embed_text_oom_returns_503(self, mock_get_service, client, api_headers):
+        """Test that running out of GPU memory is reported as a retryable 503."""
+        mock_service = Mock()
+        mock_service.embed_texts.side_effect = EmbeddingOutOfMemoryError("CUDA out of memory")
+        mock_get_service.return_value = mock_service
+
+        response = client.post("/embed", json={"text": "Hello world"}, headers=api_headers)
+
+        assert response.status_code == 503
+        assert response.json()["detail"] == "Embedding service out of memory"
+
     @patch("app.main.get_embedding_service")
     def test_embed_text_large_input(self, mock_get_service, client, api_headers):
         """Test embedding with large text input."""
         mock_service = Mock()
-        mock_service.embed_text.return_value = [0.1] * 1024  # Typical embedding size
+        mock_service.embed_texts.return_value = [[0.1] * 1024]  # Typical embedding size
         mock_get_service.return_value = mock_service
 
         # Create a large text input
@@ -129,13 +183,13 @@ class TestEmbedEndpoint:
         assert response.status_code == 200
         data = response.json()
         assert len(data["embedding"]) == 1024
-        mock_service.embed_text.assert_called_once_with(large_text.strip())
+        mock_service.embed_texts.assert_called_once_with([large_text.strip()])
 
     @patch("app.main.get_embedding_service")
     def test_embed_text_special_characters(self, mock_get_service, client, api_headers):
         """Test embedding with special characters."""
         mock_service = Mock()
-        mock_service.embed_text.return_value = [0.1, 0.2]
+        mock_service.embed_texts.return_value = [[0.1, 0.2]]
         mock_get_service.return_value = mock_service
 
         special_text = "Hello! @#$%^&*()_+-=[]{}|;:'\",.<>?/~`"
@@ -143,13 +197,13 @@ class TestEmbedEndpoint:
         response = client.post("/embed", json={"text": special_text}, headers=api_headers)
 
         assert response.status_code == 200
-        mock_service.embed_text.assert_called_once_with(special_text)
+        mock_service.embed_texts.assert_called_once_with([special_text])
 
     @patch("app.main.get_embedding_service")
     def test_embed_text_unicode_characters(self, mock_get_service, client, api_headers):
         """Test embedding with Unicode characters."""
         mock_service = Mock()
-        mock_service.embed_text.return_value = [0.1, 0.2]
+        mock_service.embed_texts.return_value = [[0.1, 0.2]]
         mock_get_service.return_value = mock_service
 
         unicode_text = "Hello 世界 🌍 café naïve résumé"
@@ -157,19 +211,20 @@ class TestEmbedEndpoint:
         response = client.post("/embed", json={"text": unicode_text}, headers=api_headers)
 
         assert response.status_code == 200
-        mock_service.embed_text.assert_called_once_with(unicode_text)
+        mock_service.embed_texts.assert_called_once_with([unicode_text])
 
     @patch("app.main.get_embedding_service")
     def test_embed_response_format(self, mock_get_service, client, api_headers):
         """Test that response format matches EmbedResponse model."""
         mock_service = Mock()
         test_embedding = [0.1, -0.2, 0.3, -0.4, 0.0]
-        mock_service.embed_text.return_value = test_embedding
+        mock_service.embed_texts.return_value = [test_embedding]
         mock_get_service.return_value = mock_service
 
         response = client.post("/embed", json={"text": "test"}, headers=api_headers)
 
         assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/json")
         data = response.json()
 
         # Verify response structure
@@ -178,3 +233,195 @@ class TestEmbedEndpoint:
         assert isinstance(data["embedding"], list)
         assert all(isinstance(x, int | float) for x in data["embedding"])
         assert data["embedding"] == test_embedding
+
+
+class TestBatchEmbedEndpoint:
+    """Test cases for the /embed/batch endpoint."""
+
+    @patch("app.main.get_embedding_service")
+    def test_embed_batch_success(self, mock_get_service, client, api_headers):
+        """Test that all texts are embedded with one stripped embed_texts call."""
+        mock_service = Mock()
+        mock_service.embed_texts.return_value = [[0.1, 0.2], [0.3, 0.4]]
+        mock_get_service.return_value = mock_service
+
+        response = client.post(
+            "/embed/batch", json={"texts": ["  first text ", "second\n"]}, headers=api_headers
+        )
+
+        assert response.status_code == 200
+        assert response.json() == {"embeddings": [[0.1, 0.2], [0.3, 0.4]]}
+        mock_service.embed_texts.assert_called_once_with(["first text", "second"])
+
+    @patch("app.main.get_embedding_service")
+    def test_embed_batch_empty_list(self, mock_get_service, client, api_headers):
+        """Test that an empty batch returns no embeddings without calling the model."""
+        response = client.post("/embed/batch", json={"texts": []}, headers=api_headers)
+
+        assert response.status_code == 200
+        assert response.json() == {"embeddings": []}
+        mock_get_service.assert_not_called()
+
+    @patch("app.main.get_embedding_service")
+    def test_embed_batch_empty_text(self, mock_get_service, client, api_headers):
+        """Test that a batch with blank texts returns 400."""
+        for texts in (["  ", ""], ["valid", "   "]):
+            response = client.post("/embed/batch", json={"texts": texts}, headers=api_headers)
+
+            assert response.status_code == 400
+            assert "Texts cannot be empty" in response.json()["detail"]
+        mock_get_service.assert_not_called()
+
+    def test_embed_batch_missing_texts_field(self, client, api_headers):
+        """Test that a request without texts returns 422."""
+        response = client.post("/embed/batch", json={"text": "hello"}, headers=api_headers)
+
+        assert response.status_code == 422
+
+    def test_embed_batch_too_many_texts(self, client, api_headers):
+        """Test that batches over MAX_EMBED_BATCH_TEXTS are rejected."""
+        texts = ["text"] * (MAX_EMBED_BATCH_TEXTS + 1)
+
+        response = client.post("/embed/batch", json={"texts": texts}, headers=api_headers)
+
+        assert response.status_code == 422
+
+    def test_embed_batch_invalid_api_key(self, client):
+        """Test that an invalid API key returns 401."""
+        response = client.post(
+            "/embed/batch", json={"texts": ["hello"]}, headers={"X-API-Key": "invalid-key"}
+        )
+
+        assert response.status_code == 401
+
+    @patch("app.main.get_embedding_service")
+    def test_embed_batch_service_error(self, mock_get_service, client, api_headers):
+        """Test that model failures return 500."""
+        mock_service = Mock()
+        mock_service.embed_texts.side_effect = Exception("Model error")
+        mock_get_service.return_value = mock_service
+
+        response = client.post("/embed/batch", json={"texts": ["hello"]}, headers=api_headers)
+
+        assert response.status_code == 500
+        assert "Embedding error" in response.json()["detail"]
+
+
+class TestEmbedBatching:
+    """Test that concurrent /embed requests share model calls."""
+
+    @pytest.mark.asyncio
+    @patch("app.main.get_embedding_service")
+    async def test_embed_dynamic_batching(self, mock_get_service, async_client, api_headers):
+        """Test that concurrent requests are served by a single batched forward pass."""
+        mock_service = Mock()
+        mock_service.embed_texts.side_effect = lambda texts: [[float(len(t))] for t in texts]
+        mock_get_service.return_value = mock_service
+        texts = ["word " * (i + 1) + "end" for i in range(8)]
+
+        with patch.object(embed_batcher, "max_wait", 0.05):
+            responses = await asyncio.gather(
+                *(async_client.post("/embed", json={"text": t}, headers=api_headers) for t in texts)
+            )
+
+        assert [r.json()["embedding"] for r in responses] == [[float(len(t))] for t in texts]
+        assert mock_service.embed_texts.call_count == 1
+        assert len(mock_service.embed_texts.call_args[0][0]) == len(texts)
+
+
+class TestEmbedRawEndpoint:
+    """Test cases for the /embed/raw endpoint."""
+
+    @patch("app.main.get_embedding_service")
+    def test_embed_raw_success(self, mock_get_service, client, api_headers):
+        """Test that the embedding is returned as float16 bytes."""
+        mock_service = Mock()
+        mock_service.embed_texts_array.return_value = np.array([[0.5, -1.0, 0.25]], np.float32)
+        mock_get_service.return_value = mock_service
+
+        response = client.post("/embed/raw", json={"text": " Hello world "}, headers=api_headers)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/octet-stream"
+        assert np.frombuffer(response.content, dtype="<f2").tolist() == [0.5, -1.0, 0.25]
+        mock_service.embed_texts_array.assert_called_once_with(["Hello world"])
+
+    def test_embed_raw_empty_string(self, client, api_headers):
+        """Test that empty text returns 400."""
+        response = client.post("/embed/raw", json={"text": "  "}, headers=api_headers)
+
+        assert response.status_code == 400
+        assert "Text cannot be empty" in response.json()["detail"]
+
+    @patch("app.main.get_embedding_service")
+    def test_embed_raw_service_error(self, mock_get_service, client, api_headers):
+        """Test handling of embedding service errors."""
+        mock_service = Mock()
+        mock_service.embed_texts_array.side_effect = Exception("Model failed")
+        mock_get_service.return_value = mock_service
+
+        response = client.post("/embed/raw", json={"text": "Hello"}, headers=api_headers)
+
+        assert response.status_code == 500
+        assert "Embedding error" in response.json()["detail"]
+
+
+class TestEmbedBatchRawEndpoint:
+    """Test cases for the /embed/batch/raw endpoint."""
+
+    @patch("app.main.get_embedding_service")
+    def test_embed_batch_raw_success(self, mock_get_service, client, api_headers):
+        """Test that embeddings come back as one float16 row per text."""
+        mock_service = Mock()
+        mock_service.embed_texts_array.return_value = np.array(
+            [[0.5, -1.0, 0.25], [1.0, 0.0, -0.5]], np.float32
+        )
+        mock_get_service.return_value = mock_service
+
+        response = client.post(
+            "/embed/batch/raw", json={"texts": [" first ", "second"]}, headers=api_headers
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/octet-stream"
+        matrix = np.frombuffer(response.content, dtype="<f2").reshape(2, -1)
+        assert matrix.tolist() == [[0.5, -1.0, 0.25], [1.0, 0.0, -0.5]]
+        mock_service.embed_texts_array.assert_called_once_with(["first", "second"])
+
+    @patch("app.main.get_embedding_service")
+    def test_embed_batch_raw_empty_list(self, mock_get_service, client, api_headers):
+        """Test that an empty list returns an empty body without touching the model."""
+        response = client.post("/embed/batch/raw", json={"texts": []}, headers=api_headers)
+
+        assert response.status_code == 200
+        assert response.content == b""
+        mock_get_service.assert_not_called()
+
+    def test_embed_batch_raw_empty_text(self, client, api_headers):
+        """Test that a blank text in the batch returns 400."""
+        response = client.post(
+            "/embed/batch/raw", json={"texts": ["ok", "  "]}, headers=api_headers
+        )
+
+        assert response.status_code == 400
+        assert "Texts cannot be empty" in response.json()["detail"]
+
+
+class TestStartupWarmup:
+    """Test cases for loading the embedding model at startup."""
+
+    @patch("app.main.get_embedding_service")
+    def test_startup_warms_up_model(self, mock_get_service):
+        """Test that the model is loaded and run once before serving requests."""
+        mock_service = Mock()
+        mock_get_service.return_value = mock_service
+
+        with TestClient(app):
+            mock_service.embed_text.assert_called_once_with("warmup")
+
+    @patch.dict("os.environ", {"EAGER_LOAD_EMBED": "0"})
+    @patch("app.main.get_embedding_service")
+    def test_startup_warmup_disabled(self, mock_get_service):
+        """Test that EAGER_LOAD_EMBED=0 defers model loading to the first request."""
+        with TestClient(app):
+            mock_get_service.assert_not_called()
@@ -3,11 +3,19 @@ Tests for the embedding service module.
 """
 
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import Mock, patch
 
+import numpy as np
 import pytest
 import torch
-from app.embedding_service import EmbeddingService, get_embedding_service
+from app.embedding_service import (
+    EmbeddingOutOfMemoryError,
+    EmbeddingService,
+    get_embedding_service,
+)
 
 
 class TestEmbeddingService:
@@ -46,6 +54,7 @@ class TestEmbeddingService:
             )
         mock_model.to.assert_called_once_with("cpu")
         mock_model.eval.assert_called_once()
+        mock_model.requires_grad_.assert_called_once_with(False)
 
     @patch("app.embedding_service.AutoTokenizer")
     @patch("app.embedding_service.AutoModel")
@@ -56,10 +65,139 @@ class TestEmbeddingService:
         mock_tokenizer_class.from_pretrained.return_value = mock_tokenizer
         mock_model_class.from_pretrained.return_value = mock_model
 
-        service = EmbeddingService(device="cuda")
+        with patch("app.embedding_service.torch.backends.cuda.enable_flash_sdp") as mock_flash:
+            service = EmbeddingService(device="cuda")
 
         assert service.device == "cuda"
         mock_model.to.assert_called_once_with("cuda")
+        mock_flash.assert_called_once_with(True)
+
+    @patch("app.embedding_service.AutoTokenizer")
+    @patch("app.embedding_service.AutoModel")
+    def test_init_compiles_model_when_enabled(self, mock_model_class, mock_tokenizer_class):
+        """Test that EMBED_COMPILE=1 wraps the text encoder and runs a warm-up pass."""
+        mock_model = Mock()
+        mock_tokenizer_class.from_pretrained.return_value = Mock()
+        mock_model_class.from_pretrained.return_value = mock_model
+        compiled = Mock()
+
+        with (
+            patch.dict(os.environ, {"EMBED_COMPILE": "1"}),
+            patch("app.embedding_service.torch.compile", return_value=compiled) as mock_compile,
+            patch.object(EmbeddingService, "embed_text") as mock_embed_text,
+        ):
+            service = EmbeddingService(device="cpu")
+
+        mock_compile.assert_called_once_with(
+            mock_model.get_text_features, mode="reduce-overhead", dynamic=True
+        )
+        assert service._get_text_features is compiled
+        mock_embed_text.assert_called_once_with("warmup")
+
+    @patch("app.embedding_service.AutoTokenizer")
+    @patch("app.embedding_service.AutoModel")
+    def test_init_skips_compile_by_default(self, mock_model_class, mock_tokenizer_class):
+        """Test that the eager encoder is used unless compilation is requested."""
+        mock_model = Mock()
+        mock_tokenizer_class.from_pretrained.return_value = Mock()
+        mock_model_class.from_pretrained.return_value = mock_model
+
+        with (
+            patch.dict(os.environ),
+            patch("app.embedding_service.torch.compile") as mock_compile,
+        ):
+            os.environ.pop("EMBED_COMPILE", None)
+            service = EmbeddingService(device="cpu")
+
+        mock_compile.assert_not_called()
+        assert service._get_text_features is mock_model.get_text_features
+
+    @patch("app.embedding_service.AutoTokenizer")
+    @patch("app.embedding_service.AutoModel")
+    def test_compile_argument_overrides_environment(self, mock_model_class, mock_tokenizer_class):
+        """Test that compile_model wins over EMBED_COMPILE in both directions."""
+        mock_tokenizer_class.from_pretrained.return_value = Mock()
+        mock_model_class.from_pretrained.return_value = Mock()
+
+        with (
+            patch("app.embedding_service.torch.compile") as mock_compile,
+            patch.object(EmbeddingService, "embed_text"),
+        ):
+            with patch.dict(os.environ, {"EMBED_COMPILE": "1"}):
+                EmbeddingService(device="cpu", compile_model=False)
+            mock_compile.assert_not_called()
+
+            with patch.dict(os.environ, {"EMBED_COMPILE": "0"}):
+                EmbeddingService(device="cuda", compile_model=True)
+            mock_compile.assert_called_once()
+
+    @patch("app.embedding_service.AutoTokenizer")
+    @patch("app.embedding_service.AutoModel")
+    def test_compile_skipped_on_mps(self, mock_model_class, mock_tokenizer_class):
+        """Test that the encoder is never compiled on MPS."""
+        mock_model = Mock()
+        mock_tokenizer_class.from_pretrained.return_value = Mock()
+        mock_model_class.from_pretrained.return_value = mock_model
+
+        with patch("app.embedding_service.torch.compile") as mock_compile:
+            service = EmbeddingService(device="mps", compile_model=True)
+
+        mock_compile.assert_not_called()
+        assert service._get_text_features is mock_model.get_text_features
+
+    @patch("app.embedding_service.AutoTokenizer")
+    @patch("app.embedding_service.AutoModel")
+    def test_init_quantizes_model_on_cpu(self, mock_model_class, mock_tokenizer_class):
+        """Test that EMBED_QUANTIZE=1 swaps in a dynamically quantized model on CPU."""
+        mock_model = Mock()
+        quantized_model = Mock()
+        mock_tokenizer_class.from_pretrained.return_value = Mock()
+        mock_model_class.from_pretrained.return_value = mock_model
+
+        with (
+            patch.dict(os.environ, {"EMBED_QUANTIZE": "1"}),
+            patch(
+                "app.embedding_service.torch.ao.quantization.quantize_dynamic",
+                return_value=quantized_model,
+            ) as mock_quantize,
+        ):
+            service = EmbeddingService(device="cpu")
+
+        mock_quantize.assert_called_once_with(mock_model, {torch.nn.Linear}, dtype=torch.qint8)
+        assert service.model is quantized_model
+        assert service._get_text_features is quantized_model.get_text_features
+
+    @patch("app.embedding_service.AutoTokenizer")
+    @patch("app.embedding_service.AutoModel")
+    def test_init_skips_quantization_off_cpu(self, mock_model_class, mock_tokenizer_class):
+        """Test that quantization is never applied to GPU models."""
+        mock_tokenizer_class.from_pretrained.return_value = Mock()
+        mock_model_class.from_pretrained.return_value = Mock()
+
+        with (
+            patch.dict(os.environ, {"EMBED_QUANTIZE": "1"}),
+            patch("app.embedding_service.torch.ao.quantization.quantize_dynamic") as mock_quantize,
+        ):
+            EmbeddingService(device="cuda")
+
+        mock_quantize.assert_not_called()
+
+    @patch("app.embedding_service.AutoTokenizer")
+    @patch("app.embedding_service.AutoModel")
+    def test_quantize_argument_overrides_environment(self, mock_model_class, mock_tokenizer_class):
+        """Test that quantize wins over EMBED_QUANTIZE in both directions."""
+        mock_model = Mock()
+        mock_tokenizer_class.from_pretrained.return_value = Mock()
+        mock_model_class.from_pretrained.return_value = mock_model
+
+        with patch("app.embedding_service.torch.ao.quantization.quantize_dynamic") as mock_quantize:
+            with patch.dict(os.environ, {"EMBED_QUANTIZE": "1"}):
+                EmbeddingService(device="cpu", quantize=False)
+            mock_quantize.assert_not_called()
+
+            with patch.dict(os.environ, {"EMBED_QUANTIZE": "0"}):
+                EmbeddingService(device="cpu", quantize=True)
+            mock_quantize.assert_called_once_with(mock_model, {torch.nn.Linear}, dtype=torch.qint8)
 
     @patch("app.embedding_service.torch.cuda.is_available", return_value=True)
     def test_get_best_device_cuda(self, mock_cuda_available):
@@ -84,6 +222,109 @@ class TestEmbeddingService:
         device = service._get_best_device()
         assert device == "cpu"
 
+    @patch("app.embedding_service.torch.cuda.is_bf16_supported", return_value=True)
+    def test_autocast_cuda_prefers_bfloat16(self, mock_bf16_supported):
+        """Test that CUDA autocasts to bfloat16 when the GPU supports it."""
+        service = EmbeddingService.__new__(EmbeddingService)
+        service.device = "cuda"
+        service.half_precision = True
+        with patch("app.embedding_service.torch.autocast") as mock_autocast:
+            service._autocast()
+        mock_autocast.assert_called_once_with(device_type="cuda", dtype=torch.bfloat16)
+
+    @patch("app.embedding_service.torch.cuda.is_bf16_supported", return_value=False)
+    def test_autocast_cuda_falls_back_to_float16(self, mock_bf16_supported):
+        """Test that CUDA autocasts to float16 on GPUs without bfloat16."""
+        service = EmbeddingService.__new__(EmbeddingService)
+        service.device = "cuda"
+        service.half_precision = True
+        with patch("app.embedding_service.torch.autocast") as mock_autocast:
+            service._autocast()
+        mock_autocast.assert_called_once_with(device_type="cuda", dtype=torch.float16)
+
+    def test_autocast_cpu_disabled(self):
+        """Test that CPU inference runs without autocast."""
+        service = EmbeddingService.__new__(EmbeddingService)
+        service.device = "cpu"
+        service.half_precision = True
+        with patch("app.embedding_service.torch.autocast") as mock_autocast:
+            service._autocast()
+        mock_autocast.assert_not_called()
+
+    def test_autocast_disabled_without_half_precision(self):
+        """Test that half_precision=False keeps CUDA inference in full precision."""
+        service = EmbeddingService.__new__(EmbeddingService)
+        service.device = "cuda"
+        service.half_precision = False
+        with patch("app.embedding_service.torch.autocast") as mock_autocast:
+            service._autocast()
+        mock_autocast.assert_not_called()
+
+    def test_compute_embeddings_out_of_memory(self):
+        """Test that CUDA OOM frees the allocator cache and raises EmbeddingOutOfMemoryError."""
+        service = EmbeddingService.__new__(EmbeddingService)
+        service.device = "cpu"
+        service.half_precision = True
+        service.tokenizer = Mock()
+        # Tokenized inputs must unpack into the forward call for the OOM to be raised there
+        service.tokenizer.return_value.to.return_value = {}
+        service._get_text_features = Mock(side_effect=torch.cuda.OutOfMemoryError("boom"))
+
+        with patch("app.embedding_service.torch.cuda.empty_cache") as mock_empty_cache:
+            with pytest.raises(EmbeddingOutOfMemoryError):
+                service._compute_embeddings(["test text"])
+
+        service._get_text_features.assert_called_once_with()
+        mock_empty_cache.assert_called_once()
+
+    def test_compute_sorted_runs_one_forward_pass_at_a_time(self):
+        """Test that model calls from concurrent threads never overlap."""
+        service = EmbeddingService.__new__(EmbeddingService)
+        service.micro_batch_size = 32
+        service._model_lock = threading.Lock()
+        active = []
+        overlaps = []
+
+        def compute(texts):
+            active.append(texts)
+            overlaps.append(len(active) > 1)
+            time.sleep(0.01)
+            active.remove(texts)
+            return np.zeros((len(texts), 4), dtype=np.float32)
+
+        service._compute_embeddings = compute
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(service._compute_sorted, [[f"text {i}"] for i in range(4)]))
+
+        assert len(overlaps) == 4
+        assert not any(overlaps)
+
+    def test_tokenize_copies_pinned_tensors_to_cuda(self):
+        """Test that CUDA inputs are pinned and copied without blocking."""
+        service = EmbeddingService.__new__(EmbeddingService)
+        service.device = "cuda"
+        mock_tensor = Mock()
+        service.tokenizer = Mock(return_value={"input_ids": mock_tensor})
+
+        inputs = service._tokenize(["test text"])
+
+        service.tokenizer.assert_called_once_with(
+            ["test text"], padding=True, truncation=True, return_tensors="pt", max_length=512
+        )
+        mock_tensor.pin_memory.return_value.to.assert_called_once_with("cuda", non_blocking=True)
+        assert inputs == {"input_ids": mock_tensor.pin_memory.return_value.to.return_value}
+
+    def test_tokenize_cpu_skips_pinning(self):
+        """Test that CPU inputs are moved with a plain BatchEncoding.to call."""
+        service = EmbeddingService.__new__(EmbeddingService)
+        service.device = "cpu"
+        service.tokenizer = Mock()
+
+        inputs = service._tokenize(["test text"])
+
+        service.tokenizer.return_value.to.assert_called_once_with("cpu")
+        assert inputs is service.tokenizer.return_value.to.return_value
+
     @patch("app.embedding_service.AutoTokenizer")
     @patch("app.embedding_service.AutoModel")
     def test_embed_text_single(self, mock_model_class, mock_tokenizer_class):
@@ -107,15 +348,14 @@ class TestEmbeddingService:
         mock_embeddings = torch.tensor([[1.0, 2.0, 3.0, 4.0]])
         mock_model.get_text_features.return_value = mock_embeddings
 
-        # Mock normalization
-        normalized_embeddings = torch.tensor([[0.1826, 0.3651, 0.5477, 0.7303]])
-        with patch("torch.nn.functional.normalize", return_value=normalized_embeddings):
-            service = EmbeddingService(device="cpu")
-            result = service.embed_text("test text")
+        service = EmbeddingService(device="cpu")
+        result = service.embed_text("test text")
 
         assert isinstance(result, list)
         assert len(result) == 4
         assert all(isinstance(x, float) for x in result)
+        assert np.allclose(result, [0.1826, 0.3651, 0.5477, 0.7303], atol=1e-4)
+        assert abs(np.linalg.norm(result) - 1.0) < 1e-5
 
         # Verify calls
         mock_tokenizer.assert_called_once_with(
@@ -146,16 +386,14 @@ class TestEmbeddingService:
         mock_embeddings = torch.tensor([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]])
         mock_model.get_text_features.return_value = mock_embeddings
 
-        # Mock normalization
-        normalized_embeddings = torch.tensor([[0.2673, 0.5345, 0.8018], [0.4558, 0.5698, 0.6838]])
-        with patch("torch.nn.functional.normalize", return_value=normalized_embeddings):
-            service = EmbeddingService(device="cpu")
-            results = service.embed_texts(["text one", "text two"])
+        service = EmbeddingService(device="cpu")
+        results = service.embed_texts(["text one", "text two"])
 
         assert isinstance(results, list)
         assert len(results) == 2
         assert all(isinstance(result, list) for result in results)
         assert all(len(result) == 3 for result in results)
+        assert np.allclose(results, [[0.2673, 0.5345, 0.8018], [0.4558, 0.5698, 0.6838]], atol=1e-4)
 
         # Verify calls
         mock_tokenizer.assert_called_once_with(
@@ -182,6 +420,108 @@ class TestEmbeddingService:
         mock_tokenizer.assert_not_called()
         mock_model.get_text_features.assert_not_called()
 
+    @patch("app.embedding_service.AutoTokenizer")
+    @patch("app.embedding_service.AutoModel")
+    def test_embed_texts_array(self, mock_model_class, mock_tokenizer_class):
+        """Test that embeddings can be returned as one float32 array."""
+        mock_tokenizer = Mock()
+        mock_model = Mock()
+        mock_tokenizer_class.from_pretrained.return_value = mock_tokenizer
+        mock_model_class.from_pretrained.return_value = mock_model
+        mock_tokenizer.return_value.to.return_value = {}
+        mock_model.get_text_features.return_value = torch.tensor([[3.0, 4.0], [0.0, 2.0]])
+
+        service = EmbeddingService(device="cpu")
+        result = service.embed_texts_array(["one", "two"])
+
+        assert isinstance(result, np.ndarray)
+        assert result.dtype == np.float32
+        assert result.shape == (2, 2)
+        np.testing.assert_allclose(result, [[0.6, 0.8], [0.0, 1.0]], rtol=1e-6)
+        assert service.embed_texts_array([]).shape == (0, 0)
+
+    @patch("app.embedding_service.AutoTokenizer")
+    @patch("app.embedding_service.AutoModel")
+    def test_embed_text_cache_hit(self, mock_model_class, mock_tokenizer_class):
+        """Test that repeated texts skip tokenization and the model."""
+        mock_tokenizer = Mock()
+        mock_model = Mock()
+        mock_tokenizer_class.from_pretrained.return_value = mock_tokenizer
+        mock_model_class.from_pretrained.return_value = mock_model
+        mock_tokenizer.return_value.to.return_value = {}
+        mock_model.get_text_features.return_value = torch.tensor([[3.0, 4.0]])
+
+        service = EmbeddingService(device="cpu")
+        first = service.embed_text("hot query")
+        second = service.embed_text("hot query")
+
+        assert first == second
+        assert first == pytest.approx([0.6, 0.8])
+        mock_tokenizer.assert_called_once()
+        mock_model.get_text_features.assert_called_once()
+
+    @patch("app.embedding_service.AutoTokenizer")
+    @patch("app.embedding_service.AutoModel")
+    def test_embed_texts_only_embeds_cache_misses(self, mock_model_class, mock_tokenizer_class):
+        """Test that only uncached, de-duplicated texts reach the model."""
+        mock_tokenizer = Mock()
+        mock_model = Mock()
+        mock_tokenizer_class.from_pretrained.return_value = mock_tokenizer
+        mock_model_class.from_pretrained.return_value = mock_model
+        mock_tokenizer.return_value.to.return_value = {}
+        mock_model.get_text_features.side_effect = [
+            torch.tensor([[1.0, 0.0]]),
+            torch.tensor([[0.0, 1.0]]),
+        ]
+
+        service = EmbeddingService(device="cpu")
+        service.embed_texts(["cached"])
+        results = service.embed_texts(["new", "cached", "new"])
+
+        assert results == [[0.0, 1.0], [1.0, 0.0], [0.0, 1.0]]
+        assert mock_tokenizer.call_args_list[1].args[0] == ["new"]
+
+    @patch("app.embedding_service.AutoTokenizer")
+    @patch("app.embedding_service.AutoModel")
+    def test_embed_texts_sorted_by_length(self, mock_model_class, mock_tokenizer_class):
+        """Test that misses run in length-sorted micro-batches and come back in order."""
+        mock_tokenizer_class.from_pretrained.return_value = Mock()
+        mock_model_class.from_pretrained.return_value = Mock()
+        texts = ["a", "long " * 400, "b", "long " * 399]
+
+        service = EmbeddingService(device="cpu", micro_batch_size=2)
+        with patch.object(
+            service,
+            "_compute_embeddings",
+            side_effect=lambda chunk: np.array([[float(len(t))] for t in chunk]),
+        ) as mock_compute:
+            results = service.embed_texts_array(texts)
+
+        assert [call.args[0] for call in mock_compute.call_args_list] == [
+            ["a", "b"],
+            ["long " * 399, "long " * 400],
+        ]
+        assert results[:, 0].tolist() == [1.0, 2000.0, 1.0, 1995.0]
+
+    @patch("app.embedding_service.AutoTokenizer")
+    @patch("app.embedding_service.AutoModel")
+    def test_embed_cache_evicts_least_recently_used(self, mock_model_class, mock_tokenizer_class):
+        """Test that the cache stays within cache_size."""
+        mock_tokenizer = Mock()
+        mock_model = Mock()
+        mock_tokenizer_class.from_pretrained.return_value = mock_tokenizer
+        mock_model_class.from_pretrained.return_value = mock_model
+        mock_tokenizer.return_value.to.return_value = {}
+        mock_model.get_text_features.return_value = torch.tensor([[1.0, 0.0]])
+
+        service = EmbeddingService(device="cpu", cache_size=2)
+        service.embed_text("a")
+        service.embed_text("b")
+        service.embed_text("a")
+        service.embed_text("c")
+
+        assert list(service._cache) == ["a", "c"]
+
     @patch("app.embedding_service.AutoTokenizer")
     @patch("app.embedding_service.AutoModel")
     def test_embed_text_error_handling(self, mock_model_class, mock_tokenizer_class):
@@ -2,10 +2,12 @@
 Test module for the Reddit scraper functionality.
 """
 
+import asyncio
+import json
 import os
+import shutil
 import sqlite3
 import sys
-import tempfile
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -15,14 +17,49 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
 # ruff: noqa: E402
 from app.reddit_scraper import (
-    extract_urls_from_text,
-    filter_reddit_urls,
+    get_netloc,
     get_random_sort_and_time,
     get_random_time_filter,
     get_reddit_posts,
+    get_reddit_session,
+    is_allowed_netloc,
+    iter_urls_with_netloc,
     scrape_reddit_batch,
+    scrape_reddit_continuous,
 )
 
+# Schema shared by the database-backed tests
+SCHEMA = (
+    """
+    CREATE TABLE documents (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        url TEXT UNIQUE,
+        title TEXT,
+        content TEXT
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE document_content USING fts5(
+        content,
+        content='documents',
+        content_rowid='id',
+        tokenize='porter unicode61'
+    )
+    """,
+)
+
+
+@pytest.fixture(scope="session")
+def template_db(tmp_path_factory):
+    """Create the schema once; tests copy the file instead of rebuilding it."""
+    path = tmp_path_factory.mktemp("template") / "search.db"
+    conn = sqlite3.connect(path)
+    for statement in SCHEMA:
+        conn.execute(statement)
+    conn.commit()
+    conn.close()
+    return path
+
 
 class TestRedditAPI:
     """Test Reddit API interaction functions."""
@@ -45,40 +82,42 @@ class TestRedditAPI:
         time_filter = get_random_time_filter()
         assert time_filter in ["day", "week", "month", "year", "all"]
 
-    @patch("requests.get")
-    def test_get_reddit_posts_success(self, mock_get):
+    @patch("app.reddit_scraper.get_reddit_session")
+    def test_get_reddit_posts_success(self, mock_get_session):
         """Test successful Reddit API call."""
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {
-            "data": {
-                "children": [
-                    {
-                        "data": {
-                            "title": "Test Post 1",
-                            "url": "https://example.com/post1",
-                            "selftext": "This is test content",
-                            "score": 100,
-                            "created_utc": 1640995200,
-                            "permalink": "/r/test/comments/123/test_post_1",
-                        }
-                    },
-                    {
-                        "data": {
-                            "title": "Test Post 2",
-                            "url": "https://example.com/post2",
-                            "selftext": "",
-                            "score": 50,
-                            "created_utc": 1640995300,
-                            "permalink": "/r/test/comments/124/test_post_2",
-                        }
-                    },
-                ],
-                "after": "test_token",
+        mock_response.content = json.dumps(
+            {
+                "data": {
+                    "children": [
+                        {
+                            "data": {
+                                "title": "Test Post 1",
+                                "url": "https://example.com/post1",
+                                "selftext": "This is test content",
+                                "score": 100,
+                                "created_utc": 1640995200,
+                                "permalink": "/r/test/comments/123/test_post_1",
+                            }
+                        },
+                        {
+                            "data": {
+                                "title": "Test Post 2",
+                                "url": "https://example.com/post2",
+                                "selftext": "",
+                                "score": 50,
+                                "created_utc": 1640995300,
+                                "permalink": "/r/test/comments/124/test_post_2",
+                            }
+                        },
+                    ],
+                    "after": "test_token",
+                }
             }
-        }
+        ).encode()
         mock_response.raise_for_status.return_value = None
-        mock_get.return_value = mock_response
+        mock_get_session.return_value.get.return_value = mock_response
 
         posts, next_after = get_reddit_posts("InternetIsBeautiful", limit=25)
 
@@ -87,11 +126,23 @@ class TestRedditAPI:
         assert posts[0]["url"] == "https://example.com/post1"
         assert posts[1]["title"] == "Test Post 2"
         assert next_after == "test_token"
+        mock_get_session.return_value.get.assert_called_once_with(
+            "https://www.reddit.com/r/InternetIsBeautiful/hot.json",
+            params={"limit": 25},
+            timeout=10,
+        )
+
+    def test_get_reddit_session_is_shared(self):
+        """Test that one keep-alive session is reused across calls."""
+        session = get_reddit_session()
 
-    @patch("requests.get")
-    def test_get_reddit_posts_failure(self, mock_get):
+        assert session is get_reddit_session()
+        assert session.headers["User-Agent"] == "gem-search-bot/1.0 (content discovery tool)"
+
+    @patch("app.reddit_scraper.get_reddit_session")
+    def test_get_reddit_posts_failure(self, mock_get_session):
         """Test Reddit API failure handling."""
-        mock_get.side_effect = Exception("API Error")
+        mock_get_session.return_value.get.side_effect = Exception("API Error")
 
         posts, next_after = get_reddit_posts("InternetIsBeautiful")
 
@@ -99,10 +150,15 @@ class TestRedditAPI:
         assert next_after is None
 
 
+def extract_urls(text):
+    """Collect the URLs iter_urls_with_netloc finds in text."""
+    return {url for url, _ in iter_urls_with_netloc(text)}
+
+
 class TestURLExtraction:
     """Test URL extraction and filtering functions."""
 
-    def test_extract_urls_from_text(self):
+    def test_extract_urls(self):
         """Test URL extraction from text."""
         text = """
         Check out these sites:
@@ -111,7 +167,7 @@ class TestURLExtraction:
         Email me at test@example.com (not a URL)
         """
 
-        urls = extract_urls_from_text(text)
+        urls = extract_urls(text)
 
         expected_urls = {
             "https://example.com/page1",
@@ -125,95 +181,77 @@ class TestURLExtraction:
         """Test URL extraction handles trailing punctuation."""
         text = "Visit https://example.com/page, or https://test.org/page!"
 
-        urls = extract_urls_from_text(text)
+        urls = extract_urls(text)
 
         expected_urls = {"https://example.com/page", "https://test.org/page"}
 
         assert urls == expected_urls
 
-    def test_filter_reddit_urls(self):
-        """Test filtering out Reddit and social media URLs."""
-        urls = {
-            "https://example.com/article",
-            "https://reddit.com/r/test",
-            "https://www.reddit.com/r/test/comments/123",
-            "https://imgur.com/gallery/abc",
-            "https://youtube.com/watch?v=123",
-            "https://twitter.com/user/status/123",
-            "https://cool-site.net/article",
-        }
+    def test_extract_urls_adversarial_selftext(self):
+        """Test that long punctuation-heavy text is scanned without backtracking blowup."""
+        text = "https://example.com/" + "a." * 200_000 + " https://test.org/end)"
 
-        filtered = filter_reddit_urls(urls)
+        urls = extract_urls(text)
 
-        expected_filtered = {"https://example.com/article", "https://cool-site.net/article"}
+        assert len(urls) == 2
+        assert "https://test.org/end" in urls
 
-        assert filtered == expected_filtered
+    def test_extract_urls_compiles_once(self):
+        """Test that extraction reuses the module-level patterns instead of compiling."""
+        with patch("re.compile") as mock_compile:
+            urls = extract_urls("See https://example.com/page.")
 
-    def test_filter_reddit_urls_edge_cases(self):
-        """Test filtering handles edge cases."""
-        urls = {
-            "https://reddit-like.com/page",  # Should not be filtered
-            "https://old.reddit.com/r/test",  # Should be filtered
-            "https://m.reddit.com/r/test",  # Should be filtered
-            "invalid-url",  # Should be filtered out due to parsing error
-        }
+        assert urls == {"https://example.com/page"}
+        mock_compile.assert_not_called()
 
-        filtered = filter_reddit_urls(urls)
+    def test_iter_urls_with_netloc(self):
+        """Test that URLs are yielded with the host parsed after stripping punctuation."""
+        text = "See https://Example.com/page, https://reddit.com. and https:///nohost"
 
-        # Should only keep the valid non-Reddit URL
-        # invalid-url gets skipped due to urlparse exception
-        expected_filtered = {"https://reddit-like.com/page"}
+        pairs = list(iter_urls_with_netloc(text))
 
-        assert filtered == expected_filtered
+        assert pairs == [
+            ("https://Example.com/page", "Example.com"),
+            ("https://reddit.com", "reddit.com"),
+        ]
+
+    def test_is_allowed_netloc(self):
+        """Test the host-only skip check."""
+        assert is_allowed_netloc("example.com")
+        assert not is_allowed_netloc("WWW.REDDIT.COM")
+        assert not is_allowed_netloc("")
+
+    def test_is_allowed_netloc_matches_exact_hosts(self):
+        """Test that blocked domains are matched exactly, not as hostname suffixes."""
+        assert is_allowed_netloc("box.com")
+        assert is_allowed_netloc("notreddit.com")
+        assert is_allowed_netloc("reddit-like.com")
+        assert not is_allowed_netloc("x.com")
+        assert not is_allowed_netloc("old.reddit.com")
+
+    def test_get_netloc(self):
+        """Test netloc extraction from absolute and relative URLs."""
+        assert get_netloc("https://Example.com:8080/path?q=1") == "Example.com:8080"
+        assert get_netloc("http://example.com?q=1") == "example.com"
+        assert get_netloc("https://example.com#top") == "example.com"
+        assert get_netloc("/r/test/comments/123") == ""
+        assert get_netloc("mailto:test@example.com") == ""
+        assert get_netloc("https://") == ""
 
 
 class TestRedditScraper:
     """Test the main Reddit scraper functionality."""
 
-    def setup_method(self):
-        """Set up a temporary database for testing."""
-        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
-        self.temp_db.close()
-        self.db_path = self.temp_db.name
-
-        # Initialize the database with proper schema
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        # Create documents table
-        cursor.execute(
-            """
-            CREATE TABLE documents (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                url TEXT UNIQUE,
-                title TEXT,
-                content TEXT
-            )
-        """
-        )
-
-        # Create FTS5 virtual table
-        cursor.execute(
-            """
-            CREATE VIRTUAL TABLE document_content USING fts5(
-                content,
-                document_id UNINDEXED,
-                tokenize='porter unicode61'
-            )
-        """
-        )
-
-        conn.commit()
-        conn.close()
-
-    def teardown_method(self):
-        """Clean up the temporary database."""
-        if os.path.exists(self.db_path):
-            os.unlink(self.db_path)
+    @pytest.fixture(autouse=True)
+    def setup_database(self, template_db, tmp_path):
+        """Give each test its own copy of the template database."""
+        self.db_path = str(tmp_path / "search.db")
+        shutil.copyfile(template_db, self.db_path)
 
     @patch("app.reddit_scraper.get_reddit_posts")
+    @patch("app.reddit_scraper.scrape_with_discovery_concurrent", new_callable=MagicMock)
     @patch("asyncio.run")
-    def test_scrape_reddit_batch_success(self, mock_asyncio_run, mock_get_posts):
+    def test_scrape_reddit_batch_success(self, mock_asyncio_run, mock_scrape, mock_get_posts):
         """Test successful Reddit batch scraping."""
         # Mock Reddit API response
         mock_posts = [
@@ -241,6 +279,125 @@ class TestRedditScraper:
         # Verify async scraper was called
         mock_asyncio_run.assert_called_once()
 
+    @patch("app.reddit_scraper.get_reddit_posts")
+    @patch("app.reddit_scraper.scrape_with_discovery_concurrent", new_callable=MagicMock)
+    @patch("asyncio.run")
+    def test_scrape_reddit_batch_passes_urls_in_memory(
+        self, mock_asyncio_run, mock_scrape, mock_get_posts
+    ):
+        """Test that filtered URLs are handed to the scraper without a temp file."""
+        mock_posts = [
+            {
+                "title": "Cool Website",
+                "url": "https://example.com/cool",
+                "selftext": "Check out https://test.org/article",
+                "score": 100,
+                "created_utc": 1640995200,
+                "permalink": "/r/test/comments/123/cool_website",
+            }
+        ]
+        mock_get_posts.return_value = (mock_posts, None)
+        mock_asyncio_run.return_value = (1, 2)
+
+        scrape_reddit_batch("InternetIsBeautiful", self.db_path)
+
+        links = mock_scrape.call_args.args[0]
+        assert isinstance(links, list)
+        assert sorted(links) == ["https://example.com/cool", "https://test.org/article"]
+
+    @patch("app.reddit_scraper.get_reddit_posts")
+    @patch("app.reddit_scraper.scrape_with_discovery_concurrent", new_callable=MagicMock)
+    @patch("asyncio.run")
+    def test_scrape_reddit_batch_filters_selftext_urls(
+        self, mock_asyncio_run, mock_scrape, mock_get_posts
+    ):
+        """Test that selftext URLs are counted but skipped domains are not scraped."""
+        mock_posts = [
+            {
+                "title": "Roundup",
+                "url": "https://example.com/cool",
+                "selftext": "See https://imgur.com/abc and https://test.org/a, also https://example.com/cool.",
+                "score": 10,
+                "created_utc": 1640995200,
+                "permalink": "/r/test/comments/125/roundup",
+            }
+        ]
+        mock_get_posts.return_value = (mock_posts, None)
+        mock_asyncio_run.return_value = (0, 2)
+
+        reddit_urls, _, _ = scrape_reddit_batch("InternetIsBeautiful", self.db_path)
+
+        assert reddit_urls == 3
+        assert sorted(mock_scrape.call_args.args[0]) == [
+            "https://example.com/cool",
+            "https://test.org/a",
+        ]
+
+    @patch("app.reddit_scraper.get_reddit_posts")
+    @patch("app.reddit_scraper.scrape_with_discovery_concurrent", new_callable=MagicMock)
+    @patch("asyncio.run")
+    def test_scrape_reddit_batch_filters_skipped_domains(
+        self, mock_asyncio_run, mock_scrape, mock_get_posts
+    ):
+        """Test that Reddit and social media hosts are dropped without urllib.parse."""
+        mock_posts = [
+            {
+                "title": "Link dump",
+                "url": "https://example.com/article",
+                "selftext": (
+                    "https://reddit.com/r/test https://old.reddit.com/r/test "
+                    "https://imgur.com/gallery/abc https://youtube.com/watch?v=123 "
+                    "https://x.com/post https://box.com/file https://notreddit.com/page"
+                ),
+                "score": 10,
+                "created_utc": 1640995200,
+                "permalink": "/r/test/comments/127/link_dump",
+            }
+        ]
+        mock_get_posts.return_value = (mock_posts, None)
+        mock_asyncio_run.return_value = (0, 3)
+
+        with (
+            patch("urllib.parse.urlparse", side_effect=AssertionError),
+            patch("urllib.parse.urlsplit", side_effect=AssertionError),
+        ):
+            reddit_urls, _, _ = scrape_reddit_batch("InternetIsBeautiful", self.db_path)
+
+        assert reddit_urls == 8
+        assert sorted(mock_scrape.call_args.args[0]) == [
+            "https://box.com/file",
+            "https://example.com/article",
+            "https://notreddit.com/page",
+        ]
+
+    @patch("app.reddit_scraper.get_reddit_posts")
+    @patch("app.reddit_scraper.scrape_with_discovery_concurrent", new_callable=MagicMock)
+    @patch("asyncio.run")
+    def test_scrape_reddit_batch_skips_regex_without_links(
+        self, mock_asyncio_run, mock_scrape, mock_get_posts
+    ):
+        """Test that selftext without "http" never reaches the URL regex."""
+        mock_posts = [
+            {
+                "title": "Discussion",
+                "url": "https://example.com/cool",
+                "selftext": "What do you all think of this site?",
+                "score": 5,
+                "created_utc": 1640995200,
+                "permalink": "/r/test/comments/126/discussion",
+            }
+        ]
+        mock_get_posts.return_value = (mock_posts, None)
+        mock_asyncio_run.return_value = (1, 1)
+
+        with patch(
+            "app.reddit_scraper.iter_urls_with_netloc", wraps=iter_urls_with_netloc
+        ) as mock_iter:
+            reddit_urls, _, _ = scrape_reddit_batch("InternetIsBeautiful", self.db_path)
+
+        assert reddit_urls == 1
+        mock_iter.assert_not_called()
+
     @patch("app.reddit_scraper.get_reddit_posts")
     def test_scrape_reddit_batch_no_posts(self, mock_get_posts):
         """Test handling when no Reddit posts are found."""
@@ -253,8 +410,11 @@ class TestRedditScraper:
         assert next_after is None
 
     @patch("app.reddit_scraper.get_reddit_posts")
+    @patch("app.reddit_scraper.scrape_with_discovery_concurrent", new_callable=MagicMock)
     @patch("asyncio.run")
-    def test_scrape_reddit_batch_filters_reddit_urls(self, mock_asyncio_run, mock_get_posts):
+    def test_scrape_reddit_batch_filters_reddit_urls(
+        self, mock_asyncio_run, mock_scrape, mock_get_posts
+    ):
         """Test that Reddit URLs are properly filtered out."""
         # Mock Reddit API response with Reddit URLs
         mock_posts = [
@@ -276,45 +436,154 @@ class TestRedditScraper:
         assert reddit_urls == 1  # Only example.com/article
         assert new_docs == 1
 
+    @patch("app.reddit_scraper.get_reddit_posts")
+    @patch("app.reddit_scraper.scrape_with_discovery_concurrent", new_callable=MagicMock)
+    @patch("asyncio.run")
+    def test_scrape_reddit_batch_skips_seen_urls(
+        self, mock_asyncio_run, mock_scrape, mock_get_posts
+    ):
+        """Test that URLs handled on earlier pages are not crawled again."""
+        mock_posts = [
+            {
+                "title": "Cool Website",
+                "url": "https://example.com/cool",
+                "selftext": "Check out https://test.org/article",
+                "score": 100,
+                "created_utc": 1640995200,
+                "permalink": "/r/test/comments/123/cool_website",
+            }
+        ]
+        mock_get_posts.return_value = (mock_posts, None)
+        mock_asyncio_run.return_value = (1, 1)
+        seen_urls = {"https://example.com/cool"}
 
-class TestConcurrentFeatures:
-    """Test concurrent/async features."""
+        scrape_reddit_batch("InternetIsBeautiful", self.db_path, seen_urls=seen_urls)
 
-    def setup_method(self):
-        """Set up test environment."""
-        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
-        self.temp_db.close()
-        self.db_path = self.temp_db.name
+        assert mock_scrape.call_args.args[0] == ["https://test.org/article"]
+        assert seen_urls == {"https://example.com/cool", "https://test.org/article"}
 
-        # Initialize database
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            CREATE TABLE documents (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                url TEXT UNIQUE,
-                title TEXT,
-                content TEXT
-            )
-        """
+    @patch("app.reddit_scraper.get_reddit_posts")
+    @patch("app.reddit_scraper.scrape_with_discovery_concurrent", new_callable=MagicMock)
+    @patch("asyncio.run")
+    def test_scrape_reddit_batch_all_urls_seen(self, mock_asyncio_run, mock_scrape, mock_get_posts):
+        """Test that a page with only seen URLs skips scraping entirely."""
+        mock_posts = [
+            {
+                "title": "Cool Website",
+                "url": "https://example.com/cool",
+                "selftext": "",
+                "score": 100,
+                "created_utc": 1640995200,
+                "permalink": "/r/test/comments/123/cool_website",
+            }
+        ]
+        mock_get_posts.return_value = (mock_posts, "next_token")
+
+        result = scrape_reddit_batch(
+            "InternetIsBeautiful", self.db_path, seen_urls={"https://example.com/cool"}
         )
-        cursor.execute(
-            """
-            CREATE VIRTUAL TABLE document_content USING fts5(
-                content,
-                document_id UNINDEXED,
-                tokenize='porter unicode61'
-            )
-        """
+
+        assert result == (1, 0, "next_token")
+        mock_asyncio_run.assert_not_called()
+
+    @patch("app.reddit_scraper.get_reddit_posts")
+    @patch("app.reddit_scraper.scrape_with_discovery_concurrent", new_callable=MagicMock)
+    @patch("asyncio.run")
+    def test_scrape_reddit_batch_skips_stored_urls(
+        self, mock_asyncio_run, mock_scrape, mock_get_posts
+    ):
+        """Test that URLs with a stored document are looked up and not crawled again."""
+        conn = sqlite3.connect(self.db_path)
+        conn.execute(
+            "INSERT INTO documents (url, title, content) VALUES (?, ?, ?)",
+            ("https://example.com/cool", "Stored", "Stored content"),
         )
         conn.commit()
         conn.close()
+        mock_posts = [
+            {
+                "title": "Cool Website",
+                "url": "https://example.com/cool",
+                "selftext": "Check out https://test.org/article",
+                "score": 100,
+                "created_utc": 1640995200,
+                "permalink": "/r/test/comments/123/cool_website",
+            }
+        ]
+        mock_get_posts.return_value = (mock_posts, None)
+        mock_asyncio_run.return_value = (1, 1)
+
+        scrape_reddit_batch("InternetIsBeautiful", self.db_path)
+
+        assert mock_scrape.call_args.args[0] == ["https://test.org/article"]
+
+    @patch("app.reddit_scraper.get_reddit_posts")
+    @patch("app.reddit_scraper.scrape_with_discovery_concurrent", new_callable=MagicMock)
+    @patch("asyncio.run")
+    def test_scrape_reddit_batch_runs_on_given_runner(
+        self, mock_asyncio_run, mock_scrape, mock_get_posts
+    ):
+        """Test that a caller's runner and session are used instead of a fresh loop."""
+        mock_get_posts.return_value = (
+            [
+                {
+                    "title": "Cool Website",
+                    "url": "https://example.com/cool",
+                    "selftext": "",
+                    "score": 100,
+                    "created_utc": 1640995200,
+                    "permalink": "/r/test/comments/123/cool_website",
+                }
+            ],
+            None,
+        )
+        mock_runner = MagicMock()
+        mock_runner.run.return_value = (1, 1)
+        mock_session = MagicMock()
+
+        result = scrape_reddit_batch("test", self.db_path, runner=mock_runner, session=mock_session)
+
+        assert result == (1, 1, None)
+        mock_asyncio_run.assert_not_called()
+        mock_runner.run.assert_called_once_with(mock_scrape.return_value)
+        assert mock_scrape.call_args.kwargs["session"] is mock_session
+
+    @patch("app.reddit_scraper.scrape_reddit_batch")
+    def test_scrape_reddit_continuous_reuses_loop(self, mock_batch):
+        """Test that every page crawls on one runner and session, closed at the end."""
+        mock_batch.side_effect = [(1, 1, "next_token"), (1, 1, None)]
+
+        with patch("app.reddit_scraper.time.sleep"):
+            scrape_reddit_continuous("test", self.db_path, max_pages=2, random_dates=False)
+
+        first, second = (call.kwargs for call in mock_batch.call_args_list)
+        assert isinstance(first["runner"], asyncio.Runner)
+        assert first["runner"] is second["runner"]
+        assert first["session"] is second["session"]
+        assert first["session"].closed
+
+    @patch("app.reddit_scraper.scrape_reddit_batch")
+    def test_scrape_reddit_continuous_shares_seen_urls(self, mock_batch):
+        """Test that pages share one seen set instead of preloading stored URLs."""
+        mock_batch.side_effect = [(1, 1, "next_token"), (1, 1, None)]
+
+        with patch("app.reddit_scraper.time.sleep"):
+            scrape_reddit_continuous("test", self.db_path, max_pages=2, random_dates=False)
+
+        first_seen = mock_batch.call_args_list[0].kwargs["seen_urls"]
+        second_seen = mock_batch.call_args_list[1].kwargs["seen_urls"]
+        assert first_seen is second_seen
+        assert first_seen == set()
+
+
+class TestConcurrentFeatures:
+    """Test concurrent/async features."""
 
-    def teardown_method(self):
-        """Clean up."""
-        if os.path.exists(self.db_path):
-            os.unlink(self.db_path)
+    @pytest.fixture(autouse=True)
+    def setup_database(self, template_db, tmp_path):
+        """Give each test its own copy of the template database."""
+        self.db_path = str(tmp_path / "search.db")
+        shutil.copyfile(template_db, self.db_path)
 
     def test_concurrent_configuration_constants(self):
         """Test that concurrent configuration constants are set correctly."""
@@ -2,18 +2,80 @@
 Test module for the improved scraper functionality with Trafilatura.
 """
 
+import asyncio
+import itertools
 import os
 import sqlite3
 import sys
 import tempfile
-from unittest.mock import MagicMock, patch
+import threading
+import time
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
+from urllib.parse import urljoin
 
 import pytest
 
 # Add the parent directory to the path so we can import the scraper module
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
-from app.scraper import discover_links, fetch_and_parse, scrape_links_to_database  # noqa: E402
+from app.scraper import (  # noqa: E402
+    DEFAULT_HEADERS,
+    HTTP_POOL_HOSTS,
+    REQUEST_TIMEOUT,
+    HostRateLimiter,
+    build_frontier,
+    bulk_insert_documents,
+    connect_for_writing,
+    create_scraper_session,
+    discover_links,
+    extract_content_with_trafilatura,
+    fetch_and_parse,
+    fetch_and_parse_async,
+    fetch_body_async,
+    find_existing_urls,
+    get_extraction_pool,
+    get_http_session,
+    get_last_document_id,
+    get_retry_delay,
+    host_limit,
+    index_deferred_documents,
+    insert_document_batch,
+    is_text_response,
+    iter_links,
+    load_links,
+    merge_links,
+    merge_search_index,
+    new_host_semaphores,
+    next_page_url,
+    normalize_url,
+    optimize_search_index,
+    parse_links_from_html,
+    parse_plain_text,
+    parse_url,
+    read_capped_body,
+    resolve_href,
+    score_link,
+    scrape_links_to_database,
+    scrape_urls_concurrent,
+    scrape_with_discovery,
+    scrape_with_discovery_concurrent,
+    url_fingerprint,
+    wait_for_host,
+)
+
+
+def make_http_session(body, content_type="text/html", status=200):
+    """Build a mock requests session whose get() streams a single canned response."""
+    response = MagicMock()
+    response.__enter__.return_value = response
+    response.status_code = status
+    response.headers = {"content-type": content_type}
+    response.encoding = "utf-8"
+    response.iter_content.return_value = [body.encode("utf-8")]
+
+    session = MagicMock()
+    session.get.return_value = response
+    return session
 
 
 class TestTrafilaturaIntegration:
@@ -36,19 +98,16 @@ class TestTrafilaturaIntegration:
         """
 
         with (
-            patch("trafilatura.fetch_url") as mock_fetch,
-            patch("trafilatura.extract") as mock_extract,
-            patch("trafilatura.extract_metadata") as mock_metadata,
+            patch("app.scraper.get_http_session", return_value=make_http_session(mock_html)),
+            patch("trafilatura.bare_extraction") as mock_extract,
         ):
 
-            mock_fetch.return_value = mock_html
-            mock_extract.return_value = "Main Article Title\nThis is the main content of the article. It should be extracted properly by Trafilatura.\nAdditional paragraph with more meaningful content."
-
-            # Mock metadata response
-            mock_meta = MagicMock()
-            mock_meta.title = "Test Article"
-            mock_meta.sitename = "Test Site"
-            mock_metadata.return_value = mock_meta
+            # Text and metadata come back together from one extraction
+            mock_document = MagicMock()
+            mock_document.text = "Main Article Title\nThis is the main content of the article. It should be extracted properly by Trafilatura.\nAdditional paragraph with more meaningful content."
+            mock_document.title = "Test Article"
+            mock_document.sitename = "Test Site"
+            mock_extract.return_value = mock_document
 
             title, content = fetch_and_parse("https://example.com/test")
 
@@ -59,14 +118,14 @@ class TestTrafilaturaIntegration:
 
     def test_fetch_and_parse_fallback_to_newspaper(self):
         """Test that the function falls back to newspaper3k when Trafilatura fails."""
+        session = MagicMock()
+        session.get.side_effect = Exception("Connection reset")
+
         with (
-            patch("trafilatura.fetch_url") as mock_fetch,
+            patch("app.scraper.get_http_session", return_value=session),
             patch("app.scraper.Article") as mock_article_class,
         ):
 
-            # Make Trafilatura fail
-            mock_fetch.side_effect = Exception("Trafilatura failed")
-
             # Mock newspaper3k Article
             mock_article = MagicMock()
             mock_article.title = "Newspaper Article"
@@ -78,29 +137,21 @@ class TestTrafilaturaIntegration:
             assert title == "Newspaper Article"
             assert content == "This is content extracted by newspaper3k fallback mechanism."
 
-    def test_fetch_and_parse_plain_text_fallback(self):
-        """Test that the function handles plain text files as final fallback."""
+    def test_fetch_and_parse_plain_text(self):
+        """Test that plain text files are stored without HTML extraction."""
+        session = make_http_session(
+            "This is plain text content that should be extracted directly from the response.",
+            content_type="text/plain",
+        )
+
         with (
-            patch("trafilatura.fetch_url") as mock_trafilatura_fetch,
-            patch("app.scraper.Article") as mock_article_class,
-            patch("requests.get") as mock_requests,
+            patch("app.scraper.get_http_session", return_value=session),
+            patch("trafilatura.bare_extraction") as mock_extract,
         ):
-
-            # Make Trafilatura and newspaper3k fail
-            mock_trafilatura_fetch.side_effect = Exception("Trafilatura failed")
-            mock_article_class.side_effect = Exception("Newspaper failed")
-
-            # Mock requests response for plain text
-            mock_response = MagicMock()
-            mock_response.headers = {"content-type": "text/plain"}
-            mock_response.text = (
-                "This is plain text content that should be extracted directly from the response."
-            )
-            mock_response.raise_for_status.return_value = None
-            mock_requests.return_value = mock_response
-
             title, content = fetch_and_parse("https://example.com/document.txt")
 
+            mock_extract.assert_not_called()
+
             assert title == "document.txt"
             assert (
                 content
@@ -109,13 +160,14 @@ class TestTrafilaturaIntegration:
 
     def test_fetch_and_parse_invalid_content(self):
         """Test that the function returns None for invalid or empty content."""
+        session = make_http_session("<html><body></body></html>")
+
         with (
-            patch("trafilatura.fetch_url") as mock_fetch,
-            patch("trafilatura.extract") as mock_extract,
+            patch("app.scraper.get_http_session", return_value=session),
+            patch("trafilatura.bare_extraction") as mock_extract,
         ):
 
-            mock_fetch.return_value = "<html><body></body></html>"
-            mock_extract.return_value = ""  # Empty content
+            mock_extract.return_value = None  # Nothing extracted
 
             title, content = fetch_and_parse("https://example.com/empty")
 
@@ -124,19 +176,71 @@ class TestTrafilaturaIntegration:
 
     def test_fetch_and_parse_content_too_short(self):
         """Test that content shorter than 50 characters is rejected."""
+        session = make_http_session("<html><body>Short</body></html>")
+
         with (
-            patch("trafilatura.fetch_url") as mock_fetch,
-            patch("trafilatura.extract") as mock_extract,
+            patch("app.scraper.get_http_session", return_value=session),
+            patch("trafilatura.bare_extraction") as mock_extract,
         ):
 
-            mock_fetch.return_value = "<html><body>Short</body></html>"
-            mock_extract.return_value = "Short"  # Too short
+            mock_extract.return_value.text = "Short"  # Too short
 
             title, content = fetch_and_parse("https://example.com/short")
 
             assert title is None
             assert content is None
 
+    def test_fetch_and_parse_http_error(self):
+        """Test that non-200 responses yield no document without trying newspaper3k."""
+        session = make_http_session("Not found", status=404)
+
+        with (
+            patch("app.scraper.get_http_session", return_value=session),
+            patch("app.scraper.Article") as mock_article_class,
+        ):
+            assert fetch_and_parse("https://example.com/missing") == (None, None)
+
+        mock_article_class.assert_not_called()
+
+    def test_fetch_and_parse_skips_non_text_responses(self):
+        """Test that binary responses are dropped without reading the body."""
+        session = make_http_session("%PDF-1.7", content_type="application/pdf")
+
+        with (
+            patch("app.scraper.get_http_session", return_value=session),
+            patch("trafilatura.bare_extraction") as mock_extract,
+        ):
+            assert fetch_and_parse("https://example.com/report") == (None, None)
+
+        assert session.get.call_args.kwargs["stream"] is True
+        session.get.return_value.iter_content.assert_not_called()
+        mock_extract.assert_not_called()
+
+    def test_fetch_and_parse_caps_body_size(self):
+        """Test that at most MAX_CONTENT_LENGTH bytes reach the extractor."""
+        session = make_http_session("")
+        session.get.return_value.iter_content.return_value = itertools.repeat(b"x" * 1000)
+
+        with (
+            patch("app.scraper.get_http_session", return_value=session),
+            patch("app.scraper.MAX_CONTENT_LENGTH", 2500),
+            patch("trafilatura.bare_extraction", return_value=None) as mock_extract,
+        ):
+            fetch_and_parse("https://example.com/huge")
+
+        assert mock_extract.call_args.args[0] == b"x" * 2500
+
+    def test_get_http_session_is_shared(self):
+        """Test that one keep-alive session with the default headers is reused."""
+        with patch("app.scraper._http_session", None):
+            first = get_http_session()
+            second = get_http_session()
+
+        assert first is second
+        assert first.headers["User-Agent"] == DEFAULT_HEADERS["User-Agent"]
+        assert first.verify is False
+        assert first.get_adapter("https://example.com")._pool_connections == HTTP_POOL_HOSTS
+
 
 class TestScrapingWorkflow:
     """Test the complete scraping workflow with database integration."""
@@ -168,7 +272,8 @@ class TestScrapingWorkflow:
             """
             CREATE VIRTUAL TABLE document_content USING fts5(
                 content,
-                document_id UNINDEXED,
+                content='documents',
+                content_rowid='id',
                 tokenize='porter unicode61'
             )
         """
@@ -178,9 +283,10 @@ class TestScrapingWorkflow:
         conn.close()
 
     def teardown_method(self):
-        """Clean up the temporary database."""
-        if os.path.exists(self.db_path):
-            os.unlink(self.db_path)
+        """Clean up the temporary database and its WAL files."""
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.db_path + suffix):
+                os.unlink(self.db_path + suffix)
 
     def test_scrape_links_to_database_success(self):
         """Test successful scraping and storage to database."""
@@ -261,6 +367,939 @@ class TestScrapingWorkflow:
         finally:
             os.unlink(temp_links.name)
 
+    def test_bulk_insert_documents(self):
+        """Test that documents and FTS rows are written together and duplicates skipped."""
+        conn = sqlite3.connect(self.db_path)
+        conn.execute(
+            "INSERT INTO documents (url, title, content) VALUES (?, ?, ?)",
+            ("https://example.com/old", "Old", "Old content"),
+        )
+        conn.commit()
+
+        rows = [
+            ("https://example.com/a", "A", "Alpha gardening content"),
+            ("https://example.com/old", "Old again", "Duplicate content"),
+            ("https://example.com/b", "B", "Beta gardening content"),
+            ("https://example.com/a", "A again", "Duplicate within batch"),
+        ]
+        inserted = bulk_insert_documents(conn, rows)
+
+        assert inserted == 2
+        assert not conn.in_transaction
+        cursor = conn.cursor()
+        cursor.execute("SELECT url FROM documents ORDER BY id")
+        assert [row[0] for row in cursor.fetchall()] == [
+            "https://example.com/old",
+            "https://example.com/a",
+            "https://example.com/b",
+        ]
+        cursor.execute(
+            "SELECT d.url FROM document_content dc JOIN documents d ON d.id = dc.rowid "
+            "WHERE document_content MATCH 'gardening' ORDER BY d.id"
+        )
+        assert [row[0] for row in cursor.fetchall()] == [
+            "https://example.com/a",
+            "https://example.com/b",
+        ]
+        conn.close()
+
+    def test_bulk_insert_documents_empty(self):
+        """Test that an empty batch is a no-op."""
+        conn = sqlite3.connect(self.db_path)
+        assert bulk_insert_documents(conn, []) == 0
+        conn.close()
+
+    def test_deferred_indexing(self):
+        """Test that unindexed inserts become searchable after one deferred pass."""
+        conn = sqlite3.connect(self.db_path)
+        bulk_insert_documents(conn, [("https://example.com/old", "Old", "Old gardening notes")])
+        last_id = get_last_document_id(conn)
+
+        inserted = bulk_insert_documents(
+            conn,
+            [
+                ("https://example.com/a", "A", "Alpha gardening content"),
+                ("https://example.com/b", "B", "Beta gardening content"),
+            ],
+            index=False,
+        )
+        search = "SELECT rowid FROM document_content WHERE document_content MATCH 'gardening'"
+
+        assert inserted == 2
+        assert len(conn.execute(search).fetchall()) == 1
+
+        assert index_deferred_documents(conn, last_id) == 2
+        assert len(conn.execute(search).fetchall()) == 3
+        conn.close()
+
+    @pytest.mark.asyncio
+    async def test_scrape_urls_concurrent_defers_indexing(self):
+        """Test that a bulk crawl indexes its documents once, after the last batch."""
+        urls = [f"https://example.com/{i}" for i in range(3)]
+        session = make_page_session(dict.fromkeys(urls, "<html></html>"))
+
+        with (
+            patch("app.scraper.get_extraction_pool", return_value=None),
+            patch(
+                "app.scraper.extract_content_with_trafilatura",
+                return_value=("Title", "Deferred gardening content"),
+            ),
+            patch(
+                "app.scraper.index_deferred_documents", wraps=index_deferred_documents
+            ) as mock_index,
+        ):
+            result = await scrape_urls_concurrent(
+                urls,
+                self.db_path,
+                batch_size=2,
+                session=session,
+                defer_indexing=True,
+            )
+
+        assert result == (3, 3)
+        mock_index.assert_called_once()
+        conn = sqlite3.connect(self.db_path)
+        search = "SELECT rowid FROM document_content WHERE document_content MATCH 'gardening'"
+        assert len(conn.execute(search).fetchall()) == 3
+        conn.close()
+
+    def test_insert_document_batch_skips_stored_urls(self):
+        """Test that batch inserts rely on the url index to skip stored documents."""
+        conn = sqlite3.connect(self.db_path)
+        bulk_insert_documents(conn, [("https://example.com/known", "Known", "Known content")])
+        conn.close()
+        documents = [
+            ("https://example.com/known", "Known", "Known content"),
+            ("https://example.com/new", "New", "New content"),
+            ("https://example.com/empty", "", "No title"),
+        ]
+
+        conn = connect_for_writing(self.db_path)
+        inserted = insert_document_batch(documents, conn)
+
+        assert inserted == 1
+        assert conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0] == 2
+        conn.close()
+
+    def test_insert_document_batch_retries_locked_database_once(self):
+        """Test that a locked database is retried once on the same connection."""
+        conn = Mock()
+        documents = [("https://example.com/a", "A", "Content")]
+
+        with (
+            patch(
+                "app.scraper.bulk_insert_documents",
+                side_effect=[sqlite3.OperationalError("database is locked"), 1],
+            ) as mock_insert,
+            patch("app.scraper.time.sleep"),
+        ):
+            assert insert_document_batch(documents, conn) == 1
+
+        assert [call.args[0] for call in mock_insert.call_args_list] == [conn, conn]
+
+    def test_insert_document_batch_gives_up_on_other_errors(self):
+        """Test that errors other than lock contention are not retried."""
+        documents = [("https://example.com/a", "A", "Content")]
+
+        with patch(
+            "app.scraper.bulk_insert_documents",
+            side_effect=sqlite3.OperationalError("no such table: documents"),
+        ) as mock_insert:
+            assert insert_document_batch(documents, Mock()) == 0
+
+        mock_insert.assert_called_once()
+
+    def test_connect_for_writing(self):
+        """Test that scraper write connections use WAL."""
+        conn = connect_for_writing(self.db_path)
+
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        assert conn.execute("PRAGMA temp_store").fetchone()[0] == 2  # MEMORY
+        assert conn.execute("PRAGMA cache_size").fetchone()[0] == -65536
+        conn.close()
+
+    def test_scrape_with_discovery_batches_inserts(self):
+        """Test that the sync crawler buffers documents and bulk inserts them."""
+        links = [f"https://example.com/{i}" for i in range(5)] + ["https://example.com/0"]
+
+        with (
+            patch("app.scraper.INSERT_BATCH_SIZE", 2),
+            patch("app.scraper.fetch_and_parse_page", return_value=("Title", "Some content", None)),
+            patch("app.scraper.bulk_insert_documents", wraps=bulk_insert_documents) as mock_bulk,
+            patch("app.scraper.time.sleep"),
+        ):
+            new_docs, discovered = scrape_with_discovery(links, self.db_path)
+
+        assert new_docs == 5
+        assert discovered == 5
+        assert [len(c.args[1]) for c in mock_bulk.call_args_list] == [2, 2, 1]
+
+        conn = sqlite3.connect(self.db_path)
+        assert conn.execute("SELECT COUNT(*) FROM document_content").fetchone()[0] == 5
+        conn.close()
+
+    def test_optimize_search_index(self):
+        """Test that the FTS index stays searchable after optimizing."""
+        conn = sqlite3.connect(self.db_path)
+        bulk_insert_documents(conn, [("https://example.com/a", "A", "Optimized content")])
+        conn.close()
+
+        optimize_search_index(self.db_path)
+
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT COUNT(*) FROM document_content WHERE document_content MATCH 'optimized'"
+        )
+        assert cursor.fetchone()[0] == 1
+        conn.close()
+
+    def test_merge_search_index(self):
+        """Test that an incremental merge keeps every batch searchable."""
+        conn = connect_for_writing(self.db_path)
+        for i in range(5):
+            bulk_insert_documents(conn, [(f"https://example.com/{i}", "T", f"Merged batch {i}")])
+
+        merge_search_index(conn)
+
+        count = conn.execute(
+            "SELECT COUNT(*) FROM document_content WHERE document_content MATCH 'merged'"
+        ).fetchone()[0]
+        conn.close()
+        assert count == 5
+
+    def test_find_existing_urls(self):
+        """Test that only stored candidate URLs are returned, across lookup chunks."""
+        conn = sqlite3.connect(self.db_path)
+        bulk_insert_documents(
+            conn,
+            [
+                ("https://example.com/a", "A", "Stored content"),
+                ("https://example.com/c", "C", "Stored content"),
+                ("https://example.com/other", "Other", "Stored content"),
+            ],
+        )
+        conn.close()
+        candidates = ["https://example.com/a", "https://example.com/b", "https://example.com/c"]
+
+        with patch("app.scraper.URL_LOOKUP_BATCH_SIZE", 2):
+            existing = find_existing_urls(self.db_path, candidates)
+
+        assert existing == {"https://example.com/a", "https://example.com/c"}
+        assert find_existing_urls(self.db_path, []) == set()
+
+
+class TestLoadLinks:
+    """Test loading starter URLs from files or memory."""
+
+    def test_load_links_from_file(self):
+        """Test that a JSON file path is read."""
+        temp_links = tempfile.NamedTemporaryFile(mode="w", delete=False, suffix=".json")
+        temp_links.write('["https://example.com/a", "https://example.com/b"]')
+        temp_links.close()
+
+        try:
+            assert load_links(temp_links.name) == [
+                "https://example.com/a",
+                "https://example.com/b",
+            ]
+        finally:
+            os.unlink(temp_links.name)
+
+    def test_load_links_from_json_lines(self):
+        """Test that JSON Lines and plain one-URL-per-line files are read."""
+        temp_links = tempfile.NamedTemporaryFile(mode="w", delete=False, suffix=".jsonl")
+        temp_links.write('"https://example.com/a"\n\nhttps://example.com/b\n')
+        temp_links.close()
+
+        try:
+            assert load_links(temp_links.name) == [
+                "https://example.com/a",
+                "https://example.com/b",
+            ]
+        finally:
+            os.unlink(temp_links.name)
+
+    def test_iter_links_streams_lines(self):
+        """Test that line-based files are read lazily."""
+        temp_links = tempfile.NamedTemporaryFile(mode="w", delete=False, suffix=".txt")
+        temp_links.write("https://example.com/a\nnot json [\n")
+        temp_links.close()
+
+        try:
+            links = iter_links(temp_links.name)
+            assert next(links) == "https://example.com/a"
+            assert next(links) == "not json ["
+        finally:
+            links.close()
+            os.unlink(temp_links.name)
+
+    def test_load_links_from_iterable(self):
+        """Test that in-memory URLs are passed through as a list."""
+        links = load_links({"https://example.com/a"})
+
+        assert links == ["https://example.com/a"]
+
+
+def make_mock_response(body, content_type="text/html", status=200, headers=None):
+    """Build a mock aiohttp request context yielding a canned response."""
+    response = MagicMock()
+    response.status = status
+    response.headers = {"content-type": content_type, **(headers or {})}
+    response.charset = None
+    response.content.read = AsyncMock(side_effect=[body.encode("utf-8"), b""])
+
+    request = MagicMock()
+    request.__aenter__ = AsyncMock(return_value=response)
+    request.__aexit__ = AsyncMock(return_value=False)
+    return request
+
+
+def make_mock_session(body, content_type="text/html", status=200):
+    """Build a mock aiohttp session whose get() yields a single canned response."""
+    session = MagicMock()
+    session.get.return_value = make_mock_response(body, content_type, status)
+    return session
+
+
+def make_page_session(pages):
+    """Build a mock aiohttp session serving canned HTML pages by URL."""
+    session = MagicMock()
+    session.get.side_effect = lambda url, **kwargs: make_mock_response(pages[url])
+    return session
+
+
+def session_context(session):
+    """Wrap a mock session so it can stand in for create_scraper_session()."""
+    context = MagicMock()
+    context.__aenter__ = AsyncMock(return_value=session)
+    context.__aexit__ = AsyncMock(return_value=False)
+    return context
+
+
+class TestConcurrentScraping:
+    """Test the aiohttp-based concurrent scraping path."""
+
+    def test_parse_plain_text(self):
+        """Test that plain text is titled by its filename."""
+        text = "  This is plain text content that is long enough to keep as a document.  "
+
+        title, content = parse_plain_text("https://example.com/notes.txt", text)
+
+        assert title == "notes.txt"
+        assert content == text.strip()
+
+    def test_parse_plain_text_too_short(self):
+        """Test that short text is rejected."""
+        assert parse_plain_text("https://example.com/a.txt", "too short") == (None, None)
+
+    def test_extract_content_title_from_title_tag(self):
+        """Test that the <title> tag is used when the page has no other metadata."""
+        html = (
+            "<html><head><title>Only Title Here</title></head><body><p>"
+            + "Meaningful words about a topic. " * 20
+            + "</p></body></html>"
+        )
+
+        title, content = extract_content_with_trafilatura(html, "https://example.com/a")
+
+        assert title == "Only Title Here"
+        assert content.startswith("Meaningful words")
+
+    def test_extract_content_parses_page_once(self):
+        """Test that text and title come from one extraction, not a second metadata pass."""
+        html = (
+            "<html><head><title>Single Pass</title></head><body><p>"
+            + "Meaningful words about a topic. " * 20
+            + "</p></body></html>"
+        )
+
+        with patch("trafilatura.extract_metadata") as mock_metadata:
+            title, content = extract_content_with_trafilatura(html, "https://example.com/a")
+
+        assert title == "Single Pass"
+        assert content.startswith("Meaningful words")
+        mock_metadata.assert_not_called()
+
+    def test_extract_content_from_bytes(self):
+        """Test that raw bytes are decoded using the page's declared charset."""
+        html = (
+            '<html><head><meta charset="iso-8859-1"><title>Café</title></head><body><p>'
+            + "Un café très bon près de la gare. " * 10
+            + "</p></body></html>"
+        ).encode("latin-1")
+
+        title, content = extract_content_with_trafilatura(html, "https://example.com/a")
+
+        assert title == "Café"
+        assert content.startswith("Un café très bon")
+
+    @pytest.mark.asyncio
+    async def test_fetch_and_parse_async_html(self):
+        """Test that HTML bodies are handed to trafilatura."""
+        session = make_mock_session("<html><body>Article</body></html>")
+
+        with (
+            patch("app.scraper.get_extraction_pool", return_value=None),
+            patch(
+                "app.scraper.extract_content_with_trafilatura", return_value=("Title", "Content")
+            ) as mock_extract,
+        ):
+            result = await fetch_and_parse_async(
+                session, "https://example.com/a", asyncio.Semaphore(1)
+            )
+
+        assert result == (
+            "https://example.com/a",
+            "Title",
+            "Content",
+            b"<html><body>Article</body></html>",
+        )
+        mock_extract.assert_called_once_with(
+            b"<html><body>Article</body></html>", "https://example.com/a"
+        )
+
+    def test_get_extraction_pool_is_shared(self):
+        """Test that one spawned worker pool is created and reused."""
+        with (
+            patch("app.scraper._extraction_pool", None),
+            patch("app.scraper.ProcessPoolExecutor") as mock_pool,
+        ):
+            first = get_extraction_pool()
+            second = get_extraction_pool()
+
+        assert first is second
+        mock_pool.assert_called_once()
+        assert mock_pool.call_args.kwargs["mp_context"].get_start_method() == "spawn"
+
+    @pytest.mark.asyncio
+    async def test_fetch_and_parse_async_plain_text(self):
+        """Test that plain text responses skip HTML extraction."""
+        text = "This is plain text content that should be extracted directly from the response."
+        session = make_mock_session(text, content_type="text/plain; charset=utf-8")
+
+        with patch("app.scraper.extract_content_with_trafilatura") as mock_extract:
+            result = await fetch_and_parse_async(
+                session, "https://example.com/document.txt", asyncio.Semaphore(1)
+            )
+
+        assert result == ("https://example.com/document.txt", "document.txt", text, None)
+        mock_extract.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_fetch_and_parse_async_plain_text_charset(self):
+        """Test that plain text bodies are decoded with the charset from the headers."""
+        text = "Notes on café culture, written in Latin-1 and served with its charset."
+        request = make_mock_response("", content_type="text/plain; charset=iso-8859-1")
+        response = request.__aenter__.return_value
+        response.charset = "iso-8859-1"
+        response.content.read = AsyncMock(side_effect=[text.encode("latin-1"), b""])
+        session = MagicMock()
+        session.get.return_value = request
+
+        result = await fetch_and_parse_async(
+            session, "https://example.com/notes.txt", asyncio.Semaphore(1)
+        )
+
+        assert result == ("https://example.com/notes.txt", "notes.txt", text, None)
+
+    @pytest.mark.asyncio
+    async def test_fetch_and_parse_async_http_error(self):
+        """Test that non-200 responses yield no document."""
+        session = make_mock_session("Not found", status=404)
+
+        result = await fetch_and_parse_async(
+            session, "https://example.com/missing", asyncio.Semaphore(1)
+        )
+
+        assert result == ("https://example.com/missing", None, None, None)
+
+    @pytest.mark.asyncio
+    async def test_create_scraper_session(self):
+        """Test that the shared session pools connections and caches DNS."""
+        async with create_scraper_session(5) as session:
+            assert session.connector.limit == 10
+            assert session.connector.limit_per_host == 10
+            assert session.connector.use_dns_cache
+            assert session.headers["User-Agent"] == DEFAULT_HEADERS["User-Agent"]
+            assert session.timeout is REQUEST_TIMEOUT
+
+    @pytest.mark.asyncio
+    async def test_scrape_urls_concurrent_reuses_session(self):
+        """Test that a caller-provided session is used instead of opening a new one."""
+        session = make_mock_session("<html></html>")
+
+        with (
+            patch("app.scraper.create_scraper_session") as mock_create,
+            patch("app.scraper.connect_for_writing"),
+            patch("app.scraper.get_extraction_pool", return_value=None),
+            patch("app.scraper.extract_content_with_trafilatura", return_value=(None, None)),
+        ):
+            result = await scrape_urls_concurrent(
+                ["https://example.com/a", "https://example.com/b"], "unused.db", session=session
+            )
+
+        assert result == (0, 2)
+        assert session.get.call_count == 2
+        mock_create.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_scrape_urls_concurrent_bounds_live_fetches(self):
+        """Test that at most max_concurrent fetches run at once and every URL is scraped."""
+        urls = [f"https://example.com/{i}" for i in range(7)]
+        in_flight = [0]
+        peak = [0]
+
+        async def fake_fetch(session, url, *args):
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+            await asyncio.sleep(0)
+            in_flight[0] -= 1
+            return url, "Title", f"Content for {url}", None
+
+        with (
+            patch("app.scraper.fetch_and_parse_async", side_effect=fake_fetch),
+            patch("app.scraper.connect_for_writing"),
+            patch("app.scraper.get_last_document_id", return_value=0),
+            patch(
+                "app.scraper.insert_document_batch", side_effect=lambda docs, *_, **__: len(docs)
+            ),
+        ):
+            result = await scrape_urls_concurrent(
+                urls, "unused.db", max_concurrent=3, batch_size=2, session=MagicMock()
+            )
+
+        assert result == (7, 7)
+        assert peak[0] == 3
+
+    @pytest.mark.asyncio
+    async def test_scrape_urls_concurrent_writes_off_the_event_loop(self):
+        """Test that inserts and deferred indexing run in worker threads, one at a time."""
+        urls = [f"https://example.com/{i}" for i in range(4)]
+        loop_thread = threading.get_ident()
+        write_threads = []
+        active_writes = []
+
+        def record_thread(*args, **kwargs):
+            active_writes.append(1)
+            assert len(active_writes) == 1
+            write_threads.append(threading.get_ident())
+            time.sleep(0.01)
+            active_writes.pop()
+            return 2
+
+        async def fake_fetch(session, url, *args):
+            return url, "Title", f"Content for {url}", None
+
+        with (
+            patch("app.scraper.fetch_and_parse_async", side_effect=fake_fetch),
+            patch("app.scraper.connect_for_writing") as mock_connect,
+            patch("app.scraper.get_last_document_id", return_value=0),
+            patch("app.scraper.insert_document_batch", side_effect=record_thread),
+            patch("app.scraper.index_deferred_documents", side_effect=record_thread),
+            patch("app.scraper.merge_search_index", side_effect=record_thread),
+        ):
+            result = await scrape_urls_concurrent(
+                urls,
+                "unused.db",
+                max_concurrent=4,
+                batch_size=2,
+                defer_indexing=True,
+                session=MagicMock(),
+            )
+
+        assert result == (4, 4)
+        assert len(write_threads) == 4
+        assert loop_thread not in write_threads
+        mock_connect.assert_called_once_with("unused.db", check_same_thread=False)
+
+    @pytest.mark.asyncio
+    async def test_scrape_with_discovery_concurrent_fetches_each_url_once(self):
+        """Test that discovery reuses the scraped page instead of fetching it again."""
+        session = make_page_session(
+            {
+                "https://example.com/": '<html><body><a href="/post">A post</a></body></html>',
+                "https://example.com/post": "<html><body>Post</body></html>",
+            }
+        )
+
+        with (
+            patch("app.scraper.create_scraper_session", return_value=session_context(session)),
+            patch("app.scraper.connect_for_writing"),
+            patch("app.scraper.get_extraction_pool", return_value=None),
+            patch("app.scraper.extract_content_with_trafilatura", return_value=(None, None)),
+        ):
+            result = await scrape_with_discovery_concurrent(
+                ["https://example.com/"], "unused.db", discover_depth=2
+            )
+
+        assert result == (0, 2)
+        fetched = [call.args[0] for call in session.get.call_args_list]
+        assert fetched == ["https://example.com/", "https://example.com/post"]
+
+    @pytest.mark.asyncio
+    async def test_scrape_with_discovery_concurrent_reuses_session(self):
+        """Test that a caller-provided session is used instead of opening a new one."""
+        session = make_page_session({"https://example.com/a": "<html></html>"})
+
+        with (
+            patch("app.scraper.create_scraper_session") as mock_create,
+            patch("app.scraper.connect_for_writing"),
+            patch("app.scraper.get_extraction_pool", return_value=None),
+            patch("app.scraper.extract_content_with_trafilatura", return_value=(None, None)),
+        ):
+            result = await scrape_with_discovery_concurrent(
+                ["https://example.com/a"], "unused.db", session=session
+            )
+
+        assert result == (0, 1)
+        assert session.get.call_count == 1
+        mock_create.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_scrape_with_discovery_concurrent_skips_duplicate_starters(self):
+        """Test that starter URLs differing only in fragment or slash are fetched once."""
+        session = make_page_session({"https://example.com/a": "<html></html>"})
+
+        with (
+            patch("app.scraper.create_scraper_session", return_value=session_context(session)),
+            patch("app.scraper.connect_for_writing"),
+            patch("app.scraper.get_extraction_pool", return_value=None),
+            patch("app.scraper.extract_content_with_trafilatura", return_value=(None, None)),
+        ):
+            result = await scrape_with_discovery_concurrent(
+                iter(
+                    ["https://example.com/a", "https://example.com/a/", "https://example.com/a#x"]
+                ),
+                "unused.db",
+            )
+
+        assert result == (0, 1)
+        assert session.get.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_scrape_with_discovery_concurrent_writes_documents(self):
+        """Test that scraped documents reach the writer task and are inserted."""
+        session = make_page_session(
+            {
+                "https://example.com/a": "<html><body>A</body></html>",
+                "https://example.com/b": "<html><body>B</body></html>",
+            }
+        )
+
+        with (
+            patch("app.scraper.create_scraper_session", return_value=session_context(session)),
+            patch("app.scraper.connect_for_writing") as mock_connect,
+            patch("app.scraper.get_extraction_pool", return_value=None),
+            patch(
+                "app.scraper.extract_content_with_trafilatura", return_value=("Title", "Content")
+            ),
+            patch("app.scraper.insert_document_batch", return_value=2) as mock_insert,
+            patch("app.scraper.merge_search_index") as mock_merge,
+        ):
+            result = await scrape_with_discovery_concurrent(
+                ["https://example.com/a", "https://example.com/b"], "unused.db"
+            )
+
+        assert result == (2, 2)
+        documents, conn = mock_insert.call_args.args
+        assert sorted(documents) == [
+            ("https://example.com/a", "Title", "Content"),
+            ("https://example.com/b", "Title", "Content"),
+        ]
+        assert conn is mock_connect.return_value
+        mock_connect.return_value.close.assert_called_once()
+        mock_merge.assert_called_once_with(mock_connect.return_value)
+
+    @pytest.mark.asyncio
+    async def test_scrape_with_discovery_concurrent_writes_off_the_event_loop(self):
+        """Test that the writer task runs inserts and deferred indexing in worker threads."""
+        session = make_page_session({"https://example.com/a": "<html><body>A</body></html>"})
+        loop_thread = threading.get_ident()
+        write_threads = []
+
+        def record_thread(*args, **kwargs):
+            write_threads.append(threading.get_ident())
+            return 1
+
+        with (
+            patch("app.scraper.create_scraper_session", return_value=session_context(session)),
+            patch("app.scraper.connect_for_writing") as mock_connect,
+            patch("app.scraper.get_extraction_pool", return_value=None),
+            patch(
+                "app.scraper.extract_content_with_trafilatura", return_value=("Title", "Content")
+            ),
+            patch("app.scraper.insert_document_batch", side_effect=record_thread),
+            patch("app.scraper.index_deferred_documents", side_effect=record_thread),
+        ):
+            result = await scrape_with_discovery_concurrent(
+                ["https://example.com/a"], "unused.db", defer_indexing=True
+            )
+
+        assert result == (1, 1)
+        assert len(write_threads) == 2
+        assert loop_thread not in write_threads
+        mock_connect.assert_called_once_with("unused.db", check_same_thread=False)
+
+    @pytest.mark.asyncio
+    async def test_scrape_with_discovery_concurrent_caps_each_depth(self):
+        """Test that each depth only admits its budget of best-scoring links."""
+        session = make_page_session(
+            {
+                "https://example.com/": """
+                    <html><body>
+                        <a href="/about">About</a>
+                        <a href="/story">A story worth reading today</a>
+                    </body></html>
+                """,
+                "https://example.com/story": "<html><body>Story</body></html>",
+            }
+        )
+
+        with (
+            patch("app.scraper.FRONTIER_PER_WORKER", 1),
+            patch("app.scraper.create_scraper_session", return_value=session_context(session)),
+            patch("app.scraper.connect_for_writing"),
+            patch("app.scraper.get_extraction_pool", return_value=None),
+            patch("app.scraper.extract_content_with_trafilatura", return_value=(None, None)),
+        ):
+            await scrape_with_discovery_concurrent(
+                ["https://example.com/"], "unused.db", discover_depth=2, max_concurrent=1
+            )
+
+        fetched = [call.args[0] for call in session.get.call_args_list]
+        assert fetched == ["https://example.com/", "https://example.com/story"]
+
+
+class TestRateLimiting:
+    """Test per-host concurrency caps and rate-limit backoff."""
+
+    def test_get_retry_delay_uses_retry_after(self):
+        """Test that Retry-After takes precedence."""
+        assert get_retry_delay({"Retry-After": "4"}, attempt=0) == 4
+
+    def test_get_retry_delay_uses_ratelimit_reset_when_exhausted(self):
+        """Test that X-RateLimit-Reset is honored once no requests remain."""
+        headers = {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "7"}
+        assert get_retry_delay(headers, attempt=0) == 7
+
+    def test_get_retry_delay_exponential_backoff(self):
+        """Test the fallback backoff and its cap."""
+        assert get_retry_delay({}, attempt=0) == 1
+        assert get_retry_delay({}, attempt=2) == 4
+        assert get_retry_delay({"Retry-After": "3600"}, attempt=0) == 30
+
+    def test_get_retry_delay_ignores_http_date(self):
+        """Test that a non-numeric Retry-After falls back to backoff."""
+        headers = {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}
+        assert get_retry_delay(headers, attempt=1) == 2
+
+    @pytest.mark.asyncio
+    async def test_fetch_body_async_retries_rate_limited(self):
+        """Test that a 429 is retried after the advertised delay."""
+        session = MagicMock()
+        session.get.side_effect = [
+            make_mock_response("slow down", status=429, headers={"Retry-After": "2"}),
+            make_mock_response("<html></html>"),
+        ]
+
+        with patch("app.scraper.asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+            result = await fetch_body_async(session, "https://example.com/a")
+
+        assert result == ("text/html", None, b"<html></html>")
+        mock_sleep.assert_awaited_once_with(2)
+
+    @pytest.mark.asyncio
+    async def test_fetch_body_async_gives_up(self):
+        """Test that retries stop after MAX_RETRIES and other errors are not retried."""
+        session = MagicMock()
+        session.get.side_effect = lambda *args, **kwargs: make_mock_response("busy", status=503)
+
+        with patch("app.scraper.asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+            assert await fetch_body_async(session, "https://example.com/a") is None
+        assert session.get.call_count == 4
+        assert mock_sleep.await_count == 3
+
+        session = make_mock_session("gone", status=404)
+        assert await fetch_body_async(session, "https://example.com/b") is None
+        assert session.get.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_fetch_body_async_leaves_options_to_session(self):
+        """Test that requests don't repeat the headers and timeout set on the session."""
+        session = make_mock_session("<html></html>")
+
+        await fetch_body_async(session, "https://example.com/a")
+
+        session.get.assert_called_once_with("https://example.com/a")
+
+    @pytest.mark.asyncio
+    async def test_host_rate_limiter_allows_burst_then_paces(self):
+        """Test that a host gets a burst of requests, then one per refill interval."""
+        clock = [100.0]
+
+        async def advance(seconds):
+            clock[0] += seconds
+
+        limiter = HostRateLimiter(rate=2, burst=2)
+        with (
+            patch("app.scraper.time.monotonic", side_effect=lambda: clock[0]),
+            patch("app.scraper.asyncio.sleep", side_effect=advance) as mock_sleep,
+        ):
+            await limiter.acquire("https://example.com/a")
+            await limiter.acquire("https://example.com/b")
+            mock_sleep.assert_not_called()
+
+            await limiter.acquire("https://example.com/c")
+            assert clock[0] == pytest.approx(100.5)
+
+            # Other hosts have their own bucket
+            await limiter.acquire("https://other.org/a")
+            assert clock[0] == pytest.approx(100.5)
+
+    @pytest.mark.asyncio
+    async def test_host_rate_limiter_backoff_holds_host(self):
+        """Test that backing off makes every request to the host wait out the delay."""
+        clock = [100.0]
+
+        async def advance(seconds):
+            clock[0] += seconds
+
+        limiter = HostRateLimiter(rate=1, burst=5)
+        with (
+            patch("app.scraper.time.monotonic", side_effect=lambda: clock[0]),
+            patch("app.scraper.asyncio.sleep", side_effect=advance),
+        ):
+            limiter.backoff("https://example.com/a", 10)
+            await limiter.acquire("https://example.com/b")
+
+        assert clock[0] >= 111
+
+    @pytest.mark.asyncio
+    async def test_fetch_body_async_backs_off_through_rate_limiter(self):
+        """Test that a 429 empties the host's bucket instead of sleeping in place."""
+        session = MagicMock()
+        session.get.side_effect = [
+            make_mock_response("slow down", status=429, headers={"Retry-After": "2"}),
+            make_mock_response("<html></html>"),
+        ]
+        limiter = Mock(spec=HostRateLimiter)
+
+        with patch("app.scraper.asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+            result = await fetch_body_async(session, "https://example.com/a", limiter)
+
+        assert result == ("text/html", None, b"<html></html>")
+        assert limiter.acquire.await_count == 2
+        limiter.backoff.assert_called_once_with("https://example.com/a", 2)
+        mock_sleep.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_read_capped_body(self):
+        """Test that bodies are read in chunks and cut off at MAX_CONTENT_LENGTH."""
+        response = MagicMock()
+        response.content.read = AsyncMock(side_effect=[b"abc", b"def", b"ghi"])
+
+        with patch("app.scraper.MAX_CONTENT_LENGTH", 6):
+            assert await read_capped_body(response) == b"abcdef"
+        assert [c.args for c in response.content.read.await_args_list] == [(6,), (3,)]
+
+        response.content.read = AsyncMock(side_effect=[b"short", b""])
+        assert await read_capped_body(response) == b"short"
+
+    def test_wait_for_host_only_spaces_same_host(self):
+        """Test that the sequential crawler only sleeps between pages from one host."""
+        clock = [100.0]
+
+        def advance(seconds):
+            clock[0] += seconds
+
+        last_fetch_by_host = {}
+        with (
+            patch("app.scraper.time.monotonic", side_effect=lambda: clock[0]),
+            patch("app.scraper.time.sleep", side_effect=advance) as mock_sleep,
+        ):
+            wait_for_host(last_fetch_by_host, "https://example.com/a", interval=1)
+            wait_for_host(last_fetch_by_host, "https://other.org/a", interval=1)
+            mock_sleep.assert_not_called()
+
+            clock[0] += 0.25
+            wait_for_host(last_fetch_by_host, "https://example.com/b", interval=1)
+
+        mock_sleep.assert_called_once_with(pytest.approx(0.75))
+        assert last_fetch_by_host == {"example.com": 101.0, "other.org": 100.0}
+
+    def test_is_text_response(self):
+        """Test that only small text responses are worth downloading."""
+        assert is_text_response({"content-type": "text/html; charset=utf-8"})
+        assert is_text_response({"content-type": "application/xhtml+xml"})
+        assert is_text_response({"content-type": "text/plain", "content-length": "1024"})
+        assert is_text_response({})
+        assert not is_text_response({"content-type": "application/pdf"})
+        assert not is_text_response({"content-type": "video/mp4"})
+        assert not is_text_response({"content-type": "text/html", "content-length": "50000000"})
+
+    @pytest.mark.asyncio
+    async def test_fetch_body_async_skips_binary_body(self):
+        """Test that non-text responses are dropped without reading the body."""
+        response = make_mock_response("%PDF-1.7", content_type="application/pdf")
+        session = MagicMock()
+        session.get.return_value = response
+
+        assert await fetch_body_async(session, "https://example.com/report") is None
+        response.__aenter__.return_value.content.read.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_fetch_and_parse_async_skips_binary_extensions(self):
+        """Test that links to binary files are not requested at all."""
+        session = MagicMock()
+
+        result = await fetch_and_parse_async(
+            session, "https://example.com/paper.pdf", asyncio.Semaphore(1)
+        )
+
+        assert result == ("https://example.com/paper.pdf", None, None, None)
+        session.get.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_host_limit_caps_in_flight_requests_per_host(self):
+        """Test that each host gets its own semaphore."""
+        host_semaphores = new_host_semaphores()
+
+        first = host_limit(host_semaphores, "https://example.com/a")
+        assert first is host_limit(host_semaphores, "https://example.com/b")
+        assert first is not host_limit(host_semaphores, "https://other.com/a")
+
+        async with host_limit(None, "https://example.com/a"):
+            pass
+
+    @pytest.mark.asyncio
+    async def test_fetch_and_parse_async_respects_host_limit(self):
+        """Test that fetches wait for a free slot on their host."""
+        host_semaphores = new_host_semaphores()
+        session = make_mock_session("<html></html>")
+
+        # Exhaust the per-host slots for example.com
+        for _ in range(6):
+            await host_semaphores["example.com"].acquire()
+
+        with (
+            patch("app.scraper.get_extraction_pool", return_value=None),
+            patch("app.scraper.extract_content_with_trafilatura", return_value=(None, None)),
+        ):
+            task = asyncio.create_task(
+                fetch_and_parse_async(
+                    session, "https://example.com/a", asyncio.Semaphore(10), host_semaphores
+                )
+            )
+            await asyncio.sleep(0)
+            assert not session.get.called
+
+            host_semaphores["example.com"].release()
+            await task
+
+        assert session.get.called
+
 
 class TestLinkDiscovery:
     """Test the link discovery functionality."""
@@ -280,11 +1319,7 @@ class TestLinkDiscovery:
         </html>
         """
 
-        with patch("requests.get") as mock_get:
-            mock_response = MagicMock()
-            mock_response.content = mock_html
-            mock_response.raise_for_status.return_value = None
-            mock_get.return_value = mock_response
+        with patch("app.scraper.get_http_session", return_value=make_http_session(mock_html)):
 
             discovered = discover_links("https://example.com/start", same_domain_only=True)
 
@@ -295,7 +1330,7 @@ class TestLinkDiscovery:
                 "https://example.com/page3",
             }
 
-            assert discovered == expected_urls
+            assert set(discovered) == expected_urls
 
     def test_discover_links_cross_domain(self):
         """Test link discovery across domains."""
@@ -308,18 +1343,268 @@ class TestLinkDiscovery:
         </html>
         """
 
-        with patch("requests.get") as mock_get:
-            mock_response = MagicMock()
-            mock_response.content = mock_html
-            mock_response.raise_for_status.return_value = None
-            mock_get.return_value = mock_response
+        with patch("app.scraper.get_http_session", return_value=make_http_session(mock_html)):
 
             discovered = discover_links("https://example.com/start", same_domain_only=False)
 
             # Should discover both internal and external links
             expected_urls = {"https://example.com/page1", "https://other-site.com/page"}
 
-            assert discovered == expected_urls
+            assert set(discovered) == expected_urls
+
+    def test_resolve_href_matches_urljoin(self):
+        """Test that the fast paths resolve links exactly as urljoin does."""
+        base_url = "https://example.com/blog/post/1"
+        hrefs = [
+            "https://other.org/a",
+            "http://example.com/b?page=2",
+            "/about",
+            "  /padded  ",
+            "/a/../b",
+            "//cdn.example.com/c",
+            "post/2",
+            "../up",
+            "?sort=new",
+            "#top",
+            "",
+        ]
+
+        for href in hrefs:
+            resolved = resolve_href(href, base_url, "https://example.com")
+            assert resolved == urljoin(base_url, href.strip()), href
+
+    def test_parse_url_is_cached(self):
+        """Test that repeated URLs are parsed once."""
+        parse_url.cache_clear()
+
+        first = parse_url("https://example.com/nav")
+        second = parse_url("https://example.com/nav")
+
+        assert first is second
+        assert first.netloc == "example.com"
+        assert parse_url.cache_info().hits == 1
+
+    def test_parse_links_keeps_only_http_links(self):
+        """Test that non-HTTP schemes are dropped and anchors without href ignored."""
+        html = """
+        <html>
+            <body>
+                <a href="ftp://example.com/file">FTP</a>
+                <a href="javascript:void(0)">Script</a>
+                <a name="anchor">No href</a>
+                <div><p><a href="page">Relative</a></p></div>
+            </body>
+        </html>
+        """
+
+        discovered = parse_links_from_html(html, "https://example.com/dir/start")
+
+        assert set(discovered) == {"https://example.com/dir/page"}
+
+    def test_parse_links_skips_assets_and_account_pages(self):
+        """Test that asset files and login/legal pages are not discovered."""
+        html = """
+        <html>
+            <body>
+                <a href="/article">Article</a>
+                <a href="/data.json">JSON feed</a>
+                <a href="/guide.jsp?id=1">JSP page</a>
+                <a href="/photo.JPEG">Photo</a>
+                <a href="/bundle.js?v=3">Script</a>
+                <a href="/paper.pdf#page=2">Paper</a>
+                <a href="/fonts/inter.woff2">Font</a>
+                <a href="/Login">Login</a>
+                <a href="/legal/terms/">Terms</a>
+                <a href="/terms-of-art">Glossary</a>
+            </body>
+        </html>
+        """
+
+        discovered = parse_links_from_html(html, "https://example.com/start")
+
+        assert set(discovered) == {
+            "https://example.com/article",
+            "https://example.com/data.json",
+            "https://example.com/guide.jsp?id=1",
+            "https://example.com/terms-of-art",
+        }
+
+    def test_normalize_url(self):
+        """Test that fragment, trailing slash and host case variants share one key."""
+        variants = [
+            "https://site.com/a",
+            "https://site.com/a/",
+            "https://site.com/a#top",
+            "https://SITE.com/a",
+        ]
+
+        assert {normalize_url(url) for url in variants} == {"https://site.com/a"}
+        assert normalize_url("https://site.com/") == "https://site.com/"
+        assert normalize_url("https://site.com/a/?q=1#x") == "https://site.com/a?q=1"
+
+    def test_parse_links_deduplicates_equivalent_urls(self):
+        """Test that links differing only in fragment, slash or host case are discovered once."""
+        html = """
+        <html>
+            <body>
+                <a href="/a">A</a>
+                <a href="/a/">A slash</a>
+                <a href="/a#top">A fragment</a>
+                <a href="https://EXAMPLE.com/a">A upper host</a>
+            </body>
+        </html>
+        """
+
+        discovered = parse_links_from_html(html, "https://example.com/start")
+
+        assert set(discovered) == {"https://example.com/a"}
+
+    def test_parse_links_keeps_longest_anchor_text(self):
+        """Test that each link maps to its most descriptive anchor text."""
+        html = """
+        <html>
+            <body>
+                <a href="/post">More</a>
+                <a href="/post"><b>Growing</b> tomatoes from seed</a>
+            </body>
+        </html>
+        """
+
+        discovered = parse_links_from_html(html, "https://example.com/start")
+
+        assert discovered == {"https://example.com/post": "Growing tomatoes from seed"}
+
+    def test_parse_links_accepts_xhtml_and_bytes(self):
+        """Test that decoded XHTML with an encoding declaration and raw bytes both parse."""
+        xhtml = (
+            '<?xml version="1.0" encoding="utf-8"?>'
+            '<html xmlns="http://www.w3.org/1999/xhtml"><body>'
+            '<a href="/café">Café guide</a></body></html>'
+        )
+
+        from_text = parse_links_from_html(xhtml, "https://example.com/start")
+        from_bytes = parse_links_from_html(xhtml.encode("utf-8"), "https://example.com/start")
+
+        assert from_text == {"https://example.com/café": "Café guide"}
+        assert from_bytes == from_text
+
+    def test_parse_links_empty_document(self):
+        """Test that an empty page yields no links instead of raising."""
+        assert parse_links_from_html("", "https://example.com/start") == {}
+
+
+class TestCrawlFrontier:
+    """Test ranking and pruning of the crawl frontier."""
+
+    def test_next_page_url(self):
+        """Test that paginated listings yield their following page."""
+        assert next_page_url("https://example.com/blog/page/2") == "https://example.com/blog/page/3"
+        assert next_page_url("https://example.com/list?page=9&sort=new") == (
+            "https://example.com/list?page=10&sort=new"
+        )
+        assert next_page_url("https://example.com/article") is None
+
+    def test_score_link_prefers_descriptive_anchors(self):
+        """Test that article-like links outrank navigation links."""
+        article = score_link("https://example.com/2024/05/tomatoes", "Growing tomatoes from seed")
+        nav = score_link("https://example.com/about", "About")
+        query = score_link("https://example.com/about?ref=footer", "About")
+
+        assert article > nav > query
+
+    def test_merge_links_keeps_longest_anchor(self):
+        """Test that merging keeps the most descriptive anchor per URL."""
+        links = {"https://example.com/a": "Read"}
+
+        merge_links(
+            links, {"https://example.com/a": "Read the article", "https://example.com/b": ""}
+        )
+        merge_links(links, {"https://example.com/a": "A", "https://example.com/b": "Bee"})
+
+        assert links == {
+            "https://example.com/a": "Read the article",
+            "https://example.com/b": "Bee",
+        }
+
+    def test_url_fingerprint(self):
+        """Test that fingerprints are stable 64-bit ints that tell URLs apart."""
+        fingerprint = url_fingerprint("https://example.com/a")
+
+        assert fingerprint == url_fingerprint("https://example.com/a")
+        assert fingerprint != url_fingerprint("https://example.com/b")
+        assert 0 <= fingerprint < 2**64
+
+    def test_build_frontier_keeps_best_unseen_links(self):
+        """Test that the frontier is capped, ranked and excludes seen URLs."""
+        links = {
+            "https://example.com/about": "About",
+            "https://example.com/contact": "Contact",
+            "https://example.com/post": "A long descriptive article title",
+            "https://example.com/seen": "An already scheduled article title",
+        }
+        seen_urls = {url_fingerprint("https://example.com/seen")}
+
+        frontier = build_frontier(links, seen_urls, limit=2)
+
+        assert frontier[0] == "https://example.com/post"
+        assert len(frontier) == 2
+        assert "https://example.com/seen" not in frontier
+        assert seen_urls == {
+            url_fingerprint(url) for url in ["https://example.com/seen", *frontier]
+        }
+
+    def test_build_frontier_adds_next_pages(self):
+        """Test that paginated links are augmented with the following page."""
+        seen_urls = set()
+
+        frontier = build_frontier({"https://example.com/page/2": "2"}, seen_urls, limit=10)
+
+        assert set(frontier) == {"https://example.com/page/2", "https://example.com/page/3"}
+
+    def test_scrape_with_discovery_caps_frontier(self):
+        """Test that a page full of links only schedules the best MAX_FRONTIER_SIZE."""
+        links = {f"https://example.com/nav{i}": "Nav" for i in range(10)}
+        links["https://example.com/story"] = "A story worth reading today"
+        temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+        temp_db.close()
+
+        try:
+            with (
+                patch("app.scraper.MAX_FRONTIER_SIZE", 3),
+                patch("app.scraper.parse_links_from_html", return_value=links),
+                patch(
+                    "app.scraper.fetch_and_parse_page", return_value=(None, None, b"<html></html>")
+                ) as mock_fetch,
+                patch("app.scraper.bulk_insert_documents", return_value=0),
+                patch("app.scraper.time.sleep"),
+            ):
+                scrape_with_discovery(["https://example.com/"], temp_db.name, discover_depth=2)
+        finally:
+            os.unlink(temp_db.name)
+
+        fetched = [call.args[0] for call in mock_fetch.call_args_list]
+        assert len(fetched) == 4
+        assert fetched[1] == "https://example.com/story"
+
+    def test_scrape_with_discovery_fetches_each_page_once(self):
+        """Test that content and links come from the same download of a page."""
+        session = make_http_session('<html><body><a href="/next">Next story</a></body></html>')
+        temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+        temp_db.close()
+
+        try:
+            with (
+                patch("app.scraper.get_http_session", return_value=session),
+                patch("trafilatura.bare_extraction", return_value=None),
+                patch("app.scraper.bulk_insert_documents", return_value=0),
+                patch("app.scraper.time.sleep"),
+            ):
+                scrape_with_discovery(["https://example.com/"], temp_db.name, discover_depth=2)
+        finally:
+            os.unlink(temp_db.name)
+
+        fetched = [call.args[0] for call in session.get.call_args_list]
+        assert fetched == ["https://example.com/", "https://example.com/next"]
 
 
 @pytest.mark.integration
@@ -0,0 +1,222 @@
+"""
+Tests for the search FastAPI endpoint.
+"""
+
+import os
+import sqlite3
+import tempfile
+from unittest.mock import Mock, patch
+
+import pytest
+from app.database import get_db
+from app.main import app, reciprocal_rank_fusion
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+
+@pytest.fixture
+def db_path():
+    """Create a temporary database with the search schema and a few documents."""
+    temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+    temp_db.close()
+
+    conn = sqlite3.connect(temp_db.name)
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        CREATE TABLE documents (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            url TEXT UNIQUE,
+            title TEXT,
+            content TEXT
+        )
+    """
+    )
+    cursor.execute(
+        """
+        CREATE VIRTUAL TABLE document_content USING fts5(
+            content,
+            content='documents',
+            content_rowid='id',
+            tokenize='porter unicode61'
+        )
+    """
+    )
+    documents = [
+        ("https://example.com/gardening", "Gardening", "Tomatoes and herbs grow well."),
+        (
+            "https://example.com/tomatoes",
+            "All About Tomatoes",
+            "Tomatoes tomatoes tomatoes: growing tomatoes from seed.",
+        ),
+        ("https://example.com/python", "Python Tips", "Generators and list comprehensions."),
+    ]
+    for url, title, content in documents:
+        cursor.execute(
+            "INSERT INTO documents (url, title, content) VALUES (?, ?, ?)", (url, title, content)
+        )
+        cursor.execute(
+            "INSERT INTO document_content (rowid, content) VALUES (?, ?)",
+            (cursor.lastrowid, content),
+        )
+    conn.commit()
+    conn.close()
+
+    yield temp_db.name
+
+    os.unlink(temp_db.name)
+
+
+@pytest.fixture
+def client(db_path):
+    """Create a test client whose sessions point at the temporary database."""
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    TestSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        db = TestSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+    engine.dispose()
+
+
+@pytest.fixture
+def api_headers():
+    """Standard API headers for testing."""
+    return {"X-API-Key": "gem-search-dev-key-12345"}
+
+
+class TestSearchEndpoint:
+    """Test cases for the /search endpoint."""
+
+    def test_search_ranks_by_relevance(self, client, api_headers):
+        """Test that results are ordered by BM25 relevance."""
+        response = client.post("/search", json={"query": "tomatoes"}, headers=api_headers)
+
+        assert response.status_code == 200
+        assert response.json() == [
+            {"title": "All About Tomatoes", "url": "https://example.com/tomatoes"},
+            {"title": "Gardening", "url": "https://example.com/gardening"},
+        ]
+
+    def test_search_no_matches(self, client, api_headers):
+        """Test that a query without matches returns an empty list."""
+        response = client.post("/search", json={"query": "astronomy"}, headers=api_headers)
+
+        assert response.status_code == 200
+        assert response.json() == []
+
+    def test_search_empty_query(self, client, api_headers):
+        """Test that an empty query returns no results."""
+        response = client.post("/search", json={"query": "   "}, headers=api_headers)
+
+        assert response.status_code == 200
+        assert response.json() == []
+
+    def test_search_invalid_fts_syntax(self, client, api_headers):
+        """Test that malformed FTS5 syntax returns 500."""
+        response = client.post("/search", json={"query": '"unbalanced'}, headers=api_headers)
+
+        assert response.status_code == 500
+        assert "Search error" in response.json()["detail"]
+
+    def test_search_invalid_api_key(self, client):
+        """Test that an invalid API key returns 401."""
+        response = client.post(
+            "/search", json={"query": "tomatoes"}, headers={"X-API-Key": "invalid-key"}
+        )
+
+        assert response.status_code == 401
+
+
+class TestReciprocalRankFusion:
+    """Test cases for merging ranked lists."""
+
+    def test_documents_in_both_lists_rank_first(self):
+        """Test that agreement between rankings outweighs a single top position."""
+        assert reciprocal_rank_fusion([[1, 2, 3], [4, 2, 1]]) == [1, 2, 4, 3]
+
+    def test_single_ranking_keeps_order(self):
+        """Test that one ranking is returned unchanged."""
+        assert reciprocal_rank_fusion([[3, 1, 2], []]) == [3, 1, 2]
+
+    def test_empty_rankings(self):
+        """Test that no candidates yields no results."""
+        assert reciprocal_rank_fusion([[], []]) == []
+
+
+# sqlite-vec can't be loaded in every test environment, so vector candidates come
+# from a plain table ranked by a precomputed position instead of a vec0 KNN match
+FAKE_VECTOR_QUERY = text("SELECT document_id FROM fake_vectors ORDER BY position LIMIT :k")
+
+
+@pytest.fixture
+def hybrid_client(client, db_path):
+    """Test client with mocked embeddings and canned vector neighbours."""
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE fake_vectors (document_id INTEGER, position INTEGER)")
+    # Python Tips is the nearest neighbour, then All About Tomatoes
+    conn.executemany("INSERT INTO fake_vectors VALUES (?, ?)", [(3, 1), (2, 2)])
+    conn.commit()
+    conn.close()
+
+    mock_service = Mock()
+    mock_service.embed_texts.return_value = [[0.1, 0.2, 0.3, 0.4]]
+    with (
+        patch("app.main.get_embedding_service", return_value=mock_service),
+        patch("app.main.VECTOR_CANDIDATES_QUERY", FAKE_VECTOR_QUERY),
+    ):
+        yield client, mock_service
+
+
+class TestHybridSearchEndpoint:
+    """Test cases for the /hybrid_search endpoint."""
+
+    def test_hybrid_search_fuses_keyword_and_vector_results(self, hybrid_client, api_headers):
+        """Test that results from both retrievers are merged by reciprocal rank fusion."""
+        client, mock_service = hybrid_client
+
+        response = client.post("/hybrid_search", json={"query": "tomatoes"}, headers=api_headers)
+
+        assert response.status_code == 200
+        assert response.json() == [
+            {"title": "All About Tomatoes", "url": "https://example.com/tomatoes"},
+            {"title": "Python Tips", "url": "https://example.com/python"},
+            {"title": "Gardening", "url": "https://example.com/gardening"},
+        ]
+        mock_service.embed_texts.assert_called_once_with(["tomatoes"])
+
+    def test_hybrid_search_empty_query(self, hybrid_client, api_headers):
+        """Test that an empty query returns no results without embedding."""
+        client, mock_service = hybrid_client
+
+        response = client.post("/hybrid_search", json={"query": "  "}, headers=api_headers)
+
+        assert response.status_code == 200
+        assert response.json() == []
+        mock_service.embed_texts.assert_not_called()
+
+    def test_hybrid_search_embedding_error(self, hybrid_client, api_headers):
+        """Test that embedding failures return 500."""
+        client, mock_service = hybrid_client
+        mock_service.embed_texts.side_effect = Exception("Model error")
+
+        response = client.post("/hybrid_search", json={"query": "tomatoes"}, headers=api_headers)
+
+        assert response.status_code == 500
+        assert "Search error" in response.json()["detail"]
+
+    def test_hybrid_search_invalid_api_key(self, client):
+        """Test that an invalid API key returns 401."""
+        response = client.post(
+            "/hybrid_search", json={"query": "tomatoes"}, headers={"X-API-Key": "invalid-key"}
+        )
+
+        assert response.status_code == 401